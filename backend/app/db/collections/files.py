@@ -1,5 +1,5 @@
 from pydantic import Field
-from typing import TypedDict
+from typing import NotRequired, Optional, TypedDict
 from pymongo.asynchronous.collection import AsyncCollection
 from ..db import database
 
@@ -7,6 +7,12 @@ from ..db import database
 class FileSchema(TypedDict):
     name: str = Field(..., description="Name of the file")
     status: str = Field(..., description="Status of the file")
+    collection_name: str = Field(..., description="Qdrant collection the file is indexed into")
+    # set once the upload is on disk, after the record is inserted
+    sha256: NotRequired[str] = Field(..., description="SHA-256 of the uploaded bytes")
+    tenant_id: Optional[str] = Field(None, description="Tenant the file was uploaded for")
+    # timings: Optional[dict], stage timings of the last ingest (set by the worker)
+    # replaced_by: Optional[str], file id of the upload that replaced this one (status "replaced")
     # result: Optional[str] = Field(None, description="The result from AI")
 
 
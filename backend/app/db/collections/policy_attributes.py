@@ -0,0 +1,16 @@
+from pydantic import Field
+from typing import Any, Dict, Optional, TypedDict
+from pymongo.asynchronous.collection import AsyncCollection
+from ..db import database
+
+
+class PolicyAttributesSchema(TypedDict):
+    file_id: str = Field(..., description="Id of the uploaded file in the files collection")
+    document_id: str = Field(..., description="Document id of the file's chunks in Qdrant")
+    collection_name: str = Field(..., description="Qdrant collection the file is indexed into")
+    tenant_id: Optional[str] = Field(None, description="Tenant the file was uploaded for")
+    attributes: Dict[str, Any] = Field(..., description="Attributes extracted at ingest time")
+
+
+COLLECTION_NAME = "policy_attributes"
+policy_attributes_collection: AsyncCollection = database[COLLECTION_NAME]
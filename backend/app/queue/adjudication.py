@@ -0,0 +1,233 @@
+import io
+import csv
+from typing import Any, Dict, List, Mapping
+
+import numpy as np
+
+from .attributes import WAITING_CONDITIONS
+
+
+# ===== Columns =====
+# applicant columns read by adjudicate(); all optional except age (missing/NaN -> undetermined)
+NUMERIC_COLUMNS = ("age", "policy_months", "claim_amount")
+TEXT_COLUMNS = ("policy_id", "condition", "procedure")
+
+# eligible column: 1 eligible, 0 ineligible, -1 undetermined (age missing)
+ELIGIBLE, INELIGIBLE, UNDETERMINED = 1, 0, -1
+REASONS = ("passed", "age_missing", "below_min_age", "above_max_age", "waiting_period")
+_REASON = {name: code for code, name in enumerate(REASONS)}
+
+# condition codes: column index into the per-policy waiting period table
+_CONDITIONS = ("", "accident") + tuple(WAITING_CONDITIONS)
+
+
+# ===== Input formats =====
+def _numeric(values: Any) -> np.ndarray:
+    array = np.asarray(values)
+    if array.dtype.kind in "iufb":
+        return array.astype(np.float64)
+    # text (CSV) or objects with None: blanks become NaN
+    out = np.full(len(array), np.nan)
+    for i, v in enumerate(array):
+        if v is not None and v != "":
+            out[i] = float(v)
+    return out
+
+
+def _text(values: Any) -> np.ndarray:
+    array = np.asarray(values)
+    if array.dtype.kind == "U":
+        return array
+    return np.array(["" if v is None else str(v) for v in array], dtype=str)
+
+
+def normalize_columns(columns: Mapping[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    Known applicant columns as float64 (NaN = missing) / str arrays; unknown columns are dropped.
+    """
+    out: Dict[str, np.ndarray] = {}
+    for name in NUMERIC_COLUMNS:
+        if name in columns:
+            out[name] = _numeric(columns[name])
+    for name in TEXT_COLUMNS:
+        if name in columns:
+            out[name] = _text(columns[name])
+    lengths = {len(v) for v in out.values()}
+    if len(lengths) > 1:
+        raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+    return out
+
+
+def columns_from_csv(data: bytes) -> Dict[str, np.ndarray]:
+    reader = csv.reader(io.StringIO(data.decode("utf-8-sig")))
+    header = next(reader, None)
+    if not header:
+        raise ValueError("Empty CSV")
+    rows = list(reader)
+    columns = {}
+    for i, name in enumerate(h.strip() for h in header):
+        columns[name] = np.array([row[i].strip() if i < len(row) else "" for row in rows], dtype=str)
+    return normalize_columns(columns)
+
+
+def columns_from_npz(data: bytes) -> Dict[str, np.ndarray]:
+    # string columns must be fixed-width unicode arrays; pickled object arrays are refused
+    with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+        return normalize_columns({name: npz[name] for name in npz.files})
+
+
+def columns_from_arrow(data: bytes) -> Dict[str, np.ndarray]:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("Arrow input needs pyarrow installed; send CSV or .npz instead")
+    table = pa.ipc.open_stream(io.BytesIO(data)).read_all()
+    return normalize_columns({name: table.column(name).to_numpy(zero_copy_only=False)
+                              for name in table.column_names})
+
+
+def read_columns(data: bytes, content_type: str) -> Dict[str, np.ndarray]:
+    """
+    Applicant columns from a request body: text/csv, application/x-npz (np.savez)
+    or Arrow IPC stream (application/vnd.apache.arrow.stream).
+    """
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return columns_from_csv(data)
+    if content_type in ("application/x-npz", "application/octet-stream"):
+        return columns_from_npz(data)
+    if content_type in ("application/vnd.apache.arrow.stream", "application/vnd.apache.arrow.file"):
+        return columns_from_arrow(data)
+    raise ValueError(f"Unsupported content type {content_type!r}")
+
+
+# ===== Vectorized rules =====
+def round_paise(amount: Any) -> Any:
+    """
+    Round rupee amounts (a float or an array) to whole paise, halves up.
+    apply_rules_and_ml() uses it too, so both paths agree to the paisa;
+    round() and np.round() can differ on half-paisa amounts.
+    """
+    return np.floor(np.asarray(amount, dtype=np.float64) * 100 + 0.5) / 100
+
+
+def _policy_table(policies: List[Dict[str, Any]], procedures: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    One row per policy: the numeric attributes (NaN = not stated), the waiting
+    period per condition code and the sub-limit per procedure code.
+    """
+    def field(name: str) -> np.ndarray:
+        return np.array([np.nan if p.get(name) is None else float(p[name]) for p in policies])
+
+    table = {name: field(name) for name in ("age_min", "age_max", "sum_insured", "copay_percent")}
+    initial = np.nan_to_num(field("waiting_period_months"))
+    waiting = np.zeros((len(policies), len(_CONDITIONS)))
+    waiting[:, 0] = initial
+    for code, condition in enumerate(_CONDITIONS[2:], 2):
+        waiting[:, code] = np.maximum(initial, np.nan_to_num(field(WAITING_CONDITIONS[condition])))
+    table["waiting"] = waiting
+    limits = np.full((len(policies), len(procedures)), np.nan)
+    for i, p in enumerate(policies):
+        for name, amount in (p.get("sub_limits") or {}).items():
+            j = np.searchsorted(procedures, name)
+            if j < len(procedures) and procedures[j] == name:
+                limits[i, j] = amount
+    table["sub_limits"] = limits
+    return table
+
+
+def adjudicate(applicants: Mapping[str, Any], policies: Mapping[str, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    apply_rules_and_ml() over a columnar batch: the same rules, evaluated as
+    array operations instead of once per applicant dict.
+
+    `applicants` maps column name -> array (see NUMERIC_COLUMNS / TEXT_COLUMNS);
+    `policy_id` picks each row's record in `policies` and may be left out when
+    there is only one policy. Returns equally long arrays: eligible (1/0/-1),
+    reason (index into REASONS), payable_amount (NaN unless eligible with a
+    claim_amount), capped_sub_limit, capped_sum_insured.
+    """
+    columns = normalize_columns(applicants)
+    n = len(next(iter(columns.values()))) if columns else 0
+    ids = list(policies)
+    if "policy_id" in columns:
+        lookup = {pid: i for i, pid in enumerate(ids)}
+        unique, inverse = np.unique(columns["policy_id"], return_inverse=True)
+        unknown = [u for u in unique if u not in lookup]
+        if unknown:
+            raise ValueError(f"Unknown policy_id: {', '.join(unknown[:5])}")
+        row_policy = np.array([lookup[u] for u in unique], dtype=np.intp)[inverse]
+    elif len(ids) == 1:
+        row_policy = np.zeros(n, dtype=np.intp)
+    else:
+        raise ValueError("policy_id column is required with more than one policy")
+
+    def column(name: str, fill: Any) -> np.ndarray:
+        return columns[name] if name in columns else np.full(n, fill)
+
+    age = column("age", np.nan)
+    months = column("policy_months", np.nan)
+    claim = column("claim_amount", np.nan)
+    procedures, procedure_code = np.unique(column("procedure", ""), return_inverse=True)
+    condition_code = np.zeros(n, dtype=np.intp)
+    condition = column("condition", "")
+    for code, name in enumerate(_CONDITIONS[1:], 1):
+        condition_code[condition == name] = code
+
+    table = _policy_table([policies[pid] for pid in ids], procedures)
+
+    # eligibility: the first failing check decides the reason, as in the scalar rules
+    reason = np.full(n, _REASON["passed"], dtype=np.int8)
+    waiting = table["waiting"][row_policy, condition_code]
+    checks = [
+        ("waiting_period", (waiting > 0) & (months < waiting)),
+        ("above_max_age", age > table["age_max"][row_policy]),
+        ("below_min_age", age < table["age_min"][row_policy]),
+        ("age_missing", np.isnan(age)),
+    ]
+    for name, failed in checks:  # last assignment wins, so most important check goes last
+        reason[failed] = _REASON[name]
+    eligible = np.where(reason == _REASON["passed"], ELIGIBLE, INELIGIBLE).astype(np.int8)
+    eligible[reason == _REASON["age_missing"]] = UNDETERMINED
+
+    # payable amount for eligible rows with a claim: sub-limit, then sum insured, then co-pay
+    payable = np.where(eligible == ELIGIBLE, claim, np.nan)
+    limit = table["sub_limits"][row_policy, procedure_code] if len(procedures) else np.full(n, np.nan)
+    capped_sub_limit = payable > limit
+    payable = np.where(capped_sub_limit, limit, payable)
+    sum_insured = table["sum_insured"][row_policy]
+    capped_sum_insured = payable > sum_insured
+    payable = np.where(capped_sum_insured, sum_insured, payable)
+    copay = np.nan_to_num(table["copay_percent"][row_policy])
+    payable = round_paise(payable * (1 - copay / 100))
+
+    return {"eligible": eligible, "reason": reason, "payable_amount": payable,
+            "capped_sub_limit": capped_sub_limit, "capped_sum_insured": capped_sum_insured}
+
+
+def decisions_to_json(decisions: Dict[str, np.ndarray]) -> Dict[str, List[Any]]:
+    """
+    Columnar JSON: eligible as true/false/null, reason as names, NaN as null.
+    """
+    eligible = decisions["eligible"]
+    payable = decisions["payable_amount"]
+    return {
+        "eligible": np.where(eligible == UNDETERMINED, None, eligible == ELIGIBLE).tolist(),
+        "reason": np.asarray(REASONS, dtype=object)[decisions["reason"]].tolist(),
+        "payable_amount": np.where(np.isnan(payable), None, payable).tolist(),
+        "capped_sub_limit": decisions["capped_sub_limit"].tolist(),
+        "capped_sum_insured": decisions["capped_sum_insured"].tolist(),
+    }
+
+
+def summarize(decisions: Dict[str, np.ndarray]) -> Dict[str, Any]:
+    eligible = decisions["eligible"]
+    reasons = np.bincount(decisions["reason"], minlength=len(REASONS))
+    return {
+        "rows": int(len(eligible)),
+        "eligible": int((eligible == ELIGIBLE).sum()),
+        "ineligible": int((eligible == INELIGIBLE).sum()),
+        "undetermined": int((eligible == UNDETERMINED).sum()),
+        "reasons": {name: int(count) for name, count in zip(REASONS, reasons)},
+        "payable_total": round(float(np.nansum(decisions["payable_amount"])), 2),
+    }
@@ -0,0 +1,229 @@
+import os
+import re
+import copy
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from redis import Redis, RedisError
+
+
+# ===== Config =====
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", "3600"))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1024"))
+# near-duplicate threshold: questions that differ only in the procedure or amount
+# asked about can score above 0.95, and must not share an answer
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.98"))
+# shared tier across API replicas; empty disables it
+ANSWER_CACHE_REDIS_URL = os.getenv(
+    "ANSWER_CACHE_REDIS_URL", os.getenv("REDIS_URL", "redis://valkey:6379"))
+
+
+def normalize_query(query: str) -> str:
+    text = re.sub(r"\s+", " ", query.lower()).strip()
+    return text.strip(" ?.!")
+
+
+class AnswerCache:
+    """
+    Cache of retrieve() payloads, per collection and search scope.
+
+    Exact hits (get) match on normalized query text, in the local LRU and
+    then in Valkey (shared by every API replica). Near-duplicates
+    (get_similar) match on cosine similarity of query embeddings >=
+    `similarity`, scanned over the local LRU; entries found in Valkey are
+    copied into it. Every key carries the collection's generation counter,
+    so bumping it (invalidate_collection) drops a collection's answers
+    everywhere at once. `scope` (a short key, "" for unscoped searches)
+    keeps answers over different subsets of a collection, such as one
+    tenant's documents, apart; they share the collection's generation.
+    Both lookups only match entries of the same collection, generation,
+    top_k and scope.
+    """
+
+    def __init__(self, redis: Optional[Redis] = None, ttl: int = ANSWER_CACHE_TTL,
+                 max_entries: int = ANSWER_CACHE_MAX_ENTRIES, similarity: float = ANSWER_CACHE_SIMILARITY):
+        self.redis = redis
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity = similarity
+        self.hits = {"exact": 0, "semantic": 0}
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> (expires_at, unit query vector or None, payload)
+        self._local: "OrderedDict[Tuple, Tuple[float, Optional[np.ndarray], Dict]]" = OrderedDict()
+        self._local_generations: Dict[str, int] = {}
+        self._redis_down_until = 0.0
+
+    # ----- shared tier -----
+    def _redis_call(self, method: str, *args):
+        if self.redis is None or time.time() < self._redis_down_until:
+            return None
+        try:
+            return getattr(self.redis, method)(*args)
+        except RedisError as e:
+            # back off instead of paying a connect timeout on every request
+            print(f"[answer cache] valkey unavailable, using local tier only for 30s: {e}")
+            self._redis_down_until = time.time() + 30
+            return None
+
+    # ----- generations -----
+    def generation(self, collection_name: str) -> int:
+        shared = self._redis_call("get", f"answer-gen:{collection_name}")
+        return int(shared or 0) + self._local_generations.get(collection_name, 0)
+
+    def invalidate_collection(self, collection_name: str) -> None:
+        with self._lock:
+            self._local_generations[collection_name] = self._local_generations.get(collection_name, 0) + 1
+        self._redis_call("incr", f"answer-gen:{collection_name}")
+
+    # ----- lookups -----
+    @staticmethod
+    def _key(collection_name: str, generation: int, normalized: str, top_k: int, scope: str = "") -> Tuple:
+        return (collection_name, generation, top_k, scope, normalized)
+
+    @staticmethod
+    def _redis_key(key: Tuple) -> str:
+        collection_name, generation, top_k, scope, normalized = key
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        if scope:
+            return f"answer:{collection_name}:{generation}:{top_k}:{scope}:{digest}"
+        return f"answer:{collection_name}:{generation}:{top_k}:{digest}"
+
+    @staticmethod
+    def _unit(vector: Optional[List[float]]) -> Optional[np.ndarray]:
+        if vector is None:
+            return None
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else None
+
+    def _local_get(self, key: Tuple) -> Optional[Dict]:
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.time():
+            del self._local[key]
+            return None
+        self._local.move_to_end(key)
+        return entry[2]
+
+    def _local_put(self, key: Tuple, vector: Optional[np.ndarray], payload: Dict):
+        self._local[key] = (time.time() + self.ttl, vector, payload)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def _semantic_get(self, key: Tuple, vector: np.ndarray) -> Optional[Dict]:
+        now = time.time()
+        # collection, generation, top_k and scope must all match
+        candidates = [(k, e) for k, e in self._local.items()
+                      if k[:4] == key[:4]
+                      and e[1] is not None and e[0] >= now]
+        if not candidates:
+            return None
+        scores = np.stack([e[1] for _, e in candidates]) @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        best_key = candidates[best][0]
+        self._local.move_to_end(best_key)
+        return candidates[best][1][2]
+
+    def get(self, query: str, collection_name: str, top_k: int,
+            scope: str = "") -> Tuple[Optional[Dict], int]:
+        """
+        Return (payload of an exact hit or None, generation).
+
+        On a miss, call get_similar() with the query embedding once retrieval
+        has computed it, and hand the vector and generation to put().
+        """
+        generation = self.generation(collection_name)
+        key = self._key(collection_name, generation, normalize_query(query), top_k, scope)
+        with self._lock:
+            payload = self._local_get(key)
+        if payload is None:
+            raw = self._redis_call("get", self._redis_key(key))
+            if raw:
+                stored = json.loads(raw)
+                payload = stored["payload"]
+                with self._lock:
+                    self._local_put(key, self._unit(stored.get("vector")), payload)
+        if payload is None:
+            return None, generation
+        self.hits["exact"] += 1
+        return self._hit(payload, "exact"), generation
+
+    def get_similar(self, query: str, collection_name: str, top_k: int, vector: Optional[List[float]],
+                    generation: int, scope: str = "") -> Optional[Dict]:
+        """
+        Payload of a near-duplicate query after a get() miss, or None (counted as the miss).
+        """
+        key = self._key(collection_name, generation, normalize_query(query), top_k, scope)
+        unit = self._unit(vector)
+        if unit is not None:
+            with self._lock:
+                payload = self._semantic_get(key, unit)
+            if payload is not None:
+                self.hits["semantic"] += 1
+                return self._hit(payload, "semantic")
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def _hit(payload: Dict, kind: str) -> Dict:
+        out = copy.deepcopy(payload)
+        out["cache"] = kind
+        return out
+
+    def put(self, query: str, collection_name: str, top_k: int, payload: Dict,
+            vector: Optional[List[float]] = None, generation: Optional[int] = None, scope: str = "") -> None:
+        """
+        Store a payload. Pass the `generation` read before retrieval started so
+        an answer computed across an invalidation is not stored as fresh.
+        """
+        current = self.generation(collection_name)
+        if generation is not None and generation != current:
+            return
+        key = self._key(collection_name, current, normalize_query(query), top_k, scope)
+        with self._lock:
+            self._local_put(key, self._unit(vector), payload)
+        if self.redis is not None:
+            stored = json.dumps({"payload": payload, "vector": vector}, default=str)
+            self._redis_call("setex", self._redis_key(key), self.ttl, stored)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": dict(self.hits), "misses": self.misses, "local_entries": len(self._local)}
+
+
+_cache: Optional[AnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_answer_cache() -> Optional[AnswerCache]:
+    """
+    Process-wide answer cache, or None when ANSWER_CACHE_ENABLED is off.
+    """
+    global _cache
+    if not ANSWER_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            redis = Redis.from_url(ANSWER_CACHE_REDIS_URL, socket_timeout=0.5,
+                                   socket_connect_timeout=0.5) if ANSWER_CACHE_REDIS_URL else None
+            _cache = AnswerCache(redis=redis)
+        return _cache
+
+
+def invalidate_collection(collection_name: str) -> None:
+    """
+    Drop every cached answer for a collection (called when a new file is ready in it).
+    """
+    cache = get_answer_cache()
+    if cache is not None:
+        cache.invalidate_collection(collection_name)
@@ -0,0 +1,371 @@
+import asyncio
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
+
+from google.genai import types
+
+from . import vectorStore
+from .vectorStore import (
+    COLLECTION_NAME,
+    HYBRID_SEARCH,
+    HYBRID_CANDIDATES,
+    GeminiEmbeddings,
+    SearchScope,
+    fuse_query_hits,
+    scope_filter,
+    scope_key,
+    _point_to_document,
+    _hybrid_rank,
+    _assemble_hits,
+    expansion_shortcut,
+    remember_expansion,
+    _expansion_prompt,
+    _parse_query_list,
+    _final_answer_prompt,
+    _retrieve_payload,
+)
+from .qdrant_pool import get_async_qdrant_client, avector_layout, arefresh_layout, dense_request
+from .answer_cache import AnswerCache, get_answer_cache, normalize_query
+from .expansion_cache import get_expansion_cache
+from .context_packer import pack_context
+from .deadline import (
+    Deadline, DeadlineExceeded, ANSWER_MIN_SECONDS,
+    acall_with_deadline, aretry_sleep)
+from .metrics import traced
+
+
+# ===== Async twins of the retrieval stages in vectorStore.py =====
+# Same prompts, parsing and payloads; every network call is awaited on the
+# event loop through the `aio` Gemini surface and AsyncQdrantClient.
+
+async def acreate_queries(query: str, max_retries: int = 4, model: str = "gemini-2.5-flash",
+                          deadline: Optional[Deadline] = None) -> List[str]:
+    prompt = _expansion_prompt(query)
+    for attempt in range(1, max_retries + 1):
+        resp = await acall_with_deadline(lambda: vectorStore.gemini_client.aio.models.generate_content(
+            model=model,
+            contents=prompt,
+            config=types.GenerateContentConfig(
+                system_instruction="Output must be a JSON array of strings.")
+        ), deadline)
+        parsed = _parse_query_list(resp)
+        if parsed is not None:
+            return parsed
+
+        print(
+            f"[query expansion] Attempt {attempt} failed to produce clean JSON. Retrying...")
+        if not await aretry_sleep(0.5 * attempt, deadline, "expansion"):
+            break
+
+    print("[query expansion] falling back to original query")
+    return [query]
+
+
+async def amulti_search_vector_store(queries: List[str], top_k: int = 3, collection_name: str = COLLECTION_NAME,
+                                     scope: Optional[SearchScope] = None,
+                                     vectors: Optional[List[List[float]]] = None) -> List[Any]:
+    """
+    Async multi_search_vector_store: one batched embed call (unless `vectors`
+    are given), one batch query to Qdrant, BM25 fusion when HYBRID_SEARCH is
+    on; all limited to `scope`.
+    """
+    if not queries:
+        return []
+    if vectors is None:
+        vectors = await GeminiEmbeddings(dims=768).aembed_documents(queries)
+    client = get_async_qdrant_client()
+    limit = max(top_k, HYBRID_CANDIDATES) if HYBRID_SEARCH else top_k
+    query_filter = scope_filter(scope)
+
+    async def query() -> List[Any]:
+        layout = await avector_layout(collection_name)
+        return await client.query_batch_points(
+            collection_name=collection_name,
+            requests=[dense_request(v, limit, layout, query_filter=query_filter) for v in vectors],
+        )
+
+    try:
+        responses = await query()
+    except Exception:
+        # the alias was swapped to a collection with another vector layout (migrate_collection)
+        if not await arefresh_layout(collection_name):
+            raise
+        responses = await query()
+    dense = [[_point_to_document(p, collection_name) for p in r.points]
+             for r in responses]
+    if HYBRID_SEARCH:
+        # BM25 scoring is CPU-bound NumPy work; keep it off the event loop
+        fused, missing = await asyncio.to_thread(
+            _hybrid_rank, queries, dense, top_k, collection_name, scope)
+        docs = [d for hits in dense for d in hits]
+        if missing:
+            points = await client.retrieve(
+                collection_name=collection_name, ids=list(missing), with_payload=True)
+            docs += [_point_to_document(p, collection_name) for p in points]
+        dense = _assemble_hits(fused, docs)
+    return fuse_query_hits(dense)
+
+
+async def agenerate_final_answer(user_query: str, unique_chunks: List[Any], model: str = "gemini-2.5-flash",
+                                 deadline: Optional[Deadline] = None) -> str:
+    resp = await acall_with_deadline(lambda: vectorStore.gemini_client.aio.models.generate_content(
+        model=model,
+        contents=_final_answer_prompt(user_query, unique_chunks)
+    ), deadline)
+    return resp.text.strip()
+
+
+async def aexpand_within_deadline(user_query: str, deadline: Deadline, collection_name: str = COLLECTION_NAME,
+                                  scope: Optional[SearchScope] = None) -> List[str]:
+    # cache lookups may go to Valkey; keep them off the event loop
+    queries = await asyncio.to_thread(expansion_shortcut, user_query, deadline, collection_name, scope)
+    if queries is not None:
+        return queries
+    try:
+        with deadline.stage("expansion"):
+            queries = await acreate_queries(user_query, deadline=deadline)
+    except DeadlineExceeded:
+        return [user_query]
+    await asyncio.to_thread(remember_expansion, user_query, queries)
+    return queries
+
+
+async def asearch_with_expansion(user_query: str, top_k: int, deadline: Deadline,
+                                 collection_name: str = COLLECTION_NAME,
+                                 on_event: Optional[Callable[[str, Any], None]] = None,
+                                 scope: Optional[SearchScope] = None,
+                                 query_vector: Optional[Awaitable[List[float]]] = None) -> Tuple[List[str], List[Any]]:
+    """
+    Search the raw query right away, in parallel with expansion, and the
+    expanded queries (minus the raw one) as soon as they are known; their
+    hits are merged in after the raw ones. `query_vector` is the raw query's
+    embedding when the caller is already computing it. When expansion adds nothing the
+    raw search had not found, the query is remembered as well served in this
+    collection and scope, and later skips expansion there.
+
+    `on_event` is called with ("queries", expanded queries) and with
+    ("evidence", chunks not reported before) as each search finishes.
+    """
+    emit = on_event or (lambda event, data: None)
+    reported = set()
+
+    async def timed(name: str, coro):
+        with deadline.stage(name):
+            hits = await coro
+        fresh = [d for d in hits if d.page_content not in reported]
+        reported.update(d.page_content for d in fresh)
+        if fresh:
+            emit("evidence", fresh)
+        return hits
+
+    async def search_raw():
+        vectors = [await query_vector] if query_vector is not None else None
+        return await amulti_search_vector_store(
+            [user_query], top_k=top_k, collection_name=collection_name, scope=scope, vectors=vectors)
+
+    raw_task = asyncio.ensure_future(timed("search_raw", search_raw()))
+    expanded_task = None
+    try:
+        expanded_queries = await aexpand_within_deadline(user_query, deadline, collection_name, scope)
+        emit("queries", expanded_queries)
+        raw_key = normalize_query(user_query)
+        extra = [q for q in expanded_queries if normalize_query(q) != raw_key]
+        if extra:
+            expanded_task = asyncio.ensure_future(timed(
+                "search_expanded", amulti_search_vector_store(
+                    extra, top_k=top_k, collection_name=collection_name, scope=scope)))
+        raw_hits = await raw_task
+        if expanded_task is None:
+            return expanded_queries, raw_hits
+        expanded_hits = await expanded_task
+    finally:
+        for task in (raw_task, expanded_task):
+            if task is not None:
+                task.cancel()
+
+    cache = get_expansion_cache()
+    raw_texts = {d.page_content for d in raw_hits}
+    if cache is not None and raw_hits and all(d.page_content in raw_texts for d in expanded_hits):
+        await asyncio.to_thread(cache.mark_well_served, user_query, collection_name, scope_key(scope))
+    return expanded_queries, fuse_query_hits([raw_hits, expanded_hits])
+
+
+async def _asemantic_lookup(cache: AnswerCache, user_query: str, collection_name: str, top_k: int,
+                            scope: Optional[SearchScope], generation: int, raw_vector: Awaitable[List[float]],
+                            deadline: Deadline) -> Tuple[Optional[Dict], List[float]]:
+    # the raw search's embedding, checked against the answer cache as soon as it is known
+    with deadline.stage("semantic_cache") as stage:
+        vector = await raw_vector
+        cached = cache.get_similar(user_query, collection_name, top_k, vector, generation, scope_key(scope))
+        stage["hit"] = cached is not None
+    return cached, vector
+
+
+@traced("query")
+async def aretrieve(user_query: str, top_k: int = 3, use_cache: bool = True,
+                    timeout: Optional[float] = None, collection_name: str = COLLECTION_NAME,
+                    scope: Optional[SearchScope] = None) -> Dict[str, Any]:
+    """
+    Async retrieve(): same response shape, answer cache, deadline handling and
+    collection / scope routing, without blocking the event loop.
+    """
+    deadline = Deadline(timeout)
+    cache = get_answer_cache() if use_cache else None
+    query_vector = generation = None
+    if cache is not None:
+        with deadline.stage("answer_cache") as stage:
+            cached, generation = await asyncio.to_thread(
+                cache.get, user_query, collection_name, top_k, scope_key(scope))
+            stage["hit"] = cached is not None
+        if cached is not None:
+            cached["timings"] = deadline.report()
+            return cached
+
+    raw_vector = asyncio.ensure_future(GeminiEmbeddings(dims=768).aembed_query(user_query))
+    search_task = asyncio.ensure_future(asearch_with_expansion(
+        user_query, top_k, deadline, collection_name, scope=scope, query_vector=raw_vector))
+    try:
+        if cache is not None:
+            cached, query_vector = await _asemantic_lookup(
+                cache, user_query, collection_name, top_k, scope, generation, raw_vector, deadline)
+            if cached is not None:
+                cached["timings"] = deadline.report()
+                return cached
+        expanded_queries, unique_chunks = await search_task
+    finally:
+        search_task.cancel()
+    with deadline.stage("pack") as stage:
+        context_chunks, packing = pack_context(unique_chunks)
+        stage["tokens_saved"] = packing["tokens_saved"]
+
+    final_answer = None
+    if deadline.allows(ANSWER_MIN_SECONDS):
+        try:
+            with deadline.stage("answer"):
+                final_answer = await agenerate_final_answer(user_query, context_chunks, deadline=deadline)
+        except DeadlineExceeded:
+            pass
+    else:
+        deadline.skip("answer")
+
+    payload = _retrieve_payload(
+        user_query, expanded_queries, unique_chunks, final_answer)
+    payload["context"] = packing
+    payload["timings"] = deadline.report()
+    if cache is not None and not deadline.degraded:
+        await asyncio.to_thread(cache.put, user_query, collection_name, top_k, payload,
+                                query_vector, generation, scope_key(scope))
+    return payload
+
+
+# ===== Streaming =====
+async def astream_final_answer(user_query: str, unique_chunks: List[Any], model: str = "gemini-2.5-flash",
+                               deadline: Optional[Deadline] = None) -> AsyncIterator[str]:
+    """
+    agenerate_final_answer() as text pieces from Gemini's streaming API.
+    Raises DeadlineExceeded when the next piece does not arrive in time.
+    """
+    stream = await acall_with_deadline(lambda: vectorStore.gemini_client.aio.models.generate_content_stream(
+        model=model,
+        contents=_final_answer_prompt(user_query, unique_chunks)
+    ), deadline, hedge_after=0)
+    pieces = stream.__aiter__()
+    while True:
+        try:
+            if deadline is None:
+                chunk = await pieces.__anext__()
+            else:
+                chunk = await asyncio.wait_for(pieces.__anext__(), max(deadline.remaining(), 0))
+        except StopAsyncIteration:
+            return
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded()
+        if chunk.text:
+            yield chunk.text
+
+
+def _evidence(chunks: List[Any]) -> List[Dict[str, Any]]:
+    return [{"content": c.page_content, "metadata": c.metadata} for c in chunks]
+
+
+async def aretrieve_stream(user_query: str, top_k: int = 3, use_cache: bool = True,
+                           timeout: Optional[float] = None, collection_name: str = COLLECTION_NAME,
+                           scope: Optional[SearchScope] = None) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    aretrieve() as a stream of (event, data) pairs, sent as soon as each part is known:
+
+    - "queries":  the expanded queries
+    - "evidence": newly retrieved chunks ({content, metadata}), raw-query hits first
+    - "token":    a piece of the generated answer
+    - "result":   the full payload aretrieve() returns; always the last event
+
+    A cached answer is sent as a single "result".
+    """
+    deadline = Deadline(timeout)
+    cache = get_answer_cache() if use_cache else None
+    query_vector = generation = None
+    if cache is not None:
+        with deadline.stage("answer_cache") as stage:
+            cached, generation = await asyncio.to_thread(
+                cache.get, user_query, collection_name, top_k, scope_key(scope))
+            stage["hit"] = cached is not None
+        if cached is not None:
+            cached["timings"] = deadline.report()
+            yield "result", cached
+            return
+
+    events: asyncio.Queue = asyncio.Queue()
+    raw_vector = asyncio.ensure_future(GeminiEmbeddings(dims=768).aembed_query(user_query))
+
+    async def search():
+        try:
+            return await asearch_with_expansion(
+                user_query, top_k, deadline, collection_name, scope=scope, query_vector=raw_vector,
+                on_event=lambda event, data: events.put_nowait(
+                    (event, _evidence(data) if event == "evidence" else data)))
+        finally:
+            events.put_nowait(None)
+
+    search_task = asyncio.ensure_future(search())
+    try:
+        if cache is not None:
+            # nothing is sent before the near-duplicate lookup misses
+            cached, query_vector = await _asemantic_lookup(
+                cache, user_query, collection_name, top_k, scope, generation, raw_vector, deadline)
+            if cached is not None:
+                cached["timings"] = deadline.report()
+                yield "result", cached
+                return
+        while (item := await events.get()) is not None:
+            yield item
+        expanded_queries, unique_chunks = await search_task
+    finally:
+        # a near-duplicate was served, or the client went away mid-stream
+        search_task.cancel()
+
+    with deadline.stage("pack") as stage:
+        context_chunks, packing = pack_context(unique_chunks)
+        stage["tokens_saved"] = packing["tokens_saved"]
+
+    final_answer = None
+    if deadline.allows(ANSWER_MIN_SECONDS):
+        pieces = []
+        try:
+            with deadline.stage("answer"):
+                async for piece in astream_final_answer(user_query, context_chunks, deadline=deadline):
+                    pieces.append(piece)
+                    yield "token", piece
+        except DeadlineExceeded:
+            pass
+        # on timeout, keep what was already streamed to the client
+        final_answer = "".join(pieces).strip() or None
+    else:
+        deadline.skip("answer")
+
+    payload = _retrieve_payload(
+        user_query, expanded_queries, unique_chunks, final_answer)
+    payload["context"] = packing
+    payload["timings"] = deadline.report()
+    if cache is not None and not deadline.degraded:
+        await asyncio.to_thread(cache.put, user_query, collection_name, top_k, payload,
+                                query_vector, generation, scope_key(scope))
+    yield "result", payload
@@ -0,0 +1,174 @@
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# ===== Patterns (compiled once; matched against lowercased text) =====
+_NUM = r"(\d[\d,]*(?:\.\d+)?)"
+_CURRENCY = r"(?:rs\.?|inr|₹|\$)"
+_SCALE = r"(lakhs?|lacs?|crores?|cr\b|million|thousand|k\b)?"
+_AMOUNT = _CURRENCY + r"?\s*" + _NUM + r"\s*" + _SCALE
+
+# 'age 18 to 65', 'aged between 18 and 65', 'entry age: 18 - 65 years'
+AGE_RANGE_RE = re.compile(
+    r"\bage[ds]?\b(?:\s+(?:limit|band|group))?\s*(?:is|:|of|between|from)?\s*"
+    r"(\d{1,3})\s*(?:years?\s*)?(?:to|and|-|–)\s*(\d{1,3})")
+# 'minimum entry age is 91 days', 'max age: 65'
+MIN_AGE_RE = re.compile(
+    r"min(?:imum)?\.?\s+(?:entry\s+)?age\s*(?:at entry\s*)?(?:is|:|of)?\s*(\d{1,3})\s*(days?|months?|years?)?")
+MAX_AGE_RE = re.compile(
+    r"max(?:imum)?\.?\s+(?:entry\s+)?age\s*(?:at entry\s*)?(?:is|:|of)?\s*(\d{1,3})\s*(days?|months?|years?)?")
+# '30 days initial waiting period', 'waiting period of 48 months'
+WAITING_RE = re.compile(
+    r"(\d{1,3})\s*(day|month|year)s?\s*(?:of\s+)?(?:initial\s+|continuous\s+)?waiting period"
+    r"|waiting period\s*(?:of|is|:)?\s*(\d{1,3})\s*(day|month|year)s?")
+SUM_INSURED_RE = re.compile(
+    r"sum (?:insured|assured)\s*(?:options?\s*)?(?:amount\s*)?(?:of|is|:|up ?to)?\s*" + _AMOUNT)
+COPAY_RE = re.compile(
+    r"co-?pay(?:ment)?\s*(?:of|is|:|at)?\s*(\d{1,2}(?:\.\d+)?)\s*%"
+    r"|(\d{1,2}(?:\.\d+)?)\s*%\s*co-?pay")
+ROOM_RENT_PERCENT_RE = re.compile(
+    r"room rent[^.;]{0,80}?(\d{1,2}(?:\.\d+)?)\s*%\s*of\s*(?:the\s+)?sum (?:insured|assured)")
+ROOM_RENT_AMOUNT_RE = re.compile(r"room rent[^.;%]{0,60}?" + _CURRENCY + r"\s*" + _NUM)
+# 'limited to rs 40,000 for cataract', 'cataract surgery is capped at inr 1 lakh'
+_LIMIT = r"(?:sub-?limit(?:ed)?(?:\s+of)?|limited to|capped at|restricted to|maximum of)"
+SUB_LIMIT_RE = re.compile(
+    _LIMIT + r"\s*" + _CURRENCY + r"\s*" + _NUM + r"\s*" + _SCALE
+    + r"[^.;]{0,20}?\bfor\s+([a-z][a-z \-]{2,40}?)\s*(?=[.,;(]|$)"
+    + r"|([a-z][a-z \-]{2,60}?)\s+(?:is\s+|are\s+|shall be\s+|will be\s+)?"
+    + _LIMIT + r"\s*" + _CURRENCY + r"\s*" + _NUM + r"\s*" + _SCALE)
+
+# what a waiting period applies to, by keywords in the same sentence
+WAITING_LABELS: List[Tuple[str, "re.Pattern"]] = [
+    ("ped_waiting_months", re.compile(r"pre-?existing|\bped\b")),
+    ("maternity_waiting_months", re.compile(r"maternity|pregnan|childbirth")),
+    ("specific_waiting_months", re.compile(r"specific (?:disease|illness|ailment|procedure)|listed (?:disease|illness|condition)")),
+]
+# applicant "condition" -> the waiting period that applies on top of the initial one
+WAITING_CONDITIONS = {"pre_existing": "ped_waiting_months", "maternity": "maternity_waiting_months",
+                      "specific": "specific_waiting_months"}
+SENTENCE_END_RE = re.compile(r"[.;]\s")
+
+_SCALES = {"lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5, "crore": 1e7, "crores": 1e7, "cr": 1e7,
+           "million": 1e6, "thousand": 1e3, "k": 1e3}
+_MONTHS = {"day": 1 / 30, "days": 1 / 30, "month": 1, "months": 1, "year": 12, "years": 12}
+
+# numeric attributes, stored as indexed Qdrant payload fields under "policy."
+INTEGER_FIELDS = ("age_min", "age_max")
+FLOAT_FIELDS = ("waiting_period_months", "ped_waiting_months", "specific_waiting_months",
+                "maternity_waiting_months", "sum_insured", "sum_insured_min", "copay_percent",
+                "room_rent_limit_percent", "room_rent_limit_amount")
+
+
+def parse_amount(number: str, scale: Optional[str] = None) -> float:
+    return float(number.replace(",", "")) * _SCALES.get((scale or "").strip(), 1)
+
+
+def _age_years(value: str, unit: Optional[str]) -> int:
+    # '91 days' / '3 months' as an entry age means from birth
+    return int(value) if not unit or unit.startswith("year") else 0
+
+
+def _sentence(text: str, start: int, end: int) -> str:
+    left = max((m.end() for m in SENTENCE_END_RE.finditer(text, max(0, start - 150), start)), default=max(0, start - 150))
+    right = SENTENCE_END_RE.search(text, end)
+    return text[left:right.start() if right else end + 150]
+
+
+class AttributeExtractor:
+    """
+    Structured policy attributes for one document, fed chunk by chunk at
+    ingest time. Each field keeps every value found with its page, and
+    result() reduces them to one record:
+
+    - age bounds: first mention (the eligibility section comes first)
+    - waiting periods: longest per kind (initial / pre-existing / specific / maternity), in months
+    - sum insured: largest and smallest option; co-pay: highest percentage
+    - room rent and per-procedure sub-limits: first mention
+    """
+
+    def __init__(self):
+        self._values: Dict[str, List[Tuple[Any, Any]]] = {}
+
+    def _found(self, key: str, value: Any, page: Any) -> None:
+        self._values.setdefault(key, []).append((value, page))
+
+    def add(self, text: str, page: Any = None) -> None:
+        text = text.lower()
+        for m in AGE_RANGE_RE.finditer(text):
+            low, high = int(m.group(1)), int(m.group(2))
+            if low < high <= 120:
+                self._found("age_min", low, page)
+                self._found("age_max", high, page)
+        for m in MIN_AGE_RE.finditer(text):
+            self._found("age_min", _age_years(m.group(1), m.group(2)), page)
+        for m in MAX_AGE_RE.finditer(text):
+            if int(m.group(1)) <= 120:
+                self._found("age_max", _age_years(m.group(1), m.group(2)), page)
+        for m in WAITING_RE.finditer(text):
+            value, unit = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+            months = round(int(value) * _MONTHS[unit], 2)
+            sentence = _sentence(text, m.start(), m.end())
+            key = next((k for k, label in WAITING_LABELS if label.search(sentence)), "waiting_period_months")
+            self._found(key, months, page)
+        for m in SUM_INSURED_RE.finditer(text):
+            amount = parse_amount(m.group(1), m.group(2))
+            if amount >= 1000:
+                self._found("sum_insured", amount, page)
+        for m in COPAY_RE.finditer(text):
+            self._found("copay_percent", float(m.group(1) or m.group(2)), page)
+        for m in ROOM_RENT_PERCENT_RE.finditer(text):
+            self._found("room_rent_limit_percent", float(m.group(1)), page)
+        for m in ROOM_RENT_AMOUNT_RE.finditer(text):
+            self._found("room_rent_limit_amount", parse_amount(m.group(1)), page)
+        for m in SUB_LIMIT_RE.finditer(text):
+            if m.group(1):
+                name, amount = m.group(3), parse_amount(m.group(1), m.group(2))
+            else:
+                # '... expenses for cataract surgery are limited to': the words after the last for/on
+                words = m.group(4).split()
+                cut = max((i + 1 for i, w in enumerate(words) if w in ("for", "on")), default=0)
+                name, amount = " ".join(words[cut:][-3:]), parse_amount(m.group(5), m.group(6))
+            self._found("sub_limits", (" ".join(name.split()), amount), page)
+
+    def add_chunks(self, chunks: Iterable[Any]) -> "AttributeExtractor":
+        """
+        Feed Documents or chunk dicts ({page_content, metadata}).
+        """
+        for c in chunks:
+            text = c.page_content if hasattr(c, "page_content") else c["page_content"]
+            metadata = (c.metadata if hasattr(c, "metadata") else c.get("metadata")) or {}
+            self.add(text, metadata.get("page"))
+        return self
+
+    def result(self) -> Dict[str, Any]:
+        """
+        {"age_min": 18, "sum_insured": 500000.0, ..., "sub_limits": {...}, "pages": {field: page}};
+        fields that were not found are left out.
+        """
+        out: Dict[str, Any] = {}
+        pages: Dict[str, Any] = {}
+        for key, found in self._values.items():
+            if key == "sub_limits":
+                limits = {}
+                for (name, amount), page in found:
+                    if name not in limits:
+                        limits[name] = amount
+                        pages[f"sub_limits.{name}"] = page
+                out[key] = limits
+                continue
+            if key.endswith("_months") or key == "copay_percent":
+                value, page = max(found, key=lambda f: f[0])
+            else:
+                value, page = found[0]
+            out[key] = value
+            pages[key] = page
+        if "sum_insured" in self._values:
+            options = self._values["sum_insured"]
+            out["sum_insured"], pages["sum_insured"] = max(options, key=lambda f: f[0])
+            out["sum_insured_min"] = min(v for v, _ in options)
+        out["pages"] = pages
+        return out
+
+
+def extract_attributes(chunks: Iterable[Any]) -> Dict[str, Any]:
+    return AttributeExtractor().add_chunks(chunks).result()
@@ -0,0 +1,107 @@
+"""
+Named provisioning profiles for Qdrant collections.
+
+A profile fixes how a collection trades RAM for latency and recall: the
+Matryoshka prefix vector and its quantization (int8 scalar or product),
+whether full vectors and payloads live on disk, and HNSW graph parameters.
+COLLECTION_PROFILE picks the one new collections get; an existing collection
+moves to another with `python -m app.queue.migrate_collection` (no downtime).
+
+    default    prefix vector per MATRYOSHKA_* (128 dims, int8), full vectors on disk
+    in_memory  one float32 vector, payload in RAM (the layout before prefix vectors)
+    balanced   128-dim int8 prefix, full vectors and payload on disk
+    compact    128-dim product-quantized prefix (x16), everything else on disk
+    recall     256-dim int8 prefix, denser HNSW graph (m=32, ef_construct=256)
+"""
+import os
+from typing import Any, Dict, NamedTuple, Optional
+
+from qdrant_client.http import models as qmodels
+
+
+# ===== Config =====
+# Two-stage search on new collections: a `MATRYOSHKA_DIMS` prefix of each embedding
+# is stored as its own named vector (0 = single full vector, the old layout).
+# Gemini embeddings are Matryoshka-trained, so the prefix ranks nearly as well.
+MATRYOSHKA_DIMS = int(os.getenv("MATRYOSHKA_DIMS", "128"))
+MATRYOSHKA_QUANTIZATION = os.getenv("MATRYOSHKA_QUANTIZATION", "int8").lower()  # int8 | pq | none
+# full vectors are only read to rescore candidates, so they can live on disk
+MATRYOSHKA_FULL_ON_DISK = os.getenv("MATRYOSHKA_FULL_ON_DISK", "true").lower() in ("1", "true", "yes")
+COLLECTION_PROFILE = os.getenv("COLLECTION_PROFILE", "default")
+
+FULL_VECTOR = "full"
+PREFIX_VECTOR = "prefix"
+# keyword indexes every provisioned collection gets (source / per-document / per-tenant filters)
+PAYLOAD_INDEXES = ("metadata.source_document", "metadata.document_id", "metadata.tenant_id")
+
+
+class CollectionProfile(NamedTuple):
+    # 0: one unnamed vector; otherwise named FULL_VECTOR + PREFIX_VECTOR of this size
+    prefix_dims: int = 0
+    # of the prefix vector (or the single vector): "none" | "int8" | "pq"
+    quantization: str = "none"
+    # full vectors (or the single vector) memory-mapped from disk
+    vectors_on_disk: bool = False
+    payload_on_disk: bool = False
+    hnsw_m: int = 16
+    hnsw_ef_construct: int = 100
+
+
+PROFILES: Dict[str, CollectionProfile] = {
+    "default": CollectionProfile(MATRYOSHKA_DIMS, MATRYOSHKA_QUANTIZATION if MATRYOSHKA_DIMS else "none",
+                                 vectors_on_disk=MATRYOSHKA_FULL_ON_DISK and MATRYOSHKA_DIMS > 0),
+    "in_memory": CollectionProfile(),
+    "balanced": CollectionProfile(128, "int8", vectors_on_disk=True, payload_on_disk=True, hnsw_ef_construct=128),
+    "compact": CollectionProfile(128, "pq", vectors_on_disk=True, payload_on_disk=True),
+    "recall": CollectionProfile(256, "int8", vectors_on_disk=True, hnsw_m=32, hnsw_ef_construct=256),
+}
+
+
+def get_profile(name: Optional[str] = None) -> CollectionProfile:
+    name = name or COLLECTION_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown collection profile {name!r}; choose from {', '.join(PROFILES)}")
+    return PROFILES[name]
+
+
+def quantization_config(kind: str) -> Any:
+    # quantized vectors stay in RAM; originals follow vectors_on_disk
+    if kind == "int8":
+        return qmodels.ScalarQuantization(scalar=qmodels.ScalarQuantizationConfig(
+            type=qmodels.ScalarType.INT8, quantile=0.99, always_ram=True))
+    if kind == "pq":
+        return qmodels.ProductQuantization(product=qmodels.ProductQuantizationConfig(
+            compression=qmodels.CompressionRatio.X16, always_ram=True))
+    if kind == "none":
+        return None
+    raise ValueError(f"Unknown quantization {kind!r}; use int8, pq or none")
+
+
+def vectors_config(profile: CollectionProfile, dims: int = 768) -> Any:
+    """
+    Vector params: one cosine `dims` vector, or full + prefix named vectors.
+    With a prefix vector the full vector is only used to rescore the prefix
+    candidates, so it gets no HNSW graph (m=0) and costs no index build.
+    """
+    quantization = quantization_config(profile.quantization)
+    if not profile.prefix_dims:
+        return qmodels.VectorParams(size=dims, distance=qmodels.Distance.COSINE,
+                                    on_disk=profile.vectors_on_disk, quantization_config=quantization)
+    return {
+        FULL_VECTOR: qmodels.VectorParams(size=dims, distance=qmodels.Distance.COSINE,
+                                          on_disk=profile.vectors_on_disk,
+                                          hnsw_config=qmodels.HnswConfigDiff(m=0)),
+        PREFIX_VECTOR: qmodels.VectorParams(size=profile.prefix_dims, distance=qmodels.Distance.COSINE,
+                                            quantization_config=quantization),
+    }
+
+
+def collection_params(profile: CollectionProfile, dims: int = 768) -> Dict[str, Any]:
+    """
+    create_collection() keyword arguments for the profile.
+    """
+    return {
+        "vectors_config": vectors_config(profile, dims),
+        "hnsw_config": qmodels.HnswConfigDiff(m=profile.hnsw_m, ef_construct=profile.hnsw_ef_construct),
+        "on_disk_payload": profile.payload_on_disk,
+    }
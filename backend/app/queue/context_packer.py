@@ -0,0 +1,167 @@
+import os
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from .lexical_index import tokenize
+
+
+# ===== Config =====
+CONTEXT_PACKING = os.getenv("CONTEXT_PACKING", "true").lower() in ("1", "true", "yes")
+# prompt budget for retrieved context, in (estimated) tokens
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+# estimated MinHash Jaccard above which a chunk is a near-duplicate of a more relevant one
+CONTEXT_DEDUP_THRESHOLD = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.8"))
+# Gemini averages ~4 characters per token on English text
+CHARS_PER_TOKEN = 4
+# the splitter overlaps chunks by up to 150 characters; look a little further
+MAX_OVERLAP_CHARS = 300
+MIN_OVERLAP_CHARS = 20
+SHINGLE_SIZE = 3
+MINHASH_PERMUTATIONS = 64
+
+_MERSENNE = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(0x5eed)
+_PERM_A = _rng.integers(1, (1 << 61) - 1, MINHASH_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, (1 << 61) - 1, MINHASH_PERMUTATIONS, dtype=np.uint64)
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+# chunks are either retrieved Documents or reranker dicts ({chunk_id, page_content, metadata, ...})
+def _text(chunk: Any) -> str:
+    return chunk.page_content if isinstance(chunk, Document) else chunk["page_content"]
+
+
+def _metadata(chunk: Any) -> Dict[str, Any]:
+    return (chunk.metadata if isinstance(chunk, Document) else chunk.get("metadata")) or {}
+
+
+def _with_text(chunk: Any, text: str, merged_from: int) -> Any:
+    if isinstance(chunk, Document):
+        metadata = dict(chunk.metadata)
+        metadata["_merged_chunks"] = merged_from
+        return Document(page_content=text, metadata=metadata)
+    out = dict(chunk)
+    out["page_content"] = text
+    out["metadata"] = dict(_metadata(chunk), _merged_chunks=merged_from)
+    return out
+
+
+def _page_key(chunk: Any) -> Optional[Tuple]:
+    meta = _metadata(chunk)
+    if meta.get("page") is None:
+        return None
+    return (meta.get("document_id") or meta.get("source_document") or meta.get("source"), meta["page"])
+
+
+def overlap_length(left: str, right: str) -> int:
+    """
+    Length of the longest suffix of `left` that is a prefix of `right`
+    (MIN_OVERLAP_CHARS..MAX_OVERLAP_CHARS), else 0.
+    """
+    tail = left[-MAX_OVERLAP_CHARS:]
+    head = right[:MIN_OVERLAP_CHARS]
+    if len(head) < MIN_OVERLAP_CHARS:
+        return 0
+    pos = tail.find(head)
+    while pos != -1:
+        if right.startswith(tail[pos:]):
+            return len(tail) - pos
+        pos = tail.find(head, pos + 1)
+    return 0
+
+
+def _merge_overlaps(chunks: List[Any]) -> Tuple[List[Any], int]:
+    """
+    Join chunks of the same page that overlap (splitter overlap) or contain
+    one another. A merged chunk takes the rank of its best part.
+    """
+    items = [[_text(c), c, 1] for c in chunks]  # text, representative chunk, parts
+    merged = 0
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(items)):
+            if items[i] is None or _page_key(items[i][1]) is None:
+                continue
+            for j in range(i + 1, len(items)):
+                if items[j] is None or _page_key(items[j][1]) != _page_key(items[i][1]):
+                    continue
+                a, b = items[i][0], items[j][0]
+                if b in a:
+                    text = a
+                elif a in b:
+                    text = b
+                elif (k := overlap_length(a, b)):
+                    text = a + b[k:]
+                elif (k := overlap_length(b, a)):
+                    text = b + a[k:]
+                else:
+                    continue
+                items[i] = [text, items[i][1], items[i][2] + items[j][2]]
+                items[j] = None
+                merged += 1
+                changed = True
+    out = []
+    for item in items:
+        if item is None:
+            continue
+        text, chunk, parts = item
+        out.append(chunk if parts == 1 else _with_text(chunk, text, parts))
+    return out, merged
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    tokens = tokenize(text)
+    shingles = {" ".join(tokens[i:i + SHINGLE_SIZE])
+                for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    # (a * h + b) mod p (wrapping uint64 products) for every permutation at once, min over shingles
+    return ((np.outer(hashes, _PERM_A) + _PERM_B) % _MERSENNE).min(axis=0)
+
+
+def pack_context(chunks: List[Any], budget_tokens: int = CONTEXT_TOKEN_BUDGET,
+                 dedup_threshold: float = CONTEXT_DEDUP_THRESHOLD) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Chunks (most relevant first) -> chunks to put in the prompt, plus stats.
+
+    1. merge overlapping chunks of the same page,
+    2. drop chunks whose MinHash Jaccard with a more relevant kept chunk is
+       >= dedup_threshold (boilerplate repeated across policies),
+    3. add chunks by relevance while they fit in budget_tokens.
+    """
+    tokens_in = sum(estimate_tokens(_text(c)) for c in chunks)
+    stats = {"chunks_in": len(chunks), "tokens_in": tokens_in, "budget": budget_tokens}
+    if not CONTEXT_PACKING:
+        stats.update(chunks_out=len(chunks), tokens_out=tokens_in, tokens_saved=0)
+        return list(chunks), stats
+
+    merged_chunks, merged = _merge_overlaps(chunks)
+
+    kept, signatures, near_duplicates = [], [], 0
+    for c in merged_chunks:
+        signature = minhash_signature(_text(c))
+        if signatures and (np.stack(signatures) == signature).mean(axis=1).max() >= dedup_threshold:
+            near_duplicates += 1
+            continue
+        kept.append(c)
+        signatures.append(signature)
+
+    packed, used, over_budget = [], 0, 0
+    for c in kept:
+        cost = estimate_tokens(_text(c))
+        if used + cost > budget_tokens:
+            over_budget += 1
+            continue
+        packed.append(c)
+        used += cost
+
+    stats.update(merged=merged, near_duplicates=near_duplicates, over_budget=over_budget,
+                 chunks_out=len(packed), tokens_out=used, tokens_saved=tokens_in - used)
+    return packed, stats
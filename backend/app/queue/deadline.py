@@ -0,0 +1,201 @@
+import os
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .metrics import current_trace, observe_stage, record_retry
+
+
+# ===== Config =====
+# end-to-end budget for one query when the caller does not pass one
+QUERY_DEADLINE_SECONDS = float(os.getenv("QUERY_DEADLINE_SECONDS", "8"))
+# time that must be left for a stage to start; below it the stage is skipped.
+# Expansion goes first, then reranking, then the generated answer.
+EXPANSION_MIN_SECONDS = float(os.getenv("EXPANSION_MIN_SECONDS", "4"))
+RERANK_MIN_SECONDS = float(os.getenv("RERANK_MIN_SECONDS", "2"))
+ANSWER_MIN_SECONDS = float(os.getenv("ANSWER_MIN_SECONDS", "0.5"))
+# send a duplicate LLM request when the first has not answered after this long (0 disables)
+HEDGE_AFTER_SECONDS = float(os.getenv("HEDGE_AFTER_SECONDS", "1.5"))
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Deadline:
+    """
+    Per-request time budget threaded through the pipeline. Stages check
+    `allows()` before starting, run under `stage()` so their duration is
+    recorded (also in the claimiq_stage_seconds histogram, under `pipeline`),
+    and `report()` is returned with the response.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, pipeline: str = "query"):
+        self.seconds = QUERY_DEADLINE_SECONDS if seconds is None else seconds
+        self.pipeline = pipeline
+        # LLM usage of the request, when it runs under metrics.trace()
+        self.trace = current_trace()
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.seconds
+        self.stages: List[Dict[str, Any]] = []
+        self.hedges = 0
+
+    def remaining(self) -> float:
+        return self.expires_at - time.monotonic()
+
+    def allows(self, min_seconds: float) -> bool:
+        return self.remaining() >= min_seconds
+
+    @property
+    def degraded(self) -> bool:
+        return any(s["status"] in ("skipped", "timeout", "failed", "fallback") for s in self.stages)
+
+    @contextmanager
+    def stage(self, name: str):
+        """
+        Time a stage. The body may set entry["status"] (e.g. "fallback");
+        DeadlineExceeded is recorded as "timeout", other errors as "failed",
+        and both are re-raised.
+        """
+        entry = {"stage": name, "status": "ok"}
+        start = time.monotonic()
+        try:
+            yield entry
+        except DeadlineExceeded:
+            entry["status"] = "timeout"
+            raise
+        except Exception:
+            entry["status"] = "failed"
+            raise
+        finally:
+            seconds = time.monotonic() - start
+            entry["ms"] = round(1000 * seconds, 1)
+            self.stages.append(entry)
+            observe_stage(name, seconds, entry["status"], pipeline=self.pipeline)
+
+    def skip(self, name: str) -> None:
+        self.stages.append({"stage": name, "status": "skipped", "ms": 0.0})
+
+    def bypass(self, name: str, reason: str) -> None:
+        # not run because it was not needed; unlike skip() this is not degradation
+        self.stages.append({"stage": name, "status": "bypassed", "reason": reason, "ms": 0.0})
+
+    def report(self) -> Dict[str, Any]:
+        report = {
+            "deadline_ms": round(1000 * self.seconds),
+            "elapsed_ms": round(1000 * (time.monotonic() - self.started_at), 1),
+            "degraded": self.degraded,
+            "hedged_calls": self.hedges,
+            "stages": list(self.stages),
+        }
+        if self.trace is not None:
+            report["llm"] = self.trace.report()["llm"]
+        return report
+
+
+# ===== Hedged calls =====
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm")
+        return _executor
+
+
+def call_with_deadline(fn: Callable[[], Any], deadline: Optional[Deadline],
+                       hedge_after: float = HEDGE_AFTER_SECONDS) -> Any:
+    """
+    Run a blocking call within the deadline; if it has not returned after
+    `hedge_after` seconds a duplicate is sent and the first result wins.
+    Raises DeadlineExceeded when neither returns in time (the calls finish
+    in the background; their results are dropped).
+    """
+    if deadline is None:
+        return fn()
+    if deadline.remaining() <= 0:
+        raise DeadlineExceeded()
+    executor = _get_executor()
+    # calls run in the caller's context so LLM usage lands in its trace
+    pending = {executor.submit(contextvars.copy_context().run, fn)}
+    hedged = False
+    error: Optional[BaseException] = None
+    while pending:
+        timeout = deadline.remaining()
+        if not hedged and hedge_after:
+            timeout = min(timeout, hedge_after)
+        done, pending = wait(pending, timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+        for f in done:
+            if f.exception() is None:
+                return f.result()
+            error = f.exception()
+        if not done:
+            if deadline.remaining() <= 0:
+                raise DeadlineExceeded()
+            if not hedged and hedge_after:
+                hedged = True
+                deadline.hedges += 1
+                pending.add(executor.submit(contextvars.copy_context().run, fn))
+    raise error
+
+
+async def acall_with_deadline(make_call: Callable[[], Awaitable[Any]], deadline: Optional[Deadline],
+                              hedge_after: float = HEDGE_AFTER_SECONDS) -> Any:
+    """
+    Async call_with_deadline; losing and timed-out requests are cancelled.
+    """
+    if deadline is None:
+        return await make_call()
+    if deadline.remaining() <= 0:
+        raise DeadlineExceeded()
+    pending = {asyncio.ensure_future(make_call())}
+    hedged = False
+    error: Optional[BaseException] = None
+    try:
+        while pending:
+            timeout = deadline.remaining()
+            if not hedged and hedge_after:
+                timeout = min(timeout, hedge_after)
+            done, pending = await asyncio.wait(pending, timeout=max(timeout, 0),
+                                               return_when=asyncio.FIRST_COMPLETED)
+            for t in done:
+                if t.exception() is None:
+                    return t.result()
+                error = t.exception()
+            if not done:
+                if deadline.remaining() <= 0:
+                    raise DeadlineExceeded()
+                if not hedged and hedge_after:
+                    hedged = True
+                    deadline.hedges += 1
+                    pending.add(asyncio.ensure_future(make_call()))
+        raise error
+    finally:
+        for t in pending:
+            t.cancel()
+
+
+def retry_sleep(seconds: float, deadline: Optional[Deadline], operation: str = "llm") -> bool:
+    """
+    Back off before a retry unless that would run past the deadline; returns False to stop retrying.
+    """
+    if deadline is not None and deadline.remaining() <= seconds:
+        return False
+    record_retry(operation)
+    time.sleep(seconds)
+    return True
+
+
+async def aretry_sleep(seconds: float, deadline: Optional[Deadline], operation: str = "llm") -> bool:
+    if deadline is not None and deadline.remaining() <= seconds:
+        return False
+    record_retry(operation)
+    await asyncio.sleep(seconds)
+    return True
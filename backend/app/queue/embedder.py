@@ -0,0 +1,117 @@
+import os
+import time
+import random
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Any
+
+from google.genai import types
+
+from .metrics import record_retry
+
+
+# ===== Config =====
+EMBED_MODEL = os.getenv("GEMINI_EMBED_MODEL", "gemini-embedding-001")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "32"))
+EMBED_MAX_CONCURRENCY = int(os.getenv("EMBED_MAX_CONCURRENCY", "4"))
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "4"))
+
+
+class BatchEmbedder:
+    """
+    Embeds texts with the Gemini embed_content API in multi-text batches.
+
+    At most `max_concurrency` batches are in flight at once, failed batches are
+    retried with exponential backoff, and vectors come back in input order.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        dims: int = 768,
+        model: str = EMBED_MODEL,
+        batch_size: int = EMBED_BATCH_SIZE,
+        max_concurrency: int = EMBED_MAX_CONCURRENCY,
+        max_retries: int = EMBED_MAX_RETRIES,
+        backoff: float = 0.5,
+    ):
+        self.client = client
+        self.dims = dims
+        self.model = model
+        self.batch_size = max(1, batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(1, max_retries)
+        self.backoff = backoff
+
+    def _config(self):
+        return types.EmbedContentConfig(output_dimensionality=self.dims)
+
+    def _vectors(self, response: Any, batch: List[str]) -> List[List[float]]:
+        vectors = [e.values for e in response.embeddings]
+        if len(vectors) != len(batch):
+            raise ValueError(
+                f"expected {len(batch)} embeddings, got {len(vectors)}")
+        return vectors
+
+    def _retry_delay(self, batch: List[str], attempt: int, error: Exception) -> float:
+        print(
+            f"[embedder] batch of {len(batch)} failed on attempt {attempt}: {error}. Retrying...")
+        record_retry("embed")
+        delay = self.backoff * (2 ** (attempt - 1))
+        return delay + random.uniform(0, delay / 2)
+
+    def _embed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = self.client.models.embed_content(
+                    model=self.model, contents=batch, config=self._config())
+                return self._vectors(response, batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(self._retry_delay(batch, attempt, e))
+
+    async def _aembed_batch(self, batch: List[str]) -> List[List[float]]:
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                response = await self.client.aio.models.embed_content(
+                    model=self.model, contents=batch, config=self._config())
+                return self._vectors(response, batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                await asyncio.sleep(self._retry_delay(batch, attempt, e))
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = [texts[i:i + self.batch_size]
+                   for i in range(0, len(texts), self.batch_size)]
+        if len(batches) == 1:
+            return self._embed_batch(batches[0])
+
+        # executor.map keeps results in submission order; each batch runs in a
+        # copy of the caller's context so its calls count towards the caller's trace
+        contexts = [contextvars.copy_context() for _ in batches]
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(batches))) as ex:
+            results = list(ex.map(lambda c, b: c.run(self._embed_batch, b), contexts, batches))
+        return [vector for batch in results for vector in batch]
+
+    async def aembed(self, texts: List[str]) -> List[List[float]]:
+        """
+        Async twin of embed(), using the client's `aio` surface.
+        """
+        if not texts:
+            return []
+        batches = [texts[i:i + self.batch_size]
+                   for i in range(0, len(texts), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self._aembed_batch(batch)
+
+        # gather keeps results in submission order
+        results = await asyncio.gather(*(run(b) for b in batches))
+        return [vector for batch in results for vector in batch]
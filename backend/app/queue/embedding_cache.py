@@ -0,0 +1,138 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from array import array
+from typing import List, Dict, Optional, Iterable, Tuple
+
+
+# ===== Config =====
+# empty path disables the cache
+EMBEDDING_CACHE_PATH = os.getenv(
+    "EMBEDDING_CACHE_PATH", "/mnt/uploads/.cache/embeddings.sqlite3")
+EMBEDDING_CACHE_MAX_ENTRIES = int(
+    os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "500000"))
+
+
+class EmbeddingCache:
+    """
+    Disk-backed, content-addressed embedding cache (SQLite).
+
+    Keys are sha256(model, dims, text); vectors are stored as float32 blobs.
+    Reads bump `last_access`, and writes evict the least recently used rows
+    once the table grows past `max_entries`, down to 95% of it. Writes keep
+    a running row estimate (replacements count as new rows), so the table is
+    only counted when that estimate crosses `max_entries`, not per write.
+    """
+
+    def __init__(self, path: str = EMBEDDING_CACHE_PATH, max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES):
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_access REAL NOT NULL)")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_access ON embeddings(last_access)")
+        # upper bound for this process's writes; other processes sharing the file evict on their own
+        self._estimated_rows = self._count()
+
+    @staticmethod
+    def make_key(text: str, model: str, dims: int) -> str:
+        h = hashlib.sha256()
+        h.update(f"{model}\0{dims}\0".encode("utf-8"))
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # stay well below SQLite's bound-parameter limit
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                marks = ",".join("?" * len(part))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", part).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+                if rows:
+                    self._conn.execute(
+                        f"UPDATE embeddings SET last_access = ? WHERE key IN ({marks})",
+                        [time.time(), *part])
+            hits = sum(1 for k in keys if k in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, items: Iterable[Tuple[str, List[float]]]):
+        now = time.time()
+        rows = [(key, array("f", vector).tobytes(), now) for key, vector in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_access) VALUES (?, ?, ?)", rows)
+            self._conn.execute("COMMIT")
+            self._estimated_rows += len(rows)
+            if self._estimated_rows > self.max_entries:
+                self._evict()
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def _evict(self):
+        count = self._count()
+        if count <= self.max_entries:
+            self._estimated_rows = count
+            return
+        # evict past the cap, so the next count is another 5% of writes away
+        excess = count - (self.max_entries - self.max_entries // 20)
+        self._conn.execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            "SELECT key FROM embeddings ORDER BY last_access ASC LIMIT ?)", (excess,))
+        self.evictions += excess
+        self._estimated_rows = count - excess
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            entries = self._count()
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "entries": entries}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_disabled = False
+_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Process-wide cache instance, or None when disabled or unavailable.
+    """
+    global _cache, _cache_disabled
+    if not EMBEDDING_CACHE_PATH or _cache_disabled:
+        return None
+    with _cache_lock:
+        if _cache is None and not _cache_disabled:
+            try:
+                _cache = EmbeddingCache()
+            except (OSError, sqlite3.Error) as e:
+                print(f"[embedding cache] disabled: {e}")
+                _cache_disabled = True
+        return _cache
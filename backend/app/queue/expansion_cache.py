@@ -0,0 +1,150 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from redis import Redis, RedisError
+
+from .answer_cache import normalize_query
+
+
+# ===== Config =====
+EXPANSION_CACHE_ENABLED = os.getenv("EXPANSION_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+EXPANSION_CACHE_TTL = int(os.getenv("EXPANSION_CACHE_TTL", "86400"))
+EXPANSION_CACHE_MAX_ENTRIES = int(os.getenv("EXPANSION_CACHE_MAX_ENTRIES", "4096"))
+# shared tier across API replicas; empty disables it
+EXPANSION_CACHE_REDIS_URL = os.getenv(
+    "EXPANSION_CACHE_REDIS_URL", os.getenv("REDIS_URL", "redis://valkey:6379"))
+# skip expansion for queries that are short, name exact identifiers, or were well served without it
+ADAPTIVE_EXPANSION = os.getenv("ADAPTIVE_EXPANSION", "true").lower() in ("1", "true", "yes")
+EXPANSION_SKIP_MAX_WORDS = int(os.getenv("EXPANSION_SKIP_MAX_WORDS", "3"))
+
+# clause numbers ("4.2"), ICD codes ("E11.9"), quoted phrases
+SPECIFIC_RE = re.compile(r"\b[a-z]?\d+(?:\.\d+)+\b|\b[a-z]\d{2}(?:\.\d+)?\b|\"[^\"]+\"", re.IGNORECASE)
+
+
+class ExpansionCache:
+    """
+    create_queries() results by normalized query text, in a local LRU and in
+    Valkey. Expansions do not depend on the indexed documents, so entries
+    only expire by TTL. A second entry, keyed by collection and search scope
+    as well, records that the raw query was well served there (expansion
+    found nothing the raw search had not), which makes later lookups for
+    that collection and scope skip expansion.
+    """
+
+    def __init__(self, redis: Optional[Redis] = None, ttl: int = EXPANSION_CACHE_TTL,
+                 max_entries: int = EXPANSION_CACHE_MAX_ENTRIES):
+        self.redis = redis
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._redis_down_until = 0.0
+
+    def _redis_call(self, method: str, *args):
+        if self.redis is None or time.time() < self._redis_down_until:
+            return None
+        try:
+            return getattr(self.redis, method)(*args)
+        except RedisError as e:
+            print(f"[expansion cache] valkey unavailable, using local tier only for 30s: {e}")
+            self._redis_down_until = time.time() + 30
+            return None
+
+    @staticmethod
+    def _key(query: str, collection_name: Optional[str] = None, scope: str = "") -> str:
+        # expansions: the query alone; well-served marks: collection + scope + query
+        normalized = normalize_query(query)
+        if collection_name is None:
+            return normalized
+        return json.dumps([collection_name, scope, normalized])
+
+    @staticmethod
+    def _redis_key(key: str) -> str:
+        return "expansion:" + hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def lookup(self, query: str, collection_name: str, scope: str = "") -> Optional[Dict[str, Any]]:
+        """
+        {"well_served": True} when the query was well served in this collection
+        and scope, else {"queries": [...]} when it was expanded before, or None.
+        """
+        keys = [self._key(query, collection_name, scope), self._key(query)]
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                item = self._local.get(key)
+                if item is not None and item[0] >= now:
+                    self._local.move_to_end(key)
+                    self.hits += 1
+                    return item[1]
+        # both keys in one round trip
+        raws = self._redis_call("mget", [self._redis_key(key) for key in keys]) or []
+        for key, raw in zip(keys, raws):
+            if raw:
+                entry = json.loads(raw)
+                self._local_put(key, entry)
+                self.hits += 1
+                return entry
+        self.misses += 1
+        return None
+
+    def _local_put(self, key: str, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            self._local[key] = (time.time() + self.ttl, entry)
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+    def _put(self, key: str, entry: Dict[str, Any]) -> None:
+        self._local_put(key, entry)
+        self._redis_call("setex", self._redis_key(key), self.ttl, json.dumps(entry))
+
+    def put(self, query: str, queries: List[str]) -> None:
+        self._put(self._key(query), {"queries": queries})
+
+    def mark_well_served(self, query: str, collection_name: str, scope: str = "") -> None:
+        self._put(self._key(query, collection_name, scope), {"well_served": True})
+
+    def stats(self) -> Dict[str, Any]:
+        return {"hits": self.hits, "misses": self.misses, "local_entries": len(self._local)}
+
+
+_cache: Optional[ExpansionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_expansion_cache() -> Optional[ExpansionCache]:
+    """
+    Process-wide expansion cache, or None when EXPANSION_CACHE_ENABLED is off.
+    """
+    global _cache
+    if not EXPANSION_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            redis = Redis.from_url(EXPANSION_CACHE_REDIS_URL, socket_timeout=0.5,
+                                   socket_connect_timeout=0.5) if EXPANSION_CACHE_REDIS_URL else None
+            _cache = ExpansionCache(redis=redis)
+        return _cache
+
+
+def skip_reason(query: str, entry: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """
+    Why expansion is not worth an LLM call for this query (given its cache entry), or None.
+    """
+    if not ADAPTIVE_EXPANSION:
+        return None
+    if len(normalize_query(query).split()) <= EXPANSION_SKIP_MAX_WORDS:
+        return "short"
+    if SPECIFIC_RE.search(query):
+        return "specific"
+    if entry and entry.get("well_served"):
+        return "well_served"
+    return None
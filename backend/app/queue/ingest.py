@@ -0,0 +1,194 @@
+import os
+import json
+import uuid
+import hashlib
+from typing import Iterator, List, Dict, Any, Callable, Tuple, Optional, Set
+
+from langchain_core.documents import Document
+
+from .metrics import span
+from .pdf_loaders import iter_pdf_pages
+
+
+# ===== Config =====
+# chunks embedded + upserted per batch; bounds worker memory regardless of PDF size
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "64"))
+
+
+# fixed namespace so chunk ids are stable across processes and releases
+CHUNK_ID_NAMESPACE = uuid.UUID("6f1c1c52-6e4b-4c43-9a39-2f1d1a8f5a10")
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(document_id: str, text: str) -> str:
+    """
+    Deterministic point id for a chunk: uuid5(document identity, content hash).
+    Re-ingesting the same chunk of the same document overwrites instead of duplicating.
+    """
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, f"{document_id}\0{content_hash(text)}"))
+
+
+def normalize_point_id(point_id: Any) -> str:
+    # Qdrant may hand uuids back with or without dashes
+    return str(uuid.UUID(str(point_id)))
+
+
+# ===== Checkpoints =====
+def checkpoint_path_for(file_path: str) -> str:
+    return f"{file_path}.ingest.json"
+
+
+def load_checkpoint(path: str) -> Dict[str, Any]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"next_page": 0, "chunks": 0}
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    # write-then-rename so a crash never leaves a torn checkpoint behind
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def clear_checkpoint(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+# ===== Pipeline stages (generators) =====
+def iter_pages(file_path: str, start_page: int = 0, stop_page: Optional[int] = None) -> Iterator[Tuple[int, Document]]:
+    """
+    Yield (page_index, page) one page at a time for start_page <= index < stop_page.
+    Extraction runs ahead in page ranges on PDF_WORKERS processes (see app/queue/pdf_loaders.py).
+    """
+    return iter_pdf_pages(file_path, start_page, stop_page)
+
+
+def iter_chunk_batches(pages: Iterator[Tuple[int, Document]], splitter: Any,
+                       batch_size: int = INGEST_BATCH_SIZE) -> Iterator[Tuple[int, List[Document]]]:
+    """
+    Split pages into chunks and yield (last_page_index, chunks) batches.
+
+    Batches are cut on page boundaries, so once a batch is committed every page
+    up to `last_page_index` is fully stored and a retry can resume after it.
+    """
+    buffer: List[Document] = []
+    last_page = -1
+    for index, page in pages:
+        with span("split"):
+            buffer.extend(splitter.split_documents([page]))
+        last_page = index
+        if len(buffer) >= batch_size:
+            yield last_page, buffer
+            buffer = []
+    if buffer or last_page >= 0:
+        yield last_page, buffer
+
+
+def stream_ingest(
+    file_path: str,
+    splitter: Any,
+    upsert: Callable[[List[Document], List[str]], None],
+    source_document: Optional[str] = None,
+    document_id: Optional[str] = None,
+    existing_ids: Optional[Set[str]] = None,
+    delete: Optional[Callable[[List[str]], None]] = None,
+    batch_size: int = INGEST_BATCH_SIZE,
+    checkpoint_path: Optional[str] = None,
+    on_chunks: Optional[Callable[[List[Document]], None]] = None,
+) -> Dict[str, Any]:
+    """
+    page -> split -> embed/upsert batch, holding at most one batch in memory.
+
+    Chunk ids are derived from (document_id, chunk content), so upserts are
+    idempotent. Passing `existing_ids` (the ids already stored for this
+    document) switches to re-index mode: only unseen chunks are embedded and
+    upserted, and ids that no longer occur are handed to `delete` at the end.
+
+    `on_chunks` sees every current chunk of the document (tagged, including
+    unchanged ones), e.g. to build side indexes; after a resume the pages
+    committed earlier are re-split and replayed to it first.
+
+    Progress is checkpointed after every committed batch; re-running the same
+    file resumes from the first uncommitted page. The checkpoint is removed
+    once the whole file is stored.
+    """
+    reindex = existing_ids is not None
+    checkpoint_path = checkpoint_path or checkpoint_path_for(file_path)
+    state = load_checkpoint(checkpoint_path)
+    resumed_from = state["next_page"]
+    if resumed_from:
+        print(f"[ingest] resuming {file_path} from page {resumed_from}")
+
+    source_document = source_document or os.path.basename(file_path)
+    document_id = document_id or source_document
+    # ids produced so far; kept in the checkpoint so a resumed re-index still
+    # knows which stored chunks are current
+    seen: Set[str] = set(state.get("seen_ids", []))
+    embedded = state.get("embedded", 0)
+
+    def tag(d: Document) -> str:
+        # attach metadata: stable id, document identity, source filename, page number if available
+        cid = chunk_id(document_id, d.page_content)
+        d.metadata = d.metadata or {}
+        d.metadata["_chunk_id"] = cid
+        d.metadata["document_id"] = document_id
+        d.metadata["source_document"] = source_document
+        return cid
+
+    if resumed_from and on_chunks is not None:
+        replayed = iter_chunk_batches(
+            iter_pages(file_path, stop_page=resumed_from), splitter, batch_size)
+        for _, chunks in replayed:
+            for d in chunks:
+                tag(d)
+            on_chunks(chunks)
+
+    batches = iter_chunk_batches(
+        iter_pages(file_path, start_page=resumed_from), splitter, batch_size)
+    for last_page, chunks in batches:
+        fresh, ids, current = [], [], []
+        for d in chunks:
+            cid = tag(d)
+            if cid in seen:
+                continue
+            seen.add(cid)
+            current.append(d)
+            if reindex and cid in existing_ids:
+                continue
+            fresh.append(d)
+            ids.append(cid)
+        if on_chunks is not None and current:
+            on_chunks(current)
+        if fresh:
+            upsert(fresh, ids)
+            embedded += len(fresh)
+        state = {"next_page": last_page + 1,
+                 "chunks": state["chunks"] + len(chunks),
+                 "embedded": embedded}
+        if reindex:
+            state["seen_ids"] = sorted(seen)
+        save_checkpoint(checkpoint_path, state)
+        print(f"[ingest] committed pages <= {last_page} ({state['chunks']} chunks)")
+
+    deleted = 0
+    if reindex and delete is not None:
+        stale = sorted(existing_ids - seen)
+        if stale:
+            delete(stale)
+        deleted = len(stale)
+
+    clear_checkpoint(checkpoint_path)
+    return {"pages": state["next_page"], "chunks": state["chunks"],
+            "embedded": embedded, "deleted": deleted,
+            "unchanged": len(seen) - embedded if reindex else 0,
+            "resumed_from_page": resumed_from}
@@ -0,0 +1,283 @@
+import os
+import io
+import re
+import time
+import uuid
+import hashlib
+import threading
+from collections import Counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple, Iterable
+
+import numpy as np
+
+
+# ===== Config =====
+LEXICAL_INDEX_DIR = os.getenv("LEXICAL_INDEX_DIR", "/mnt/uploads/.lexical")
+# how often a query-side index checks disk for new segments
+LEXICAL_RELOAD_INTERVAL = float(os.getenv("LEXICAL_RELOAD_INTERVAL", "5"))
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# words, plus identifiers such as "4.2", "e11.9", "co-pay", "1/2"
+TOKEN_RE = re.compile(r"[a-z0-9]+(?:[.\-/][a-z0-9]+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_RE.findall(text.lower())
+
+
+def _segment_name(document_id: str) -> str:
+    return hashlib.sha1(document_id.encode("utf-8")).hexdigest()[:20] + ".npz"
+
+
+def _join(strings: Iterable[str]) -> np.ndarray:
+    return np.frombuffer("\n".join(strings).encode("utf-8"), dtype=np.uint8)
+
+
+def _split(blob: np.ndarray) -> List[str]:
+    text = blob.tobytes().decode("utf-8")
+    return text.split("\n") if text else []
+
+
+class SegmentBuilder:
+    """
+    Accumulates one document's chunks and writes them as an immutable segment:
+    CSR postings (term offsets, doc indexes, term frequencies), doc lengths and
+    16-byte point ids, all as flat NumPy arrays.
+    """
+
+    def __init__(self, document_id: str):
+        self.document_id = document_id
+        self._vocab: Dict[str, int] = {}
+        self._terms: List[int] = []
+        self._docs: List[int] = []
+        self._tfs: List[int] = []
+        self._doc_lens: List[int] = []
+        self._point_ids: List[bytes] = []
+
+    def add(self, point_id: str, text: str) -> None:
+        tokens = tokenize(text)
+        doc = len(self._doc_lens)
+        for term, tf in Counter(tokens).items():
+            self._terms.append(self._vocab.setdefault(term, len(self._vocab)))
+            self._docs.append(doc)
+            self._tfs.append(tf)
+        self._doc_lens.append(len(tokens))
+        self._point_ids.append(uuid.UUID(str(point_id)).bytes)
+
+    def write(self, index_dir: str) -> str:
+        os.makedirs(index_dir, exist_ok=True)
+        terms = np.asarray(self._terms, dtype=np.int32)
+        docs = np.asarray(self._docs, dtype=np.int32)
+        tfs = np.asarray(self._tfs, dtype=np.uint32)
+        # group postings by term -> CSR
+        order = np.lexsort((docs, terms))
+        counts = np.bincount(terms, minlength=len(self._vocab))
+        offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        vocab = sorted(self._vocab, key=self._vocab.get)
+
+        path = os.path.join(index_dir, _segment_name(self.document_id))
+        buffer = io.BytesIO()
+        np.savez(
+            buffer,
+            document_id=_join([self.document_id]),
+            terms=_join(vocab),
+            term_offsets=offsets,
+            post_docs=docs[order],
+            post_tfs=tfs[order],
+            doc_lens=np.asarray(self._doc_lens, dtype=np.int32),
+            point_ids=np.frombuffer(b"".join(self._point_ids), dtype=np.uint8).reshape(-1, 16),
+        )
+        # write-then-rename so readers never see a partial segment
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(buffer.getvalue())
+        os.replace(tmp, path)
+        return path
+
+
+class _Segment(NamedTuple):
+    # one segment file as read from disk, with its terms mapped to the index-wide vocabulary
+    mtime_ns: int
+    document_id: str
+    terms: np.ndarray       # vocabulary id per posting
+    post_docs: np.ndarray   # segment-local doc index per posting
+    post_tfs: np.ndarray
+    doc_lens: np.ndarray
+    point_ids: np.ndarray
+
+
+class _Snapshot(NamedTuple):
+    # everything search() reads; replaced as a whole, never modified
+    signature: Tuple
+    vocab: Dict[str, int]
+    offsets: np.ndarray
+    post_docs: np.ndarray
+    post_tfs: np.ndarray
+    norm: np.ndarray        # BM25 length normalisation per doc
+    point_ids: np.ndarray
+    spans: List[Tuple[str, int, int]]  # (document_id, first doc, end doc) per segment, for scoped searches
+
+
+_EMPTY = _Snapshot((), {}, np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int32),
+                   np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.float32),
+                   np.zeros((0, 16), dtype=np.uint8), [])
+
+
+class LexicalIndex:
+    """
+    Query-side BM25 index over every segment in a collection's directory,
+    merged into one in-memory CSR structure and reloaded when segments change.
+
+    A reload reads only new or changed segment files (the others are kept as
+    parsed), merges them into a fresh snapshot and swaps it in with one
+    assignment; a search works on the snapshot it started with.
+    """
+
+    def __init__(self, index_dir: str):
+        self.index_dir = index_dir
+        self._lock = threading.Lock()
+        self._checked_at = 0.0
+        self._state = _EMPTY
+        # only touched under _lock: parsed segments by file name, and the
+        # append-only vocabulary their term ids refer to
+        self._loaded: Dict[str, _Segment] = {}
+        self._vocab: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._state.norm)
+
+    def _disk_signature(self) -> Tuple:
+        try:
+            names = sorted(n for n in os.listdir(self.index_dir) if n.endswith(".npz"))
+        except FileNotFoundError:
+            return ()
+        return tuple((n, os.stat(os.path.join(self.index_dir, n)).st_mtime_ns) for n in names)
+
+    def refresh(self, force: bool = False) -> None:
+        now = time.time()
+        if not force and now - self._checked_at < LEXICAL_RELOAD_INTERVAL:
+            return
+        with self._lock:
+            self._checked_at = now
+            signature = self._disk_signature()
+            if signature != self._state.signature:
+                self._state = self._load(signature)
+
+    def _read_segment(self, name: str, mtime_ns: int) -> Optional[_Segment]:
+        try:
+            with np.load(os.path.join(self.index_dir, name)) as seg:
+                mapping = np.asarray([self._vocab.setdefault(t, len(self._vocab)) for t in _split(seg["terms"])],
+                                     dtype=np.int32)
+                return _Segment(mtime_ns, _split(seg["document_id"])[0],
+                                np.repeat(mapping, np.diff(seg["term_offsets"])),
+                                seg["post_docs"], seg["post_tfs"], seg["doc_lens"], seg["point_ids"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[lexical] skipping unreadable segment {name}: {e}")
+            return None
+
+    def _load(self, signature: Tuple) -> _Snapshot:
+        loaded: Dict[str, _Segment] = {}
+        for name, mtime_ns in signature:
+            segment = self._loaded.get(name)
+            if segment is None or segment.mtime_ns != mtime_ns:
+                segment = self._read_segment(name, mtime_ns)
+            if segment is not None:
+                loaded[name] = segment
+        self._loaded = loaded
+        segments = list(loaded.values())
+        # a copy, so later reloads can grow the vocabulary without touching this snapshot
+        vocab = dict(self._vocab)
+        if not segments:
+            return _EMPTY._replace(signature=signature, vocab=vocab,
+                                   offsets=np.zeros(len(vocab) + 1, dtype=np.int64))
+        bases = np.cumsum([0] + [len(seg.doc_lens) for seg in segments])
+        all_terms = np.concatenate([seg.terms for seg in segments])
+        order = np.argsort(all_terms, kind="stable")
+        doc_lens = np.concatenate([seg.doc_lens for seg in segments]).astype(np.float32)
+        return _Snapshot(
+            signature=signature,
+            vocab=vocab,
+            offsets=np.concatenate(([0], np.cumsum(np.bincount(all_terms, minlength=len(vocab))))).astype(np.int64),
+            post_docs=np.concatenate([seg.post_docs + base for seg, base in zip(segments, bases)])[order],
+            post_tfs=np.concatenate([seg.post_tfs for seg in segments])[order].astype(np.float32),
+            norm=BM25_K1 * (1 - BM25_B + BM25_B * doc_lens / doc_lens.mean()),
+            point_ids=np.concatenate([seg.point_ids for seg in segments]),
+            spans=[(seg.document_id, int(first), int(end))
+                   for seg, first, end in zip(segments, bases[:-1], bases[1:])],
+        )
+
+    def search(self, query: str, top_k: int = 10,
+               documents: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        BM25 top-k as [(point_id, score), ...], best first. With `documents`,
+        only chunks of documents (by document_id) it accepts are ranked;
+        statistics stay those of the whole collection.
+        """
+        self.refresh()
+        state = self._state
+        n_docs = len(state.norm)
+        if n_docs == 0:
+            return []
+        scores = np.zeros(n_docs, dtype=np.float32)
+        norm = state.norm
+        for term in set(tokenize(query)):
+            tid = state.vocab.get(term)
+            if tid is None:
+                continue
+            start, end = state.offsets[tid], state.offsets[tid + 1]
+            docs = state.post_docs[start:end]
+            tf = state.post_tfs[start:end]
+            df = end - start
+            idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            # a term's postings hold each doc at most once
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + norm[docs])
+        if documents is not None:
+            allowed = np.zeros(n_docs, dtype=bool)
+            for document_id, first, end in state.spans:
+                if documents(document_id):
+                    allowed[first:end] = True
+            scores[~allowed] = 0
+        k = min(top_k, int(np.count_nonzero(scores)))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(str(uuid.UUID(bytes=state.point_ids[i].tobytes())), float(scores[i])) for i in top]
+
+
+# ===== Per-collection registry =====
+_indexes: Dict[str, LexicalIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def collection_dir(collection_name: str) -> str:
+    return os.path.join(LEXICAL_INDEX_DIR, collection_name)
+
+
+def get_lexical_index(collection_name: str) -> LexicalIndex:
+    with _indexes_lock:
+        index = _indexes.get(collection_name)
+        if index is None:
+            index = _indexes[collection_name] = LexicalIndex(collection_dir(collection_name))
+        return index
+
+
+def write_segment(collection_name: str, builder: SegmentBuilder) -> Optional[str]:
+    """
+    Persist a document's segment (replacing any previous one for the same document).
+    """
+    if not LEXICAL_INDEX_DIR:
+        return None
+    return builder.write(collection_dir(collection_name))
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60) -> List[str]:
+    """
+    Fuse ranked id lists: score(id) = sum over lists of 1 / (k + rank).
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, 1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores, key=scores.get, reverse=True)
@@ -0,0 +1,357 @@
+import os
+import time
+import bisect
+import asyncio
+import functools
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# ===== Config =====
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+# seconds; stages range from sub-millisecond lookups to multi-minute embeds of large PDFs
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+LLM_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = ()):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labelnames: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = STAGE_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[n]) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = 'le="+Inf"' if bound == float("inf") else f'le="{bound:g}"'
+                    lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {total:.6f}")
+                lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+STAGE_SECONDS = Histogram(
+    "claimiq_stage_seconds", "Duration of ingest and query pipeline stages", ("pipeline", "stage", "status"))
+LLM_CALLS = Counter("claimiq_llm_calls_total", "Gemini API calls", ("method", "outcome"))
+LLM_SECONDS = Histogram("claimiq_llm_call_seconds", "Gemini API call latency", ("method",), LLM_BUCKETS)
+LLM_RETRIES = Counter("claimiq_llm_retries_total", "Retried Gemini operations", ("operation",))
+LLM_TOKENS = Counter("claimiq_llm_tokens_total", "Gemini tokens reported in usage metadata", ("method", "kind"))
+EMBEDDED_TEXTS = Counter("claimiq_embedded_texts_total", "Texts sent to the embedding API")
+REGISTRY = [STAGE_SECONDS, LLM_CALLS, LLM_SECONDS, LLM_RETRIES, LLM_TOKENS, EMBEDDED_TEXTS]
+
+
+def render_metrics() -> str:
+    """
+    Every metric in the Prometheus text exposition format (version 0.0.4).
+    """
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+# ===== Traces: per-file / per-request breakdown =====
+class Trace:
+    """
+    Stage timings and LLM usage of one operation (an ingest job, a query).
+    Spans add to the trace active in their context; the trace is shared with
+    threads started through asyncio.to_thread / copy_context().
+    """
+
+    def __init__(self, pipeline: str):
+        self.pipeline = pipeline
+        self.started_at = time.monotonic()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.llm = {"calls": 0, "errors": 0, "retries": 0, "prompt_tokens": 0,
+                    "output_tokens": 0, "embedded_texts": 0}
+        self._lock = threading.Lock()
+
+    def add_stage(self, stage: str, seconds: float) -> None:
+        with self._lock:
+            entry = self.stages.setdefault(stage, {"seconds": 0.0, "count": 0})
+            entry["seconds"] += seconds
+            entry["count"] += 1
+
+    def add_llm(self, **counts: int) -> None:
+        with self._lock:
+            for key, value in counts.items():
+                self.llm[key] += value
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "pipeline": self.pipeline,
+                "total_seconds": round(time.monotonic() - self.started_at, 4),
+                "stages": {k: {"seconds": round(v["seconds"], 4), "count": v["count"]}
+                           for k, v in self.stages.items()},
+                "llm": dict(self.llm),
+            }
+
+
+_current: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar("claimiq_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def trace(pipeline: str) -> Iterator[Trace]:
+    """
+    Make a new Trace current for the body; its total is observed as stage "total".
+    Inside a trace of the same pipeline (put_pdf within process_file) that one is reused.
+    """
+    current = _current.get()
+    if current is not None and current.pipeline == pipeline:
+        yield current
+        return
+    t = Trace(pipeline)
+    token = _current.set(t)
+    status = "ok"
+    try:
+        yield t
+    except Exception:
+        status = "failed"
+        raise
+    finally:
+        _current.reset(token)
+        observe_stage("total", time.monotonic() - t.started_at, status, pipeline=pipeline)
+
+
+def traced(pipeline: str) -> Callable:
+    """
+    Decorator: run a function (sync or async) under trace(pipeline).
+    """
+    def decorate(fn: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with trace(pipeline):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with trace(pipeline):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def observe_stage(stage: str, seconds: float, status: str = "ok", pipeline: Optional[str] = None) -> None:
+    t = _current.get()
+    if t is not None and stage != "total":
+        t.add_stage(stage, seconds)
+    if METRICS_ENABLED:
+        STAGE_SECONDS.observe(seconds, pipeline=pipeline or (t.pipeline if t else "other"),
+                              stage=stage, status=status)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """
+    Time a stage of the current pipeline (histogram + current trace).
+    """
+    start = time.monotonic()
+    status = "ok"
+    try:
+        yield
+    except Exception:
+        status = "failed"
+        raise
+    finally:
+        observe_stage(stage, time.monotonic() - start, status)
+
+
+def record_retry(operation: str) -> None:
+    if METRICS_ENABLED:
+        LLM_RETRIES.inc(operation=operation)
+    t = _current.get()
+    if t is not None:
+        t.add_llm(retries=1)
+
+
+def record_llm_call(method: str, seconds: float, error: bool = False, response: Any = None,
+                    texts: int = 0) -> None:
+    usage = getattr(response, "usage_metadata", None)
+    prompt = getattr(usage, "prompt_token_count", None) or 0
+    output = getattr(usage, "candidates_token_count", None) or 0
+    if METRICS_ENABLED:
+        LLM_CALLS.inc(method=method, outcome="error" if error else "ok")
+        LLM_SECONDS.observe(seconds, method=method)
+        if prompt:
+            LLM_TOKENS.inc(prompt, method=method, kind="prompt")
+        if output:
+            LLM_TOKENS.inc(output, method=method, kind="output")
+        if texts:
+            EMBEDDED_TEXTS.inc(texts)
+    t = _current.get()
+    if t is not None:
+        t.add_llm(calls=1, errors=int(error), prompt_tokens=prompt, output_tokens=output, embedded_texts=texts)
+
+
+# ===== Instrumented Gemini client =====
+def _texts(contents: Any) -> int:
+    return 1 if isinstance(contents, str) else len(contents)
+
+
+class _Models:
+    def __init__(self, models: Any):
+        self._models = models
+
+    def _call(self, method: str, fn, texts: int = 0, **kwargs):
+        start = time.monotonic()
+        try:
+            response = fn(**kwargs)
+        except Exception:
+            record_llm_call(method, time.monotonic() - start, error=True)
+            raise
+        record_llm_call(method, time.monotonic() - start, response=response, texts=texts)
+        return response
+
+    def embed_content(self, *, model: str, contents: Any, config: Any = None):
+        return self._call("embed_content", self._models.embed_content, _texts(contents),
+                          model=model, contents=contents, config=config)
+
+    def generate_content(self, *, model: str, contents: Any, config: Any = None):
+        return self._call("generate_content", self._models.generate_content,
+                          model=model, contents=contents, config=config)
+
+    def __getattr__(self, name: str):
+        return getattr(self._models, name)
+
+
+class _AsyncModels(_Models):
+    async def _acall(self, method: str, fn, texts: int = 0, **kwargs):
+        start = time.monotonic()
+        try:
+            response = await fn(**kwargs)
+        except Exception:
+            record_llm_call(method, time.monotonic() - start, error=True)
+            raise
+        record_llm_call(method, time.monotonic() - start, response=response, texts=texts)
+        return response
+
+    async def embed_content(self, *, model: str, contents: Any, config: Any = None):
+        return await self._acall("embed_content", self._models.embed_content, _texts(contents),
+                                 model=model, contents=contents, config=config)
+
+    async def generate_content(self, *, model: str, contents: Any, config: Any = None):
+        return await self._acall("generate_content", self._models.generate_content,
+                                 model=model, contents=contents, config=config)
+
+    async def generate_content_stream(self, *, model: str, contents: Any, config: Any = None):
+        # latency is time to the first piece; tokens come from the last piece's usage metadata
+        start = time.monotonic()
+        try:
+            stream = await self._models.generate_content_stream(model=model, contents=contents, config=config)
+        except Exception:
+            record_llm_call("generate_content_stream", time.monotonic() - start, error=True)
+            raise
+        seconds = time.monotonic() - start
+
+        async def pieces():
+            last = None
+            try:
+                async for piece in stream:
+                    last = piece
+                    yield piece
+            finally:
+                record_llm_call("generate_content_stream", seconds, response=last)
+        return pieces()
+
+
+class InstrumentedGemini:
+    """
+    Wraps a google.genai Client (or a stand-in): embed/generate calls on
+    `models` and `aio.models` are counted, timed and their token usage
+    recorded. Everything else passes through.
+    """
+
+    def __init__(self, client: Any):
+        self.client = client
+        self.models = _Models(client.models)
+        self.aio = SimpleNamespace(models=_AsyncModels(client.aio.models))
+
+    def __getattr__(self, name: str):
+        return getattr(self.client, name)
+
+
+def instrument_client(client: Any) -> Any:
+    if isinstance(client, InstrumentedGemini):
+        return client
+    return InstrumentedGemini(client)
+
+
+# ===== Exposition for processes without an HTTP app (ingest workers) =====
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """
+    Serve GET /metrics on a daemon thread.
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
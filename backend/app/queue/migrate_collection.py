@@ -0,0 +1,173 @@
+"""
+Rebuild a collection under another provisioning profile without downtime:
+
+    python -m app.queue.migrate_collection pdf_collection --profile compact
+
+1. provision `<name>__<profile>_<timestamp>` under the profile (see
+   collection_profiles.py), with the payload indexes of the current one;
+2. copy every point in scroll batches: payload and full vector, with the
+   prefix vector re-cut for the new layout;
+3. sync: compare the two collections page by page and carry over what
+   changed during the copy: new points, payload updates and deletes;
+4. point alias `<name>` at the copy in one atomic alias operation. Readers
+   and writers switch with their next request; one built for the old vector
+   layout is retried once (qdrant_pool.refresh_layout);
+5. catch up: points written to the old collection by requests that resolved
+   the alias just before the swap are copied;
+6. keep the old collection for rollback (re-point the alias), unless --drop-old.
+
+A plain collection named `<name>` (created before ensure_collection put
+collections behind aliases) cannot be shadowed by an alias while it exists.
+It is cut over once, and only with --drop-old:
+
+    python -m app.queue.migrate_collection pdf_collection --profile default --drop-old
+
+steps 1-3 copy it into `<name>__v1`, new points written meanwhile are
+copied once more, then the plain collection is deleted and alias `<name>`
+is pointed at the copy. Between the last copy and the alias, writes are lost
+and reads fail (a few milliseconds on a local Qdrant): pause the ingestion
+workers for the cutover. Later migrations of `<name>` are the alias swap
+above. Without --drop-old a plain collection is refused.
+"""
+import os
+import time
+import json
+import argparse
+from typing import Any, Dict
+
+from qdrant_client.http import models as qmodels
+
+from .collection_profiles import FULL_VECTOR, PROFILES, get_profile
+from .qdrant_pool import (
+    VectorLayout, forget_collection, get_qdrant_client, point_alias, point_vector, provision_collection,
+    resolve_collection, stored_vector)
+
+
+def collection_dims(info: Any) -> int:
+    vectors = info.config.params.vectors
+    return vectors[FULL_VECTOR].size if isinstance(vectors, dict) else vectors.size
+
+
+def copy_points(source: str, target: str, layout: VectorLayout, batch_size: int = 256) -> int:
+    """
+    Copy every point from `source` to `target` (in `layout`).
+    """
+    client = get_qdrant_client()
+    copied, offset = 0, None
+    while True:
+        points, offset = client.scroll(source, limit=batch_size, offset=offset,
+                                       with_payload=True, with_vectors=True)
+        if points:
+            client.upsert(target, wait=True, points=[
+                qmodels.PointStruct(id=p.id, vector=point_vector(stored_vector(p.vector), layout), payload=p.payload)
+                for p in points])
+            copied += len(points)
+        if offset is None:
+            return copied
+
+
+def sync_points(source: str, target: str, layout: VectorLayout, batch_size: int = 256,
+                updates: bool = True, deletes: bool = True) -> Dict[str, int]:
+    """
+    Bring `target` in line with `source` one page of ids at a time: copy
+    points it is missing and, with `updates`, points whose payload differs;
+    with `deletes`, delete points `source` no longer has. Vectors are only
+    read for the points that are copied.
+    """
+    client = get_qdrant_client()
+    counts = {"copied": 0, "updated": 0, "deleted": 0}
+    offset = None
+    while True:
+        points, offset = client.scroll(source, limit=batch_size, offset=offset,
+                                       with_payload=updates, with_vectors=False)
+        present = {p.id: p.payload for p in client.retrieve(
+            target, ids=[p.id for p in points], with_payload=updates, with_vectors=False)} if points else {}
+        missing = [p.id for p in points if p.id not in present]
+        changed = [p.id for p in points if p.id in present and updates and p.payload != present[p.id]]
+        if missing or changed:
+            client.upsert(target, wait=True, points=[
+                qmodels.PointStruct(id=p.id, vector=point_vector(stored_vector(p.vector), layout), payload=p.payload)
+                for p in client.retrieve(source, ids=missing + changed, with_payload=True, with_vectors=True)])
+            counts["copied"] += len(missing)
+            counts["updated"] += len(changed)
+        if offset is None:
+            break
+    while deletes:
+        points, offset = client.scroll(target, limit=batch_size, offset=offset,
+                                       with_payload=False, with_vectors=False)
+        kept = {p.id for p in client.retrieve(source, ids=[p.id for p in points],
+                                              with_payload=False, with_vectors=False)} if points else set()
+        gone = [p.id for p in points if p.id not in kept]
+        if gone:
+            client.delete(target, points_selector=qmodels.PointIdsList(points=gone), wait=True)
+            counts["deleted"] += len(gone)
+        if offset is None:
+            break
+    return counts
+
+
+def migrate(collection_name: str, profile_name: str, batch_size: int = 256,
+            drop_old: bool = False) -> Dict[str, Any]:
+    client = get_qdrant_client()
+    source = resolve_collection(collection_name)
+    if source is None:
+        raise ValueError(f"Collection {collection_name!r} does not exist")
+    # a plain collection has to be deleted before alias `<name>` can exist
+    cutover = source == collection_name
+    if cutover and not drop_old:
+        raise ValueError(
+            f"Collection {collection_name!r} is a plain collection, not an alias: an alias cannot take "
+            f"its name while it exists, so it can only be cut over by deleting it (drop_old / --drop-old), "
+            f"with ingestion paused; see the module docstring.")
+    profile = get_profile(profile_name)
+    info = client.get_collection(source)
+    target = (f"{collection_name}__v1" if cutover
+              else f"{collection_name}__{profile_name}_{time.strftime('%Y%m%d%H%M%S')}")
+    indexes = {field: schema.data_type for field, schema in (info.payload_schema or {}).items()}
+    layout = provision_collection(target, collection_dims(info), profile, indexes)
+
+    start = time.monotonic()
+    copied = copy_points(source, target, layout, batch_size)
+    # changes made while copying, deletes and payload updates included
+    synced = sync_points(source, target, layout, batch_size)
+    if cutover:
+        # last additions before the source goes away; from here to the alias, writes are lost
+        caught_up = sync_points(source, target, layout, batch_size, updates=False, deletes=False)["copied"]
+        client.delete_collection(source)
+        point_alias(collection_name, target)
+        forget_collection(collection_name)
+    else:
+        point_alias(collection_name, target)
+        forget_collection(collection_name)
+        # new writes now go to the target; only add what in-flight requests wrote to the source
+        caught_up = sync_points(source, target, layout, batch_size, updates=False, deletes=False)["copied"]
+        if drop_old:
+            client.delete_collection(source)
+
+    return {
+        "collection": collection_name,
+        "from": source,
+        "to": target,
+        "profile": profile_name,
+        "cutover": cutover,
+        "copied": copied,
+        "synced": synced,
+        "caught_up": caught_up,
+        "points": client.count(target, exact=True).count,
+        "old_collection": "dropped" if drop_old else "kept",
+        "seconds": round(time.monotonic() - start, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("collection", nargs="?", default=os.getenv("QDRANT_COLLECTION", "pdf_collection"))
+    parser.add_argument("--profile", required=True, choices=list(PROFILES))
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--drop-old", action="store_true", help="delete the previous collection afterwards; required to cut over a plain collection")
+    args = parser.parse_args()
+    print(json.dumps(migrate(args.collection, args.profile, args.batch_size, args.drop_old), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+Page-range PDF text extraction.
+
+A PDF is cut into ranges of PDF_PAGES_PER_TASK pages that are extracted in a
+process pool (PDF_WORKERS processes) by one of several backends:
+
+- pypdf      pure Python, what PyPDFLoader uses (default)
+- pdftotext  poppler-utils CLI, shipped in the image; usually several times faster
+- pymupdf    optional, when the `pymupdf` package is installed
+
+Every backend yields the same Documents: the page text (stripped) with the
+metadata PyPDFLoader attaches: the PDF's document info (producer, creator,
+creationdate, moddate, title, ...) plus source, total_pages, page and
+page_label. Page count, labels and document info come from pypdf in the
+calling process, so they do not depend on the backend.
+"""
+import os
+import time
+import datetime
+import shutil
+import threading
+import subprocess
+import importlib.util
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+
+from pypdf import PdfReader
+from langchain_core.documents import Document
+
+from .metrics import observe_stage
+
+
+# ===== Config =====
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pypdf")
+# per ingesting process, so WORKER_PROCESSES * PDF_WORKERS extract at once;
+# 0 = one per core; 1 = extract inline, no pool
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2")) or os.cpu_count() or 1
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+PDFTOTEXT_TIMEOUT = 120
+
+
+# ===== Backends: texts of pages [first, last) =====
+def extract_pypdf(file_path: str, first: int, last: int) -> List[str]:
+    reader = PdfReader(file_path)
+    return [reader.pages[i].extract_text() for i in range(first, last)]
+
+
+def extract_pdftotext(file_path: str, first: int, last: int) -> List[str]:
+    out = subprocess.run(
+        ["pdftotext", "-q", "-enc", "UTF-8", "-f", str(first + 1), "-l", str(last), file_path, "-"],
+        capture_output=True, check=True, timeout=PDFTOTEXT_TIMEOUT)
+    # every page ends with a form feed
+    texts = out.stdout.decode("utf-8", errors="replace").split("\f")[:last - first]
+    return texts + [""] * (last - first - len(texts))
+
+
+def extract_pymupdf(file_path: str, first: int, last: int) -> List[str]:
+    import pymupdf
+    with pymupdf.open(file_path) as doc:
+        return [doc[i].get_text() for i in range(first, last)]
+
+
+BACKENDS: Dict[str, Callable[[str, int, int], List[str]]] = {
+    "pypdf": extract_pypdf,
+    "pdftotext": extract_pdftotext,
+    "pymupdf": extract_pymupdf,
+}
+
+
+def backend_available(name: str) -> bool:
+    if name == "pdftotext":
+        return shutil.which("pdftotext") is not None
+    if name == "pymupdf":
+        return importlib.util.find_spec("pymupdf") is not None
+    return name in BACKENDS
+
+
+def available_backends() -> List[str]:
+    return [name for name in BACKENDS if backend_available(name)]
+
+
+def extract_range(backend: str, file_path: str, first: int, last: int) -> List[str]:
+    # module-level so the process pool can pickle it
+    return [text.strip() for text in BACKENDS[backend](file_path, first, last)]
+
+
+# ===== Process pool =====
+_pools: Dict[int, ProcessPoolExecutor] = {}
+_pool_lock = threading.Lock()
+
+
+def get_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Shared pool per size, started on first use. Spawned rather than forked:
+    the callers (API, warm worker) are multi-threaded.
+    """
+    with _pool_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+            _pools[workers] = pool
+        return pool
+
+
+def shutdown_pools() -> None:
+    with _pool_lock:
+        for pool in _pools.values():
+            pool.shutdown(cancel_futures=True)
+        _pools.clear()
+
+
+# ===== Pages =====
+def document_metadata(reader: PdfReader, file_path: str) -> Dict[str, Any]:
+    """
+    Document-level metadata as PyPDFLoader builds it: the info dictionary
+    with keys lowercased and "/" dropped, dates as ISO strings, and
+    producer / creator / creationdate defaults.
+    """
+    info = {"producer": "PyPDF", "creator": "PyPDF", "creationdate": ""}
+    info.update(reader.metadata or {})
+    info.update(source=file_path, total_pages=len(reader.pages))
+    metadata: Dict[str, Any] = {}
+    for key, value in info.items():
+        key = key.lstrip("/").lower()
+        if not isinstance(value, (str, int)):
+            value = str(value)
+        if key in ("creationdate", "moddate"):
+            try:
+                value = datetime.datetime.strptime(value.replace("'", ""), "D:%Y%m%d%H%M%S%z").isoformat("T")
+            except ValueError:
+                pass
+        elif isinstance(value, str):
+            value = value.strip()
+        metadata[key] = value
+    return metadata
+
+
+def pdf_info(file_path: str) -> Tuple[int, List[str], Dict[str, Any]]:
+    reader = PdfReader(file_path)
+    return len(reader.pages), list(reader.page_labels), document_metadata(reader, file_path)
+
+
+def page_ranges(start: int, stop: int, size: int) -> List[Tuple[int, int]]:
+    return [(first, min(first + size, stop)) for first in range(start, stop, max(size, 1))]
+
+
+def iter_pdf_pages(file_path: str, start_page: int = 0, stop_page: Optional[int] = None,
+                   backend: Optional[str] = None, workers: Optional[int] = None,
+                   pages_per_task: Optional[int] = None) -> Iterator[Tuple[int, Document]]:
+    """
+    Yield (page_index, page) in page order for start_page <= index < stop_page.
+
+    With more than one worker and more than one range, up to 2 * workers
+    ranges are extracted ahead of the consumer; the time spent waiting for
+    each range is observed as stage "load".
+    """
+    backend = backend or PDF_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown PDF backend {backend!r}; choose from {', '.join(BACKENDS)}")
+    workers = workers or PDF_WORKERS
+    total, labels, base = pdf_info(file_path)
+    stop = total if stop_page is None else min(stop_page, total)
+    ranges = page_ranges(start_page, stop, pages_per_task or PDF_PAGES_PER_TASK)
+
+    def pages(first: int, texts: List[str]) -> Iterator[Tuple[int, Document]]:
+        for index, text in enumerate(texts, first):
+            yield index, Document(page_content=text,
+                                  metadata={**base, "page": index, "page_label": labels[index]})
+
+    if workers <= 1 or len(ranges) <= 1:
+        for first, last in ranges:
+            start = time.monotonic()
+            texts = extract_range(backend, file_path, first, last)
+            observe_stage("load", time.monotonic() - start)
+            yield from pages(first, texts)
+        return
+
+    pool = get_pool(workers)
+    todo = iter(ranges)
+    pending: Deque[Tuple[int, Future]] = deque()
+
+    def submit() -> None:
+        r = next(todo, None)
+        if r is not None:
+            pending.append((r[0], pool.submit(extract_range, backend, file_path, *r)))
+
+    for _ in range(2 * workers):
+        submit()
+    try:
+        while pending:
+            first, future = pending.popleft()
+            start = time.monotonic()
+            texts = future.result()
+            observe_stage("load", time.monotonic() - start)
+            submit()
+            yield from pages(first, texts)
+    finally:
+        # consumer stopped early (error, or a bounded stop_page replay)
+        for _, future in pending:
+            future.cancel()
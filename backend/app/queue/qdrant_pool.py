@@ -0,0 +1,278 @@
+import os
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from qdrant_client.http import models as qmodels
+
+from .collection_profiles import (
+    FULL_VECTOR, PREFIX_VECTOR, PAYLOAD_INDEXES, CollectionProfile, collection_params, get_profile)
+
+
+# ===== Config =====
+QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY") or None
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "false").lower() in ("1", "true", "yes")
+QDRANT_GRPC_PORT = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "30"))
+# prefix-vector candidates rescored with the full vector, per query (see collection_profiles.py)
+MATRYOSHKA_CANDIDATES = int(os.getenv("MATRYOSHKA_CANDIDATES", "100"))
+
+_lock = threading.Lock()
+_client: Optional[QdrantClient] = None
+_async_client: Optional[AsyncQdrantClient] = None
+_stores: Dict[str, QdrantVectorStore] = {}
+_known_collections: set = set()
+
+
+class VectorLayout(NamedTuple):
+    # 0: one unnamed vector; otherwise named FULL_VECTOR + PREFIX_VECTOR of this size
+    prefix_dims: int = 0
+    quantized: bool = False
+
+
+_layouts: Dict[str, VectorLayout] = {}
+
+
+def get_qdrant_client() -> QdrantClient:
+    """
+    Process-wide Qdrant client; its HTTP/gRPC connection pool is reused by every caller.
+    """
+    global _client
+    with _lock:
+        if _client is None:
+            _client = QdrantClient(
+                location=QDRANT_URL,
+                api_key=QDRANT_API_KEY,
+                prefer_grpc=QDRANT_PREFER_GRPC,
+                grpc_port=QDRANT_GRPC_PORT,
+                timeout=QDRANT_TIMEOUT,
+            )
+        return _client
+
+
+def get_async_qdrant_client() -> AsyncQdrantClient:
+    """
+    Process-wide async Qdrant client for the event-loop query path.
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = AsyncQdrantClient(
+            location=QDRANT_URL,
+            api_key=QDRANT_API_KEY,
+            prefer_grpc=QDRANT_PREFER_GRPC,
+            grpc_port=QDRANT_GRPC_PORT,
+            timeout=QDRANT_TIMEOUT,
+        )
+    return _async_client
+
+
+def layout_of(vectors: Any) -> VectorLayout:
+    """
+    Layout from a collection's `config.params.vectors` (or vectors_config()).
+    """
+    if isinstance(vectors, dict) and PREFIX_VECTOR in vectors:
+        prefix = vectors[PREFIX_VECTOR]
+        return VectorLayout(prefix.size, prefix.quantization_config is not None)
+    return VectorLayout()
+
+
+# ===== Provisioning (profiles: collection_profiles.py) =====
+def resolve_collection(collection_name: str) -> Optional[str]:
+    """
+    The physical collection behind a name: the alias target, the collection
+    itself, or None when neither exists.
+    """
+    client = get_qdrant_client()
+    for alias in client.get_aliases().aliases:
+        if alias.alias_name == collection_name:
+            return alias.collection_name
+    return collection_name if client.collection_exists(collection_name) else None
+
+
+def provision_collection(physical_name: str, dims: int = 768, profile: Optional[CollectionProfile] = None,
+                         payload_indexes: Optional[Dict[str, Any]] = None) -> VectorLayout:
+    """
+    Create a collection under `profile` (default COLLECTION_PROFILE) with
+    keyword indexes on PAYLOAD_INDEXES plus any `payload_indexes` {field: schema}.
+    """
+    profile = profile or get_profile()
+    client = get_qdrant_client()
+    params = collection_params(profile, dims)
+    client.create_collection(collection_name=physical_name, **params)
+    indexes = {field: qmodels.PayloadSchemaType.KEYWORD for field in PAYLOAD_INDEXES}
+    indexes.update(payload_indexes or {})
+    for field, schema in indexes.items():
+        client.create_payload_index(physical_name, field, field_schema=schema)
+    return layout_of(params["vectors_config"])
+
+
+def point_alias(collection_name: str, physical_name: str) -> None:
+    """
+    Atomically (re)point alias `collection_name` at `physical_name`.
+    """
+    client = get_qdrant_client()
+    operations = []
+    if any(a.alias_name == collection_name for a in client.get_aliases().aliases):
+        operations.append(qmodels.DeleteAliasOperation(
+            delete_alias=qmodels.DeleteAlias(alias_name=collection_name)))
+    operations.append(qmodels.CreateAliasOperation(create_alias=qmodels.CreateAlias(
+        collection_name=physical_name, alias_name=collection_name)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+
+
+def ensure_collection(collection_name: str, dims: int = 768, profile: Optional[CollectionProfile] = None) -> None:
+    """
+    Provision the collection if it does not exist yet: a physical
+    `<name>__v1` collection under `profile`, reached through alias `<name>`
+    so that migrate_collection can later swap it without downtime.
+    Existing collections keep their layout.
+    """
+    if collection_name in _known_collections:
+        return
+    if resolve_collection(collection_name) is None:
+        physical_name = f"{collection_name}__v1"
+        _layouts[collection_name] = provision_collection(physical_name, dims, profile)
+        point_alias(collection_name, physical_name)
+    _known_collections.add(collection_name)
+
+
+def vector_layout(collection_name: str) -> VectorLayout:
+    layout = _layouts.get(collection_name)
+    if layout is None:
+        info = get_qdrant_client().get_collection(collection_name)
+        layout = _layouts[collection_name] = layout_of(info.config.params.vectors)
+    return layout
+
+
+def refresh_layout(collection_name: str) -> bool:
+    """
+    Re-read the layout (the alias may point at a migrated collection now);
+    True when it changed, so a request built for the old one is worth retrying.
+    """
+    old = _layouts.pop(collection_name, None)
+    with _lock:
+        _stores.pop(collection_name, None)
+    return vector_layout(collection_name) != old
+
+
+async def acollection_exists(collection_name: str) -> bool:
+    """
+    Whether a collection or alias of that name exists; remembered once seen.
+    """
+    if collection_name in _known_collections or collection_name in _layouts:
+        return True
+    client = get_async_qdrant_client()
+    exists = (any(a.alias_name == collection_name for a in (await client.get_aliases()).aliases)
+              or await client.collection_exists(collection_name))
+    if exists:
+        _known_collections.add(collection_name)
+    return exists
+
+
+async def avector_layout(collection_name: str) -> VectorLayout:
+    layout = _layouts.get(collection_name)
+    if layout is None:
+        info = await get_async_qdrant_client().get_collection(collection_name)
+        layout = _layouts[collection_name] = layout_of(info.config.params.vectors)
+    return layout
+
+
+async def arefresh_layout(collection_name: str) -> bool:
+    old = _layouts.pop(collection_name, None)
+    return await avector_layout(collection_name) != old
+
+
+def point_vector(vector: List[float], layout: VectorLayout) -> Any:
+    if not layout.prefix_dims:
+        return vector
+    return {FULL_VECTOR: vector, PREFIX_VECTOR: vector[:layout.prefix_dims]}
+
+
+def stored_vector(vector: Any) -> Optional[List[float]]:
+    # the full embedding of a point fetched with_vectors, in either layout
+    return vector.get(FULL_VECTOR) if isinstance(vector, dict) else vector
+
+
+def dense_request(vector: List[float], limit: int, layout: VectorLayout,
+                  candidates: Optional[int] = None, query_filter: Optional[qmodels.Filter] = None,
+                  **kwargs: Any) -> qmodels.QueryRequest:
+    """
+    Nearest neighbours of `vector`. With a prefix vector this is two-stage in
+    one request: the `candidates` best by prefix (quantized scores, no rescoring
+    from originals) are prefetched, then ranked by the full vector.
+    `query_filter` applies to both stages, so candidates come from the filtered set.
+    """
+    kwargs.setdefault("with_payload", True)
+    if not layout.prefix_dims:
+        return qmodels.QueryRequest(query=vector, limit=limit, filter=query_filter, **kwargs)
+    params = None
+    if layout.quantized:
+        params = qmodels.SearchParams(quantization=qmodels.QuantizationSearchParams(rescore=False))
+    prefetch = qmodels.Prefetch(query=list(vector[:layout.prefix_dims]), using=PREFIX_VECTOR,
+                                limit=max(limit, candidates or MATRYOSHKA_CANDIDATES), params=params,
+                                filter=query_filter)
+    return qmodels.QueryRequest(prefetch=prefetch, query=vector, using=FULL_VECTOR, limit=limit,
+                                filter=query_filter, **kwargs)
+
+
+def get_vector_store(collection_name: str, embedding: Embeddings) -> QdrantVectorStore:
+    """
+    Cached LangChain vector store for `collection_name`, built on the shared client.
+
+    The collection metadata lookup done by QdrantVectorStore happens once per
+    collection instead of once per search.
+    """
+    store = _stores.get(collection_name)
+    if store is not None:
+        return store
+    client = get_qdrant_client()
+    vector_name = FULL_VECTOR if vector_layout(collection_name).prefix_dims else ""
+    with _lock:
+        store = _stores.get(collection_name)
+        if store is None:
+            store = QdrantVectorStore(
+                client=client,
+                collection_name=collection_name,
+                embedding=embedding,
+                vector_name=vector_name,
+            )
+            _stores[collection_name] = store
+            _known_collections.add(collection_name)
+        return store
+
+
+def forget_collection(collection_name: str) -> None:
+    """
+    Drop cached state for a collection (e.g. after it was deleted or recreated).
+    """
+    with _lock:
+        _stores.pop(collection_name, None)
+        _known_collections.discard(collection_name)
+        _layouts.pop(collection_name, None)
+
+
+def close_qdrant() -> None:
+    """
+    Close the shared client and clear the registry; called on app shutdown.
+    """
+    global _client
+    with _lock:
+        _stores.clear()
+        _known_collections.clear()
+        _layouts.clear()
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+async def aclose_qdrant() -> None:
+    """
+    Close the shared async client; called on app shutdown.
+    """
+    global _async_client
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
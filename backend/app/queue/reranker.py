@@ -0,0 +1,183 @@
+import os
+import uuid
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .deadline import Deadline, DeadlineExceeded
+from .lexical_index import tokenize
+
+
+# ===== Config =====
+# reranker used when a caller does not ask for one: "local" or "gemini"
+RERANKER = os.getenv("RERANKER", "local")
+# wall-clock budget for the Gemini reranker before falling back to the local one
+RERANK_BUDGET_SECONDS = float(os.getenv("RERANK_BUDGET_SECONDS", "2.0"))
+# weights of the local features: dense cosine, idf-weighted term overlap, identifier matches
+RERANK_WEIGHTS = (0.6, 0.3, 0.1)
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have i if in is it my of on or the this to under was what when "
+    "which who will with does do can".split())
+
+
+# ===== Shared candidate / output shape =====
+def rerank_candidates(chunks: List[Any]) -> List[Dict]:
+    # prepare small context sample to keep prompt size bounded:
+    candidates = []
+    for c in chunks:
+        txt = c.page_content.strip()
+        mid = c.metadata.get("_chunk_id", str(uuid.uuid4()))
+        candidates.append({"id": mid, "text": txt[:2000], "meta": c.metadata})
+    return candidates
+
+
+def ranked(candidates: List[Dict], scores: Sequence[Any]) -> List[Dict]:
+    """
+    [{chunk_id, score, page_content, metadata}, ...] sorted descending by score.
+    """
+    out = []
+    for s, cand in zip(scores, candidates):
+        try:
+            score = float(s)
+        except Exception:
+            score = 0.0
+        out.append({
+            "chunk_id": cand["id"],
+            "score": score,
+            "page_content": cand["text"],
+            "metadata": cand["meta"]
+        })
+    out.sort(key=lambda x: x["score"], reverse=True)
+    return out
+
+
+def retrieval_order(candidates: List[Dict]) -> List[Dict]:
+    # heuristic scores that keep the retrieval order
+    return ranked(candidates, [max(0.001, 1.0 - (i * 0.05)) for i in range(len(candidates))])
+
+
+class Reranker:
+    """
+    Orders retrieved chunks for a query. Output matches rerank_with_gemini:
+    [{chunk_id, score, page_content, metadata}, ...], best first.
+    """
+    name = "base"
+
+    def rerank(self, query: str, chunks: List[Any], deadline: Optional[Deadline] = None) -> List[Dict]:
+        raise NotImplementedError
+
+
+class LocalReranker(Reranker):
+    """
+    CPU reranker: one matrix product of the candidates' stored embeddings
+    with the query embedding, plus lexical features computed over a
+    (candidates x query terms) presence matrix.
+
+    `embed_query` and `fetch_vectors` are injected so this module does not
+    depend on the Gemini / Qdrant plumbing; either may fail or return None,
+    in which case the dense feature is zero and lexical features decide.
+    """
+    name = "local"
+
+    def __init__(self, embed_query: Optional[Callable[[str], List[float]]] = None,
+                 fetch_vectors: Optional[Callable[[List[Any]], Optional[np.ndarray]]] = None,
+                 weights: Sequence[float] = RERANK_WEIGHTS):
+        self.embed_query = embed_query
+        self.fetch_vectors = fetch_vectors
+        self.weights = np.asarray(weights, dtype=np.float32)
+
+    def _dense(self, query: str, chunks: List[Any]) -> np.ndarray:
+        if self.embed_query is None or self.fetch_vectors is None:
+            return np.zeros(len(chunks), dtype=np.float32)
+        try:
+            vectors = self.fetch_vectors(chunks)
+            if vectors is None:
+                return np.zeros(len(chunks), dtype=np.float32)
+            q = np.asarray(self.embed_query(query), dtype=np.float32)
+        except Exception as e:
+            print(f"[reranker] dense feature unavailable, using lexical only: {e}")
+            return np.zeros(len(chunks), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1) * (np.linalg.norm(q) or 1.0)
+        return (vectors @ q) / np.where(norms == 0, 1.0, norms)
+
+    @staticmethod
+    def _lexical(query: str, texts: List[str]) -> np.ndarray:
+        terms = [t for t in dict.fromkeys(tokenize(query)) if t not in STOPWORDS]
+        if not terms or not texts:
+            return np.zeros((len(texts), 2), dtype=np.float32)
+        presence = np.array([[t in tokens for t in terms]
+                             for tokens in (set(tokenize(x)) for x in texts)], dtype=np.float32)
+        # idf over the candidate set: terms every candidate shares carry little signal
+        df = presence.sum(axis=0)
+        idf = np.log1p(len(texts) / (1.0 + df))
+        overlap = presence @ idf / max(float(idf.sum()), 1e-9)
+        identifiers = np.array([any(ch.isdigit() for ch in t) for t in terms])
+        exact = presence[:, identifiers].mean(axis=1) if identifiers.any() else np.zeros(len(texts))
+        return np.stack([overlap, exact], axis=1).astype(np.float32)
+
+    def scores(self, query: str, chunks: List[Any]) -> np.ndarray:
+        texts = [c.page_content for c in chunks]
+        features = np.column_stack([self._dense(query, chunks), self._lexical(query, texts)])
+        return features @ self.weights
+
+    def rerank(self, query: str, chunks: List[Any], deadline: Optional[Deadline] = None) -> List[Dict]:
+        if not chunks:
+            return []
+        return ranked(rerank_candidates(chunks), self.scores(query, chunks).tolist())
+
+
+# runs budgeted rerankers so the caller can stop waiting at the budget
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rerank")
+        return _executor
+
+
+class BudgetedReranker(Reranker):
+    """
+    Runs an expensive reranker `score(query, chunks, deadline)` for at most
+    `budget` seconds, and never past the request's deadline; on overrun or
+    error the `fallback` ranking is returned. `score` gets a Deadline for that
+    window, so it stops retrying once its result can no longer be used; its
+    hedged calls count towards the request's deadline report and its LLM
+    usage towards the request's trace. `fell_back` tells whether the last
+    rerank() used the fallback.
+    """
+    fell_back = False
+
+    def __init__(self, name: str, score: Callable[[str, List[Any], Deadline], List[Dict]],
+                 fallback: Reranker, budget: float = RERANK_BUDGET_SECONDS):
+        self.name = name
+        self.score = score
+        self.fallback = fallback
+        self.budget = budget
+
+    def rerank(self, query: str, chunks: List[Any], deadline: Optional[Deadline] = None) -> List[Dict]:
+        if not chunks:
+            return []
+        self.fell_back = False
+        budget = self.budget if deadline is None else max(0.0, min(self.budget, deadline.remaining()))
+        window = Deadline(budget, pipeline=deadline.pipeline if deadline is not None else "query")
+        # in the caller's context, so LLM usage lands in its trace
+        future = _get_executor().submit(contextvars.copy_context().run, self.score, query, chunks, window)
+        try:
+            return future.result(timeout=budget)
+        except (FutureTimeout, DeadlineExceeded):
+            print(f"[reranker] {self.name} exceeded {budget:.2f}s budget, using {self.fallback.name}")
+        except Exception as e:
+            print(f"[reranker] {self.name} failed ({e}), using {self.fallback.name}")
+        finally:
+            if deadline is not None:
+                deadline.hedges += window.hedges
+        self.fell_back = True
+        return self.fallback.rerank(query, chunks, deadline)
@@ -3,37 +3,68 @@ import os
 import json
 import uuid
 import time
-from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import asyncio
+import numpy as np
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Callable, Iterator, NamedTuple, Optional, Set, Tuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_qdrant import QdrantVectorStore
 from langchain_core.embeddings import Embeddings
+from langchain_core.documents import Document
+from qdrant_client.http import models as qmodels
 
 from google import genai
 from google.genai import types
 from pathlib import Path
 
+from .embedder import BatchEmbedder, EMBED_MODEL
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .qdrant_pool import (
+    ensure_collection, get_vector_store, get_qdrant_client, vector_layout, refresh_layout, point_vector,
+    stored_vector, dense_request)
+from .ingest import stream_ingest, normalize_point_id
+from .adjudication import round_paise
+from .answer_cache import get_answer_cache
+from .reranker import (
+    RERANKER, RERANK_BUDGET_SECONDS, Reranker, LocalReranker, BudgetedReranker,
+    rerank_candidates, ranked, retrieval_order)
+from .deadline import (
+    Deadline, DeadlineExceeded, EXPANSION_MIN_SECONDS, RERANK_MIN_SECONDS, ANSWER_MIN_SECONDS,
+    call_with_deadline, retry_sleep)
+from .context_packer import pack_context
+from .expansion_cache import get_expansion_cache, skip_reason
+from .lexical_index import SegmentBuilder, get_lexical_index, write_segment, reciprocal_rank_fusion
+from .metrics import instrument_client, span, traced
+from .attributes import (
+    AttributeExtractor, INTEGER_FIELDS, FLOAT_FIELDS, WAITING_CONDITIONS, extract_attributes)
+
 
 # ===== Load env =====
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-QDRANT_URL = os.getenv("QDRANT_URL", "http://localhost:6333")
 COLLECTION_NAME = os.getenv("QDRANT_COLLECTION", "pdf_collection")
+# fuse BM25 (app/queue/lexical_index.py) with dense hits via reciprocal rank fusion
+HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() in ("1", "true", "yes")
+# depth of each ranked list fed into the fusion
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))
+# LLM calls in flight for retrieve_batch, and search requests per Qdrant batch call
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_SEARCH_SIZE = 256
 
 # ===== Init Gemini client =====
-gemini_client = genai.Client(api_key=GEMINI_API_KEY)
+# calls, latency and token usage are recorded (app/queue/metrics.py)
+gemini_client = instrument_client(genai.Client(api_key=GEMINI_API_KEY))
 
 
 # ===== Embedding helpers =====
-def get_gemini_embedding(text: str, dims: int = 768) -> List[float]:
+def get_gemini_embedding(text: str, dims: int = 768, client: Any = None) -> List[float]:
     """
     Return embedding vector for given text.
     """
-    response = gemini_client.models.embed_content(
-        model="gemini-embedding-001",
+    response = (client or gemini_client).models.embed_content(
+        model=EMBED_MODEL,
         contents=text,
         config=types.EmbedContentConfig(output_dimensionality=dims),
     )
@@ -42,97 +73,359 @@ def get_gemini_embedding(text: str, dims: int = 768) -> List[float]:
 
 
 class GeminiEmbeddings(Embeddings):
-    def __init__(self, dims: int = 768):
+    def __init__(self, dims: int = 768, client: Any = None, cache: Optional[EmbeddingCache] = None,
+                 use_cache: bool = True, **embedder_kwargs):
         self.dims = dims
+        self.client = client or gemini_client
+        self.embedder = BatchEmbedder(
+            self.client, dims=dims, **embedder_kwargs)
+        self.cache = (cache or get_embedding_cache()) if use_cache else None
+
+    def _cache_key(self, text: str) -> str:
+        return EmbeddingCache.make_key(text, self.embedder.model, self.dims)
+
+    def _lookup(self, texts: List[str]):
+        keys = [self._cache_key(t) for t in texts]
+        vectors = self.cache.get_many(keys)
+        # embed each missing text once, even if it repeats within the batch
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        return keys, vectors, missing
+
+    def _store(self, vectors: Dict[str, List[float]], missing: Dict[str, str], fresh: List[List[float]]):
+        new_items = list(zip(missing.keys(), fresh))
+        self.cache.put_many(new_items)
+        vectors.update(new_items)
 
     def embed_documents(self, texts: List[str]) -> List[List[float]]:
-        return [get_gemini_embedding(t, dims=self.dims) for t in texts]
+        if self.cache is None:
+            # batched + concurrent; output order matches `texts`
+            return self.embedder.embed(texts)
+
+        keys, vectors, missing = self._lookup(texts)
+        if missing:
+            self._store(vectors, missing,
+                        self.embedder.embed(list(missing.values())))
+        return [vectors[k] for k in keys]
 
     def embed_query(self, text: str) -> List[float]:
-        return get_gemini_embedding(text, dims=self.dims)
+        if self.cache is None:
+            return get_gemini_embedding(text, dims=self.dims, client=self.client)
+        key = self._cache_key(text)
+        cached = self.cache.get_many([key])
+        if key in cached:
+            return cached[key]
+        vector = get_gemini_embedding(text, dims=self.dims, client=self.client)
+        self.cache.put_many([(key, vector)])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return await self.embedder.aembed(texts)
+
+        # SQLite lookups run off the event loop
+        keys, vectors, missing = await asyncio.to_thread(self._lookup, texts)
+        if missing:
+            fresh = await self.embedder.aembed(list(missing.values()))
+            await asyncio.to_thread(self._store, vectors, missing, fresh)
+        return [vectors[k] for k in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
 
 
 # ===== 1) Query expansion with retries, returns list[str] =====
-def create_queries(query: str, max_retries: int = 4, model: str = "gemini-2.5-flash") -> List[str]:
-    prompt = f"""
+def _expansion_prompt(query: str) -> str:
+    return f"""
 Take the user query below and create 4 different queries:
 - 2 less abstract / more specific versions (include context keywords)
 - 2 more abstract / umbrella versions
 Return ONLY a JSON array of strings, nothing else.
 User query: {json.dumps(query)}
 """
+
+
+def _parse_query_list(resp: Any) -> Optional[List[str]]:
+    raw = resp.text.strip() if hasattr(resp, "text") and resp.text else ""
+    # try to locate JSON substring if there's extra text
+    try:
+        parsed = json.loads(raw)
+        if isinstance(parsed, list) and all(isinstance(x, str) for x in parsed):
+            return parsed
+    except json.JSONDecodeError:
+        # try to extract first occurrence of '[' ... ']'
+        try:
+            start = raw.index("[")
+            end = raw.rindex("]") + 1
+            candidate = raw[start:end]
+            parsed = json.loads(candidate)
+            if isinstance(parsed, list) and all(isinstance(x, str) for x in parsed):
+                return parsed
+        except Exception:
+            pass
+    return None
+
+
+def create_queries(query: str, max_retries: int = 4, model: str = "gemini-2.5-flash",
+                   deadline: Optional[Deadline] = None) -> List[str]:
+    """
+    With a `deadline`, each call is hedged and time-limited (DeadlineExceeded
+    propagates) and no retry is started that would overrun it.
+    """
+    prompt = _expansion_prompt(query)
     for attempt in range(1, max_retries + 1):
-        resp = gemini_client.models.generate_content(
+        resp = call_with_deadline(lambda: gemini_client.models.generate_content(
             model=model,
             contents=prompt,
             config=types.GenerateContentConfig(
                 system_instruction="Output must be a JSON array of strings.")
-        )
-        raw = resp.text.strip() if hasattr(resp, "text") else ""
-        # try to locate JSON substring if there's extra text
-        try:
-            parsed = json.loads(raw)
-            if isinstance(parsed, list) and all(isinstance(x, str) for x in parsed):
-                return parsed
-        except json.JSONDecodeError:
-            # try to extract first occurrence of '[' ... ']'
-            try:
-                start = raw.index("[")
-                end = raw.rindex("]") + 1
-                candidate = raw[start:end]
-                parsed = json.loads(candidate)
-                if isinstance(parsed, list) and all(isinstance(x, str) for x in parsed):
-                    return parsed
-            except Exception:
-                pass
+        ), deadline)
+        parsed = _parse_query_list(resp)
+        if parsed is not None:
+            return parsed
 
         print(
             f"[query expansion] Attempt {attempt} failed to produce clean JSON. Retrying...")
-        time.sleep(0.5 * attempt)
+        if not retry_sleep(0.5 * attempt, deadline, "expansion"):
+            break
 
     print("[query expansion] falling back to original query")
     return [query]
 
 
 # ===== 2) Create vector store from PDF (store metadata) =====
-def create_vector_store(file_path: str, collection_name: str = COLLECTION_NAME):
-    loader = PyPDFLoader(file_path)
-    documents = loader.load()
-    print(f"Loaded {len(documents)} page-like documents from {file_path}")
+def _document_filter(document_id: str) -> qmodels.Filter:
+    return qmodels.Filter(must=[qmodels.FieldCondition(
+        key="metadata.document_id", match=qmodels.MatchValue(value=document_id))])
+
+
+def tenant_document_id(tenant_id: Optional[str], name: str) -> str:
+    # a tenant's documents are namespaced, so two tenants' "policy.pdf" neither collide nor reindex each other
+    return f"{tenant_id}/{name}" if tenant_id else name
+
+
+def document_tenant(document_id: str) -> str:
+    # inverse of tenant_document_id ("" for documents ingested without a tenant)
+    return document_id.rpartition("/")[0]
+
+
+class SearchScope(NamedTuple):
+    # chunks of these documents only (metadata.document_id); None = any document
+    document_ids: Optional[Tuple[str, ...]] = None
+    # chunks ingested for this tenant only (metadata.tenant_id); None = any tenant
+    tenant_id: Optional[str] = None
+
+
+def scope_filter(scope: Optional[SearchScope]) -> Optional[qmodels.Filter]:
+    """
+    Qdrant filter for a scope; both fields are keyword-indexed, so a scoped
+    search only visits the scope's points.
+    """
+    must = []
+    if scope is not None and scope.document_ids is not None:
+        must.append(qmodels.FieldCondition(
+            key="metadata.document_id", match=qmodels.MatchAny(any=list(scope.document_ids))))
+    if scope is not None and scope.tenant_id is not None:
+        must.append(qmodels.FieldCondition(
+            key="metadata.tenant_id", match=qmodels.MatchValue(value=scope.tenant_id)))
+    return qmodels.Filter(must=must) if must else None
+
 
+def scope_documents(scope: Optional[SearchScope]) -> Optional[Callable[[str], bool]]:
+    # the same scope as a document_id predicate, for the BM25 segments
+    if scope_filter(scope) is None:
+        return None
+    allowed = set(scope.document_ids) if scope.document_ids is not None else None
+    return lambda document_id: ((allowed is None or document_id in allowed) and
+                                (scope.tenant_id is None or document_tenant(document_id) == scope.tenant_id))
+
+
+def scope_key(scope: Optional[SearchScope]) -> str:
+    # answer / expansion cache key part: "" for unscoped searches
+    if scope_filter(scope) is None:
+        return ""
+    return hashlib.sha1(json.dumps([scope.document_ids, scope.tenant_id]).encode("utf-8")).hexdigest()[:16]
+
+
+def list_document_chunk_ids(document_id: str, collection_name: str = COLLECTION_NAME) -> set:
+    """
+    Ids of every point already stored for `document_id` (ids only, no vectors/payload).
+    """
+    client = get_qdrant_client()
+    doc_filter = _document_filter(document_id)
+    ids, offset = set(), None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=doc_filter,
+            limit=1000,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        ids.update(normalize_point_id(p.id) for p in points)
+        if offset is None:
+            return ids
+
+
+def delete_chunks(ids: List[str], collection_name: str = COLLECTION_NAME) -> None:
+    get_qdrant_client().delete(
+        collection_name=collection_name,
+        points_selector=qmodels.PointIdsList(points=ids),
+    )
+
+
+_indexed_collections: Set[str] = set()
+
+
+def ensure_policy_indexes(collection_name: str = COLLECTION_NAME) -> None:
+    """
+    Payload indexes for the per-document / per-tenant filters and the numeric policy.* attributes.
+    """
+    if collection_name in _indexed_collections:
+        return
+    client = get_qdrant_client()
+    for field in ("metadata.document_id", "metadata.tenant_id"):
+        client.create_payload_index(collection_name, field, field_schema=qmodels.PayloadSchemaType.KEYWORD)
+    for field in INTEGER_FIELDS:
+        client.create_payload_index(collection_name, f"policy.{field}",
+                                    field_schema=qmodels.PayloadSchemaType.INTEGER)
+    for field in FLOAT_FIELDS:
+        client.create_payload_index(collection_name, f"policy.{field}",
+                                    field_schema=qmodels.PayloadSchemaType.FLOAT)
+    _indexed_collections.add(collection_name)
+
+
+def store_policy_attributes(document_id: str, attributes: Dict[str, Any],
+                            collection_name: str = COLLECTION_NAME) -> None:
+    """
+    Put the document's attribute record on every one of its points as the "policy" payload.
+    """
+    ensure_policy_indexes(collection_name)
+    get_qdrant_client().set_payload(
+        collection_name=collection_name,
+        payload={"policy": attributes},
+        points=_document_filter(document_id),
+    )
+
+
+def get_policy_attributes(document_id: str, collection_name: str = COLLECTION_NAME) -> Optional[Dict[str, Any]]:
+    """
+    Attributes extracted from `document_id` at ingest time (one point lookup), or None.
+    """
+    points, _ = get_qdrant_client().scroll(
+        collection_name=collection_name,
+        scroll_filter=_document_filter(document_id),
+        limit=1,
+        with_payload=["policy"],
+        with_vectors=False,
+    )
+    if not points:
+        return None
+    return (points[0].payload or {}).get("policy")
+
+
+def create_vector_store(file_path: str, collection_name: str = COLLECTION_NAME,
+                        document_id: Optional[str] = None, reindex: bool = False,
+                        tenant_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Streamed ingest: pages are split, embedded and upserted in bounded batches
+    with a resumable checkpoint (see app/queue/ingest.py).
+
+    Chunk ids are deterministic per (document_id, chunk text). Uploads pass
+    a document_id derived from their file id (see process_file); it defaults
+    to the file name, prefixed with `tenant_id` when given (see
+    tenant_document_id). Chunks carry metadata.tenant_id for scoped
+    searches. With reindex=True only chunks that are not yet stored for the
+    document are embedded, and chunks that disappeared from it are deleted.
+
+    Policy attributes (age bounds, waiting periods, sum insured, co-pay,
+    sub-limits) are extracted from the same chunks and stored on the points
+    (see store_policy_attributes); stats["attributes"] holds the record.
+    """
     # Use structure-aware splitter but keep chunks reasonably sized
     text_splitter = RecursiveCharacterTextSplitter(
         chunk_size=1500, chunk_overlap=150)
-    split_docs = text_splitter.split_documents(documents)
-    print(f"Split into {len(split_docs)} chunks")
-
-    # attach metadata: unique id, source filename, page number if available
-    for d in split_docs:
-        d.metadata = d.metadata or {}
-        d.metadata["_chunk_id"] = str(uuid.uuid4())
-        d.metadata["source_document"] = os.path.basename(file_path)
 
     embedding = GeminiEmbeddings(dims=768)
-    vector_store = QdrantVectorStore.from_documents(
-        split_docs,
-        embedding=embedding,
-        collection_name=collection_name,
-        url=QDRANT_URL
+    ensure_collection(collection_name, dims=768)
+    vector_store = get_vector_store(collection_name, embedding)
+    layout = vector_layout(collection_name)
+
+    document_id = document_id or tenant_document_id(tenant_id, os.path.basename(file_path))
+    existing_ids = list_document_chunk_ids(
+        document_id, collection_name) if reindex else None
+    # BM25 segment for the document, built from the same chunks as the upsert
+    lexical = SegmentBuilder(document_id)
+    attributes = AttributeExtractor()
+
+    def index_chunks(docs: List[Document]) -> None:
+        with span("index"):
+            for d in docs:
+                lexical.add(d.metadata["_chunk_id"], d.page_content)
+                attributes.add(d.page_content, d.metadata.get("page"))
+
+    def upsert(docs: List[Document], ids: List[str]) -> None:
+        # one embed + one upsert call per batch (what add_documents does), timed separately
+        nonlocal layout
+        texts = [d.page_content for d in docs]
+        metadatas = [{**d.metadata, "tenant_id": tenant_id} if tenant_id else d.metadata for d in docs]
+        with span("embed"):
+            vectors = embedding.embed_documents(texts)
+
+        def write() -> None:
+            vector_store.client.upsert(collection_name=collection_name, points=[
+                qmodels.PointStruct(id=cid, vector=point_vector(vector, layout), payload={
+                    vector_store.content_payload_key: text,
+                    vector_store.metadata_payload_key: metadata})
+                for cid, vector, text, metadata in zip(ids, vectors, texts, metadatas)])
+
+        with span("upsert"):
+            try:
+                write()
+            except Exception:
+                # the alias was swapped to a collection with another vector layout (migrate_collection)
+                if not refresh_layout(collection_name):
+                    raise
+                layout = vector_layout(collection_name)
+                write()
+
+    stats = stream_ingest(
+        file_path,
+        splitter=text_splitter,
+        upsert=upsert,
+        document_id=document_id,
+        existing_ids=existing_ids,
+        delete=lambda ids: delete_chunks(ids, collection_name),
+        on_chunks=index_chunks,
     )
-    print("Vector store created / updated in Qdrant.")
+    with span("lexical_write"):
+        write_segment(collection_name, lexical)
+    stats["document_id"] = document_id
+    stats["attributes"] = attributes.result()
+    with span("attributes_store"):
+        store_policy_attributes(document_id, stats["attributes"], collection_name)
+    print(
+        f"Stored {stats['chunks']} chunks from {stats['pages']} pages of {file_path} in Qdrant "
+        f"(embedded {stats['embedded']}, unchanged {stats['unchanged']}, deleted {stats['deleted']}).")
+    return stats
 
 
 # ===== 3) Search vector store (reusable) =====
-def search_vector_store(query: str, top_k: int = 3, collection_name: str = COLLECTION_NAME):
-    embedding = GeminiEmbeddings(dims=768)
-    retriever = QdrantVectorStore.from_existing_collection(
-        collection_name=collection_name,
-        embedding=embedding,
-        url=QDRANT_URL
-    )
-    # LangChain retriever similarity_search takes string query and returns Document objects
-    results = retriever.similarity_search(query, k=top_k)
-    return results
+def search_vector_store(query: str, top_k: int = 3, collection_name: str = COLLECTION_NAME,
+                        scope: Optional[SearchScope] = None):
+    """
+    Top chunks for one query, restricted to `scope` (documents / tenant) when given.
+    """
+    vector = GeminiEmbeddings(dims=768).embed_query(query)
+    query_filter = scope_filter(scope)
+    if not HYBRID_SEARCH:
+        return _dense_hits([vector], top_k, collection_name, query_filter)[0]
+    dense = _dense_hits([vector], max(top_k, HYBRID_CANDIDATES), collection_name, query_filter)[0]
+    fused, missing = _hybrid_rank([query], [dense], top_k, collection_name, scope)
+    return _assemble_hits(fused, dense + fetch_points(missing, collection_name))[0]
 
 
 # ===== 4) Merge unique chunks by text =====
@@ -147,18 +440,137 @@ def merge_unique_chunks(results_list: List[Any]) -> List[Any]:
     return unique
 
 
+def fuse_query_hits(hits: List[List[Any]]) -> List[Any]:
+    """
+    Per-query hit lists -> unique chunks, most relevant across the queries
+    first: reciprocal rank fusion over the lists, so every query's top hits
+    come before any query's tail (ties keep query order).
+    """
+    first: Dict[str, Any] = {}
+    rankings = []
+    for docs in hits:
+        ranking: Dict[str, None] = {}
+        for d in docs:
+            text = d.page_content.strip()
+            if text:
+                first.setdefault(text, d)
+                ranking.setdefault(text)
+        rankings.append(list(ranking))
+    return [first[text] for text in reciprocal_rank_fusion(rankings)]
+
+
+def _point_to_document(point: Any, collection_name: str) -> Document:
+    # same payload layout / metadata keys as langchain_qdrant's similarity_search
+    payload = point.payload or {}
+    metadata = dict(payload.get("metadata") or {})
+    metadata["_id"] = point.id
+    metadata["_collection_name"] = collection_name
+    return Document(page_content=payload.get("page_content", ""), metadata=metadata)
+
+
+# ===== 4a) Hybrid ranking: BM25 fused with dense hits =====
+def _hybrid_rank(queries: List[str], dense: List[List[Document]], top_k: int,
+                 collection_name: str, scope: Optional[SearchScope] = None) -> Tuple[List[List[str]], Set[str]]:
+    """
+    Per query, fuse the dense hit ids with the BM25 top list (RRF) and keep
+    top_k. Returns the fused id lists and the ids only BM25 found, whose
+    payloads still have to be fetched. BM25 hits are limited to `scope` too.
+    """
+    index = get_lexical_index(collection_name)
+    documents = scope_documents(scope)
+    fused, missing = [], set()
+    for query, docs in zip(queries, dense):
+        dense_ids = [normalize_point_id(d.metadata["_id"]) for d in docs]
+        lexical_ids = [pid for pid, _ in index.search(query, max(top_k, HYBRID_CANDIDATES), documents)]
+        ranked = reciprocal_rank_fusion([dense_ids, lexical_ids])[:top_k]
+        fused.append(ranked)
+        missing.update(set(ranked).difference(dense_ids))
+    return fused, missing
+
+
+def _assemble_hits(fused: List[List[str]], docs: List[Document]) -> List[List[Document]]:
+    by_id = {normalize_point_id(d.metadata["_id"]): d for d in docs}
+    return [[by_id[pid] for pid in ranked if pid in by_id] for ranked in fused]
+
+
+def fetch_points(ids: Set[str], collection_name: str = COLLECTION_NAME) -> List[Document]:
+    if not ids:
+        return []
+    points = get_qdrant_client().retrieve(
+        collection_name=collection_name, ids=list(ids), with_payload=True)
+    return [_point_to_document(p, collection_name) for p in points]
+
+
+# ===== 4b) Search all expanded queries in one round trip =====
+def _dense_hits(vectors: List[List[float]], limit: int, collection_name: str = COLLECTION_NAME,
+                query_filter: Optional[qmodels.Filter] = None) -> List[List[Document]]:
+    """
+    Nearest chunks per vector in one Qdrant batch query; on collections with
+    a prefix vector each query is prefix-prefetch + full rescore (see dense_request).
+    """
+    def query() -> List[Any]:
+        layout = vector_layout(collection_name)
+        return get_qdrant_client().query_batch_points(
+            collection_name=collection_name,
+            requests=[dense_request(v, limit, layout, query_filter=query_filter) for v in vectors],
+        )
+
+    try:
+        responses = query()
+    except Exception:
+        # the alias was swapped to a collection with another vector layout (migrate_collection)
+        if not refresh_layout(collection_name):
+            raise
+        responses = query()
+    return [[_point_to_document(p, collection_name) for p in r.points]
+            for r in responses]
+
+
+def _search_many(queries: List[str], top_k: int = 3, collection_name: str = COLLECTION_NAME,
+                 scope: Optional[SearchScope] = None,
+                 vectors: Optional[List[List[float]]] = None) -> List[List[Document]]:
+    """
+    Hits per query: one batched embed call (unless `vectors` already holds
+    the queries' embeddings) and one Qdrant batch query for all of them,
+    fused with BM25 hits when HYBRID_SEARCH is on.
+    """
+    if not queries:
+        return []
+    if vectors is None:
+        vectors = GeminiEmbeddings(dims=768).embed_documents(queries)
+    limit = max(top_k, HYBRID_CANDIDATES) if HYBRID_SEARCH else top_k
+    dense = _dense_hits(vectors, limit, collection_name, scope_filter(scope))
+    if HYBRID_SEARCH:
+        fused, missing = _hybrid_rank(queries, dense, top_k, collection_name, scope)
+        dense = _assemble_hits(
+            fused, [d for docs in dense for d in docs] + fetch_points(missing, collection_name))
+    return dense
+
+
+def multi_search_vector_store(queries: List[str], top_k: int = 3, collection_name: str = COLLECTION_NAME,
+                              scope: Optional[SearchScope] = None,
+                              vectors: Optional[List[List[float]]] = None) -> List[Any]:
+    """
+    Embed every query in one batched call (or take their `vectors`), run them
+    through Qdrant's batch query API in one request, and return the hits
+    merged by fuse_query_hits (cross-query relevance order, the order
+    pack_context fills its budget in). With HYBRID_SEARCH each query's dense
+    hits are fused with its BM25 hits first.
+    """
+    hits = _search_many(queries, top_k=top_k, collection_name=collection_name, scope=scope, vectors=vectors)
+    return fuse_query_hits(hits)
+
+
 # ===== 5) Rerank using Gemini (ask Gemini to output JSON scores) =====
-def rerank_with_gemini(query: str, chunks: List[Any], max_retries: int = 3, model: str = "gemini-2.5-flash") -> List[Dict]:
+def rerank_with_gemini(query: str, chunks: List[Any], max_retries: int = 3, model: str = "gemini-2.5-flash",
+                       deadline: Optional[Deadline] = None) -> List[Dict]:
     """
     Input: query and list of chunk objects (must have .page_content and .metadata['_chunk_id'])
     Output: list of dicts: [{chunk_id, score, page_content, metadata}, ...] sorted descending by score
+    With a `deadline`, each call is hedged and time-limited (DeadlineExceeded
+    propagates) and no retry is started that would overrun it.
     """
-    # prepare small context sample to keep prompt size bounded:
-    candidates = []
-    for c in chunks:
-        txt = c.page_content.strip()
-        mid = c.metadata.get("_chunk_id", str(uuid.uuid4()))
-        candidates.append({"id": mid, "text": txt[:2000], "meta": c.metadata})
+    candidates = rerank_candidates(chunks)
 
     # build a prompt containing numbered chunks
     numbered_text = "\n\n".join(
@@ -176,32 +588,17 @@ Return ONLY a JSON array of floats like: [0.12, 0.9, ...] with exactly one float
 """
 
     for attempt in range(1, max_retries + 1):
-        resp = gemini_client.models.generate_content(
+        resp = call_with_deadline(lambda: gemini_client.models.generate_content(
             model=model,
             contents=prompt,
             config=types.GenerateContentConfig(
                 system_instruction="Output must be a JSON array of floats.")
-        )
+        ), deadline)
         raw = resp.text.strip() if hasattr(resp, "text") else ""
         try:
             scores = json.loads(raw)
             if isinstance(scores, list) and len(scores) == len(candidates):
-                # build result list
-                out = []
-                for s, cand in zip(scores, candidates):
-                    try:
-                        score = float(s)
-                    except Exception:
-                        score = 0.0
-                    out.append({
-                        "chunk_id": cand["id"],
-                        "score": score,
-                        "page_content": cand["text"],
-                        "metadata": cand["meta"]
-                    })
-                # sort by score descending
-                out.sort(key=lambda x: x["score"], reverse=True)
-                return out
+                return ranked(candidates, scores)
         except json.JSONDecodeError:
             # attempt to extract JSON substring
             try:
@@ -210,44 +607,69 @@ Return ONLY a JSON array of floats like: [0.12, 0.9, ...] with exactly one float
                 candidate = raw[start:end]
                 scores = json.loads(candidate)
                 if isinstance(scores, list) and len(scores) == len(candidates):
-                    out = []
-                    for s, cand in zip(scores, candidates):
-                        try:
-                            score = float(s)
-                        except Exception:
-                            score = 0.0
-                        out.append({
-                            "chunk_id": cand["id"],
-                            "score": score,
-                            "page_content": cand["text"],
-                            "metadata": cand["meta"]
-                        })
-                    out.sort(key=lambda x: x["score"], reverse=True)
-                    return out
+                    return ranked(candidates, scores)
             except Exception:
                 pass
 
         print(f"[reranker] attempt {attempt} failed — retrying...")
-        time.sleep(0.4 * attempt)
+        if not retry_sleep(0.4 * attempt, deadline, "rerank"):
+            print("[reranker] out of time budget — giving up")
+            break
 
     # fallback: use chunk ordering from input with heuristic scores
-    fallback = []
-    for i, cand in enumerate(candidates):
-        fallback.append({
-            "chunk_id": cand["id"],
-            "score": max(0.001, 1.0 - (i * 0.05)),
-            "page_content": cand["text"],
-            "metadata": cand["meta"]
-        })
-    fallback.sort(key=lambda x: x["score"], reverse=True)
-    return fallback
+    return retrieval_order(candidates)
+
+
+# ===== 5b) Pluggable rerankers (app/queue/reranker.py) =====
+def fetch_vectors(chunks: List[Any]) -> Optional[np.ndarray]:
+    """
+    Stored embeddings of retrieved chunks, in chunk order (one Qdrant call per collection).
+    """
+    rows: Dict[str, List[float]] = {}
+    by_collection: Dict[str, List[str]] = {}
+    for c in chunks:
+        if c.metadata.get("_id") is not None:
+            by_collection.setdefault(
+                c.metadata.get("_collection_name", COLLECTION_NAME), []).append(c.metadata["_id"])
+    for collection_name, ids in by_collection.items():
+        for p in get_qdrant_client().retrieve(
+                collection_name=collection_name, ids=ids, with_payload=False, with_vectors=True):
+            rows[normalize_point_id(p.id)] = stored_vector(p.vector)
+    if not rows:
+        return None
+    dims = len(next(iter(rows.values())))
+    out = np.zeros((len(chunks), dims), dtype=np.float32)
+    for i, c in enumerate(chunks):
+        vector = rows.get(normalize_point_id(c.metadata["_id"])) if c.metadata.get("_id") is not None else None
+        if vector is not None:
+            out[i] = vector
+    return out
+
+
+def get_reranker(name: Optional[str] = None, budget: Optional[float] = None) -> Reranker:
+    """
+    "local" (default, see RERANKER): NumPy scoring over stored embeddings and
+    lexical overlap. "gemini": rerank_with_gemini, held to `budget` seconds
+    (default RERANK_BUDGET_SECONDS) with the local ranking as fallback.
+    """
+    name = name or RERANKER
+    local = LocalReranker(embed_query=GeminiEmbeddings(dims=768).embed_query, fetch_vectors=fetch_vectors)
+    if name == "local":
+        return local
+    if name == "gemini":
+        return BudgetedReranker(
+            "gemini", lambda q, chunks, deadline: rerank_with_gemini(q, chunks, deadline=deadline), local,
+            budget=RERANK_BUDGET_SECONDS if budget is None else budget)
+    raise ValueError(f"unknown reranker {name!r} (expected 'local' or 'gemini')")
 
 
 # ===== 6) Generate final answer with Gemini LLM constrained to provided chunks =====
-def generate_answer_with_gemini(query: str, top_chunks: List[Dict], model: str = "gemini-2.5-flash", max_retries: int = 3) -> Dict[str, Any]:
+def generate_answer_with_gemini(query: str, top_chunks: List[Dict], model: str = "gemini-2.5-flash", max_retries: int = 3,
+                                deadline: Optional[Deadline] = None) -> Dict[str, Any]:
     """
     top_chunks: list of dicts produced by rerank_with_gemini (chunk_id, page_content, metadata)
     Returns a dict: {answer: str, explanation: str, evidence: [...]}
+    Calls are hedged and limited by `deadline` as in create_queries.
     """
     # build evidence block with metadata tags
     evidence_blocks = []
@@ -278,12 +700,12 @@ Return ONLY this JSON object.
 """
 
     for attempt in range(1, max_retries + 1):
-        resp = gemini_client.models.generate_content(
+        resp = call_with_deadline(lambda: gemini_client.models.generate_content(
             model=model,
             contents=prompt,
             config=types.GenerateContentConfig(
                 system_instruction="Output must be a single JSON object.")
-        )
+        ), deadline)
         raw = resp.text.strip() if hasattr(resp, "text") else ""
         try:
             parsed = json.loads(raw)
@@ -299,17 +721,24 @@ Return ONLY this JSON object.
             except Exception:
                 pass
         print(f"[generator] attempt {attempt} failed — retrying...")
-        time.sleep(0.5 * attempt)
+        if not retry_sleep(0.5 * attempt, deadline, "answer"):
+            break
 
     # fallback answer
     return {"answer": "Not present in provided documents.", "explanation": "", "evidence": []}
 
 
-# ===== 7) Small example rules engine (age check) =====
+# ===== 7) Small example rules engine =====
 def apply_rules_and_ml(extracted_attributes: Dict[str, Any], applicant: Dict[str, Any]) -> Dict[str, Any]:
     """
-    Very small deterministic rules example:
+    Small deterministic rules over a policy attribute record (see app/queue/attributes.py):
     - If policy has age_min/age_max and applicant age outside → ineligible
+    - If applicant policy_months (months since cover started) is inside the
+      waiting period → ineligible. The initial waiting period always applies
+      (except for condition "accident"), plus the pre-existing / specific /
+      maternity one when applicant condition names it.
+    - claim_amount → payable_amount, capped by the procedure's sub-limit and
+      the sum insured, less co-pay
     """
     result = {"eligible": None, "reasons": [], "confidence": 1.0}
     age = applicant.get("age")
@@ -332,77 +761,181 @@ def apply_rules_and_ml(extracted_attributes: Dict[str, Any], applicant: Dict[str
             f"Applicant age {age} > policy maximum {age_max}")
         return result
 
+    months = applicant.get("policy_months")
+    if months is not None:
+        waiting = waiting_period_for(extracted_attributes, applicant.get("condition"))
+        if waiting and months < waiting:
+            result["eligible"] = False
+            result["reasons"].append(
+                f"Policy held {months} months < waiting period {waiting:g} months")
+            return result
+
     result["eligible"] = True
-    result["reasons"].append("Passed deterministic age checks")
+    result["reasons"].append("Passed deterministic age and waiting period checks")
+
+    claim = applicant.get("claim_amount")
+    if claim is not None:
+        payable = float(claim)
+        limit = (extracted_attributes.get("sub_limits") or {}).get(applicant.get("procedure"))
+        if limit is not None and payable > limit:
+            payable = limit
+            result["reasons"].append(f"Capped at {applicant['procedure']} sub-limit {limit:g}")
+        sum_insured = extracted_attributes.get("sum_insured")
+        if sum_insured is not None and payable > sum_insured:
+            payable = sum_insured
+            result["reasons"].append(f"Capped at sum insured {sum_insured:g}")
+        copay = extracted_attributes.get("copay_percent")
+        if copay:
+            payable *= 1 - copay / 100
+            result["reasons"].append(f"Less {copay:g}% co-pay")
+        result["payable_amount"] = float(round_paise(payable))
     return result
 
 
-# ===== 8) Small util to extract numeric constraints from chunks (very small heuristic) =====
+def waiting_period_for(attributes: Dict[str, Any], condition: Optional[str] = None) -> float:
+    """
+    Months an applicant must have held the policy before claiming for `condition`.
+    """
+    initial = 0.0 if condition == "accident" else attributes.get("waiting_period_months") or 0.0
+    key = WAITING_CONDITIONS.get(condition or "")
+    return max(initial, attributes.get(key) or 0.0) if key else initial
+
+
+# ===== 8) Policy attributes for a query's evidence =====
 
 
 def extract_structured_params_from_chunks(chunks: List[Dict]) -> Dict[str, Any]:
     """
-    Heuristic: look for patterns like 'age 18 to 65' or 'aged between 18 and 65' etc.
-    Returns dict with keys like age_min, age_max
+    Attributes found in just these chunks; the fallback for documents
+    ingested before attributes were stored (see get_policy_attributes).
+    Returns dict with keys like age_min, age_max, sum_insured
     """
-    text = " ".join([c["page_content"] for c in chunks]).lower()
-    # pattern examples: 'age 18 to 65', 'aged between 18 and 65', 'age limit is 65 years'
-    m = re.search(
-        r"age[s]?\s*(?:limit)?\s*(?:is|:|of|between)?\s*(\d{1,3})\s*(?:to|and|-)\s*(\d{1,3})", text)
-    out = {}
-    if m:
-        try:
-            out["age_min"] = int(m.group(1))
-            out["age_max"] = int(m.group(2))
-        except ValueError:
-            pass
-    # fallback single-sided
-    m2 = re.search(r"max(?:imum)? age\s*(?:is|:)?\s*(\d{1,3})", text)
-    if m2:
-        out["age_max"] = int(m2.group(1))
-    m3 = re.search(r"min(?:imum)? age\s*(?:is|:)?\s*(\d{1,3})", text)
-    if m3:
-        out["age_min"] = int(m3.group(1))
-    return out
+    return extract_attributes(chunks)
+
+
+def attributes_for_chunks(chunks: List[Dict]) -> Dict[str, Any]:
+    """
+    The ingest-time record of the most relevant chunk's document when it has
+    one, else attributes extracted from the chunks themselves.
+    """
+    if chunks:
+        metadata = chunks[0].get("metadata") or {}
+        document_id = metadata.get("document_id")
+        if document_id:
+            stored = get_policy_attributes(document_id, metadata.get("_collection_name", COLLECTION_NAME))
+            if stored is not None:
+                return stored
+    return extract_structured_params_from_chunks(chunks)
 
 
 # ===== 9) Main RAG pipeline function (puts it all together) =====
-def rag_pipeline(user_query: str, applicant_context: Dict[str, Any] = None, top_k_per_query: int = 3, top_k_final: int = 5):
+def expansion_shortcut(user_query: str, deadline: Deadline, collection_name: str = COLLECTION_NAME,
+                       scope: Optional[SearchScope] = None) -> Optional[List[str]]:
+    """
+    Queries to search without calling the LLM: a cached expansion, or just the
+    raw query when expansion is not worth it (see skip_reason; "well served"
+    is remembered per collection and scope) or there is no time left for it.
+    None means expansion should run.
+    """
+    cache = get_expansion_cache()
+    entry = cache.lookup(user_query, collection_name, scope_key(scope)) if cache is not None else None
+    if entry and entry.get("queries"):
+        with deadline.stage("expansion") as stage:
+            stage["cache"] = True
+        return entry["queries"]
+    reason = skip_reason(user_query, entry)
+    if reason:
+        deadline.bypass("expansion", reason)
+        return [user_query]
+    # first stage to go when time is short: search the raw query instead
+    if not deadline.allows(EXPANSION_MIN_SECONDS):
+        deadline.skip("expansion")
+        return [user_query]
+    return None
+
+
+def remember_expansion(user_query: str, queries: List[str]) -> None:
+    cache = get_expansion_cache()
+    # create_queries returns [query] when every attempt failed; don't cache that
+    if cache is not None and queries != [user_query]:
+        cache.put(user_query, queries)
+
+
+def expand_within_deadline(user_query: str, deadline: Deadline, collection_name: str = COLLECTION_NAME,
+                           scope: Optional[SearchScope] = None) -> List[str]:
+    queries = expansion_shortcut(user_query, deadline, collection_name, scope)
+    if queries is not None:
+        return queries
+    try:
+        with deadline.stage("expansion"):
+            queries = create_queries(user_query, deadline=deadline)
+    except DeadlineExceeded:
+        return [user_query]
+    remember_expansion(user_query, queries)
+    return queries
+
+
+@traced("rag_pipeline")
+def rag_pipeline(user_query: str, applicant_context: Dict[str, Any] = None, top_k_per_query: int = 3, top_k_final: int = 5,
+                 reranker: Optional[str] = None, timeout: Optional[float] = None,
+                 collection_name: str = COLLECTION_NAME, scope: Optional[SearchScope] = None):
+    """
+    Only chunks of `collection_name` within `scope` (when given) are searched.
+    `timeout` is the end-to-end budget in seconds (default QUERY_DEADLINE_SECONDS).
+    As it runs out the pipeline skips expansion, then reranking, then the
+    generated answer (answer is None; evidence_map still holds the ranked
+    chunks). "timings" reports every stage's status and duration, and LLM usage.
+    """
+    deadline = Deadline(timeout, pipeline="rag_pipeline")
+
     # 1. Expand queries
-    expanded = create_queries(user_query)
+    expanded = expand_within_deadline(user_query, deadline, collection_name, scope)
     print("[pipeline] expanded queries:", expanded)
 
-    # 2. Search in parallel across expanded queries
-    all_hits = []
-    with ThreadPoolExecutor(max_workers=min(6, len(expanded))) as ex:
-        futures = [ex.submit(search_vector_store, q,
-                             top_k=top_k_per_query) for q in expanded]
-        for f in futures:
-            res = f.result()
-            all_hits.extend(res)
-
-    # 3. Merge unique
-    unique_chunks = merge_unique_chunks(all_hits)
+    # 2-3. One batched embed + one batched search, merged unique
+    with deadline.stage("search"):
+        unique_chunks = multi_search_vector_store(
+            expanded, top_k=top_k_per_query, collection_name=collection_name, scope=scope)
     print(f"[pipeline] unique chunks retrieved: {len(unique_chunks)}")
 
     if not unique_chunks:
-        return {"answer": "Not present in provided documents.", "evidence": [], "decision": None}
-
-    # 4. Rerank using Gemini
-    reranked = rerank_with_gemini(user_query, unique_chunks)
-    # choose top N for generation
-    top_chunks = reranked[:top_k_final]
+        return {"answer": "Not present in provided documents.", "evidence": [], "decision": None,
+                "timings": deadline.report()}
+
+    # 4. Rerank (local by default; reranker="gemini" for the budgeted LLM reranker)
+    if deadline.allows(RERANK_MIN_SECONDS):
+        with deadline.stage("rerank") as stage:
+            ranker = get_reranker(reranker, budget=min(
+                RERANK_BUDGET_SECONDS, deadline.remaining() - ANSWER_MIN_SECONDS))
+            reranked = ranker.rerank(user_query, unique_chunks, deadline)
+            if getattr(ranker, "fell_back", False):
+                stage["status"] = "fallback"
+    else:
+        deadline.skip("rerank")
+        reranked = retrieval_order(rerank_candidates(unique_chunks))
+    # choose top N for generation, packed into the context token budget
+    with deadline.stage("pack") as stage:
+        top_chunks, packing = pack_context(reranked[:top_k_final])
+        stage["tokens_saved"] = packing["tokens_saved"]
 
     # 5. Generate final answer with Gemini LLM
-    llm_response = generate_answer_with_gemini(user_query, top_chunks)
+    llm_response = {"answer": None, "explanation": None, "evidence": []}
+    if deadline.allows(ANSWER_MIN_SECONDS):
+        try:
+            with deadline.stage("answer"):
+                llm_response = generate_answer_with_gemini(user_query, top_chunks, deadline=deadline)
+        except DeadlineExceeded:
+            pass
+    else:
+        deadline.skip("answer")
     # assemble evidence details from top_chunks mapping to CHUNK ids used by LLM
     evidence_map = {}
     for i, c in enumerate(top_chunks, 1):
         evidence_map[f"CHUNK {i}"] = {"chunk_id": c["chunk_id"], "source": c["metadata"].get(
             "source_document"), "text_preview": c["page_content"][:300]}
 
-    # 6. Extract structured params and apply rules (example)
-    extracted = extract_structured_params_from_chunks(top_chunks)
+    # 6. Look up structured params and apply rules (example)
+    extracted = attributes_for_chunks(top_chunks)
     decision = None
     if applicant_context:
         decision = apply_rules_and_ml(extracted, applicant_context)
@@ -414,16 +947,27 @@ def rag_pipeline(user_query: str, applicant_context: Dict[str, Any] = None, top_
         "evidence": llm_response.get("evidence"),
         "evidence_map": evidence_map,
         "extracted_attributes": extracted,
-        "decision": decision
+        "decision": decision,
+        "context": packing,
+        "timings": deadline.report()
     }
 
 
-def put_pdf(pdf_path: str) -> Dict[str, Any]:
+@traced("ingest")
+def put_pdf(pdf_path: str, reindex: bool = False, tenant_id: Optional[str] = None,
+            collection_name: str = COLLECTION_NAME, document_id: Optional[str] = None) -> Dict[str, Any]:
     """
     High-level function to load, chunk, embed, and store a PDF in Qdrant.
 
     Args:
         pdf_path (str): Full path to the PDF file.
+        reindex (bool): Diff against chunks already stored for this document
+            and only embed new ones / delete vanished ones.
+        tenant_id (str): Owner of the file; its chunks are searchable per tenant.
+        collection_name (str): Collection the chunks, BM25 segment and
+            attributes go to.
+        document_id (str): Id of the document's chunks (default: the tenant's
+            file name, see create_vector_store).
 
     Returns:
         dict: Information about the process.
@@ -433,36 +977,26 @@ def put_pdf(pdf_path: str) -> Dict[str, Any]:
         raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
     # Run the existing vector store creation logic
-    create_vector_store(str(pdf_file))
+    stats = create_vector_store(str(pdf_file), collection_name=collection_name, document_id=document_id,
+                                reindex=reindex, tenant_id=tenant_id)
 
     return {
         "status": "success",
         "message": f"PDF '{pdf_file.name}' stored in Qdrant.",
-        "file_path": str(pdf_file)
+        "file_path": str(pdf_file),
+        "pages": stats["pages"],
+        "chunks": stats["chunks"],
+        "embedded": stats["embedded"],
+        "deleted": stats["deleted"],
+        "document_id": stats["document_id"],
+        "attributes": stats["attributes"]
     }
 
 
-#
-def retrieve(user_query: str, top_k: int = 3) -> Dict[str, Any]:
-    """
-    High-level function to search Qdrant for a user query and summarize with Gemini.
-    """
-    # Step 1: Expand the query
-    expanded_queries = create_queries(user_query)
-
-    # Step 2: Search each variation in Qdrant
-    all_results = []
-    for q in expanded_queries:
-        all_results.extend(search_vector_store(q, top_k=top_k))
-
-    # Step 3: Merge duplicate chunks
-    unique_chunks = merge_unique_chunks(all_results)
-
-    # Step 4: Prepare context text from retrieved chunks
+def _final_answer_prompt(user_query: str, unique_chunks: List[Any]) -> str:
+    # Prepare context text from retrieved chunks
     context_text = "\n\n".join(chunk.page_content for chunk in unique_chunks)
-
-    # Step 5: Ask Gemini for a one-line final answer
-    gemini_prompt = f"""
+    return f"""
     You are an insurance policy assistant. 
     Based on the following retrieved information, answer the question in ONE short, clear sentence.
 
@@ -473,13 +1007,9 @@ def retrieve(user_query: str, top_k: int = 3) -> Dict[str, Any]:
 
     If the answer cannot be found in the context, say "Not enough information."
     """
-    gemini_response = gemini_client.models.generate_content(
-        model="gemini-2.5-flash",
-        contents=gemini_prompt
-    )
-    final_answer = gemini_response.text.strip()
 
-    # Step 6: Return clean JSON with final answer
+
+def _retrieve_payload(user_query: str, expanded_queries: List[str], unique_chunks: List[Any], final_answer: Optional[str]) -> Dict[str, Any]:
     return {
         "query": user_query,
         "expanded_queries": expanded_queries,
@@ -492,6 +1022,167 @@ def retrieve(user_query: str, top_k: int = 3) -> Dict[str, Any]:
         ],
         "final_answer": final_answer
     }
+
+
+#
+def _answer_within_deadline(user_query: str, context_chunks: List[Any], deadline: Deadline) -> Optional[str]:
+    # one-line answer, or None when there is no time left to generate it
+    if not deadline.allows(ANSWER_MIN_SECONDS):
+        deadline.skip("answer")
+        return None
+    try:
+        with deadline.stage("answer"):
+            gemini_response = call_with_deadline(lambda: gemini_client.models.generate_content(
+                model="gemini-2.5-flash",
+                contents=_final_answer_prompt(user_query, context_chunks)
+            ), deadline)
+            return gemini_response.text.strip()
+    except DeadlineExceeded:
+        return None
+
+
+@traced("query")
+def retrieve(user_query: str, top_k: int = 3, use_cache: bool = True, timeout: Optional[float] = None,
+             collection_name: str = COLLECTION_NAME, scope: Optional[SearchScope] = None) -> Dict[str, Any]:
+    """
+    High-level function to search Qdrant for a user query and summarize with Gemini.
+    Answers are served from / stored in the answer cache unless use_cache=False.
+    Only chunks of `collection_name` within `scope` (when given) are searched.
+
+    `timeout` bounds the whole call (default QUERY_DEADLINE_SECONDS): expansion
+    is skipped when time is short, and final_answer is None when there is no
+    time left to generate it. Degraded payloads are not cached.
+    """
+    deadline = Deadline(timeout)
+    cache = get_answer_cache() if use_cache else None
+    query_vector = generation = None
+    if cache is not None:
+        with deadline.stage("answer_cache") as stage:
+            cached, generation = cache.get(user_query, collection_name, top_k, scope=scope_key(scope))
+            stage["hit"] = cached is not None
+        if cached is not None:
+            cached["timings"] = deadline.report()
+            return cached
+
+    # Step 1: Expand the query
+    expanded_queries = expand_within_deadline(user_query, deadline, collection_name, scope)
+
+    # Step 2: Embed all variations in one batched call; the raw query rides
+    # along for the answer cache's near-duplicate lookup
+    embedded = list(expanded_queries)
+    if cache is not None and user_query not in embedded:
+        embedded.append(user_query)
+    with deadline.stage("embed"):
+        vectors = GeminiEmbeddings(dims=768).embed_documents(embedded)
+    if cache is not None:
+        query_vector = vectors[embedded.index(user_query)]
+        with deadline.stage("semantic_cache") as stage:
+            cached = cache.get_similar(user_query, collection_name, top_k, query_vector,
+                                       generation, scope=scope_key(scope))
+            stage["hit"] = cached is not None
+        if cached is not None:
+            cached["timings"] = deadline.report()
+            return cached
+
+    # Step 3: Search all variations in one round trip, merging duplicate chunks
+    with deadline.stage("search"):
+        unique_chunks = multi_search_vector_store(
+            expanded_queries, top_k=top_k, collection_name=collection_name, scope=scope,
+            vectors=vectors[:len(expanded_queries)])
+
+    # Step 4: Merge overlaps, drop near-duplicates, fit the token budget
+    with deadline.stage("pack") as stage:
+        context_chunks, packing = pack_context(unique_chunks)
+        stage["tokens_saved"] = packing["tokens_saved"]
+
+    # Step 5: Ask Gemini for a one-line final answer over the packed chunks
+    final_answer = _answer_within_deadline(user_query, context_chunks, deadline)
+
+    # Step 6: Return clean JSON with final answer
+    payload = _retrieve_payload(
+        user_query, expanded_queries, unique_chunks, final_answer)
+    payload["context"] = packing
+    payload["timings"] = deadline.report()
+    if cache is not None and not deadline.degraded:
+        cache.put(user_query, collection_name, top_k, payload,
+                  vector=query_vector, generation=generation, scope=scope_key(scope))
+    return payload
+
+
+# ===== Batch retrieval =====
+def _batch_answer(user_query: str, unique_chunks: List[Any], deadline: Deadline) -> Tuple[Optional[str], Dict[str, Any]]:
+    with deadline.stage("pack") as stage:
+        context_chunks, packing = pack_context(unique_chunks)
+        stage["tokens_saved"] = packing["tokens_saved"]
+    return _answer_within_deadline(user_query, context_chunks, deadline), packing
+
+
+def retrieve_batch(user_queries: List[str], top_k: int = 3, collection_name: str = COLLECTION_NAME,
+                   max_concurrency: int = BATCH_MAX_CONCURRENCY,
+                   timeout: Optional[float] = None, scope: Optional[SearchScope] = None) -> Iterator[Dict[str, Any]]:
+    """
+    retrieve() for many queries, as a stream of records:
+
+    - {"type": "evidence", "id", "content", "metadata"}: each retrieved chunk,
+      once per batch, right before the first result that cites it
+    - {"type": "result", "index", "query", "expanded_queries", "evidence": [ids],
+      "final_answer", "context", "timings"}: one per query, in completion order
+    - {"type": "summary", ...}: last
+
+    Every distinct search query of the batch (originals and expansions) is
+    embedded and searched once, in batched calls. Expansion and answer
+    generation run with at most `max_concurrency` LLM calls in flight; each
+    query keeps its own `timeout`. The answer cache is not consulted.
+    """
+    started = time.monotonic()
+    deadlines = [Deadline(timeout, pipeline="batch") for _ in user_queries]
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        expanded = list(pool.map(lambda q, d: expand_within_deadline(q, d, collection_name, scope),
+                                 user_queries, deadlines))
+
+        search_started = time.monotonic()
+        search_queries = list(dict.fromkeys(q for queries in expanded for q in queries))
+        hits_by_query: Dict[str, List[Document]] = {}
+        for i in range(0, len(search_queries), BATCH_SEARCH_SIZE):
+            part = search_queries[i:i + BATCH_SEARCH_SIZE]
+            hits_by_query.update(zip(part, _search_many(part, top_k=top_k, collection_name=collection_name,
+                                                        scope=scope)))
+        search_ms = round(1000 * (time.monotonic() - search_started), 1)
+
+        chunks_per_query = [fuse_query_hits([hits_by_query[q] for q in queries])
+                            for queries in expanded]
+        futures = {pool.submit(_batch_answer, q, chunks, deadline): i
+                   for i, (q, chunks, deadline) in enumerate(zip(user_queries, chunks_per_query, deadlines))}
+
+        emitted: Set[str] = set()
+        for future in as_completed(futures):
+            i = futures[future]
+            record = {"type": "result", "index": i, "query": user_queries[i],
+                      "expanded_queries": expanded[i], "evidence": []}
+            for chunk in chunks_per_query[i]:
+                cid = normalize_point_id(chunk.metadata["_id"])
+                record["evidence"].append(cid)
+                if cid not in emitted:
+                    emitted.add(cid)
+                    yield {"type": "evidence", "id": cid, "content": chunk.page_content, "metadata": chunk.metadata}
+            try:
+                record["final_answer"], record["context"] = future.result()
+            except Exception as e:
+                # one failed answer should not sink a nightly batch
+                record["final_answer"], record["error"] = None, str(e)
+            record["timings"] = deadlines[i].report()
+            yield record
+
+    yield {
+        "type": "summary",
+        "queries": len(user_queries),
+        "search_queries": len(search_queries),
+        "unique_chunks": len(emitted),
+        "search_ms": search_ms,
+        "elapsed_ms": round(1000 * (time.monotonic() - started), 1),
+    }
+
+
 # if __name__ == "__main__":
 #     import json
 
@@ -0,0 +1,152 @@
+"""
+Warm ingestion worker: `python -m app.queue.warm_worker`
+
+`rq worker` forks a work horse per job, so every job re-imports
+app.queue.vectorStore (langchain, google-genai, ...), rebuilds its clients and
+runs the async `process_file` in a brand-new event loop. This worker keeps all
+of that alive instead:
+
+- WORKER_PROCESSES processes (default 2; 0 = one per core), each importing the job
+  module once and sharing its Gemini, Qdrant and Mongo clients across jobs;
+- one long-lived asyncio loop per process that every coroutine job runs on;
+- WORKER_CONCURRENCY rq SimpleWorker slots per process, each dequeuing and
+  running one job at a time, so that many jobs are in flight per process.
+
+With WORKER_METRICS_PORT set, process i serves its ingest stage / LLM metrics
+on GET :(port + i)/metrics (a forking `rq worker` loses them with each work horse).
+
+Job bookkeeping (status, results, failed registry) is still rq's.
+"""
+import os
+import signal
+import socket
+import asyncio
+import threading
+import multiprocessing
+from typing import Any, List, Optional
+
+from redis import Redis
+from rq import Queue, SimpleWorker
+from rq.job import Job
+from rq.exceptions import DequeueTimeout
+from rq.timeouts import TimerDeathPenalty
+
+
+# ===== Config =====
+REDIS_URL = os.getenv("REDIS_URL", "redis://valkey:6379")
+WORKER_QUEUES = os.getenv("WORKER_QUEUES", "default").split(",")
+# each runs its own PDF_WORKERS extraction pool
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "2")) or os.cpu_count() or 1
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+# modules imported once per process before the first job
+WORKER_PRELOAD = os.getenv("WORKER_PRELOAD", "app.queue.worker").split(",")
+# 0 = no metrics endpoint; otherwise process i listens on WORKER_METRICS_PORT + i
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "0"))
+DEQUEUE_TIMEOUT = 5
+
+
+class WarmJob(Job):
+    """
+    rq Job that runs coroutine functions on the process's shared event loop
+    instead of creating a new loop per job.
+    """
+    loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _execute(self) -> Any:
+        result = self.func(*self.args, **self.kwargs)
+        if asyncio.iscoroutine(result):
+            if WarmJob.loop is None:
+                return asyncio.run(result)
+            return asyncio.run_coroutine_threadsafe(result, WarmJob.loop).result()
+        return result
+
+
+class WarmSlotWorker(SimpleWorker):
+    # signal-based timeouts only work on the main thread
+    death_penalty_class = TimerDeathPenalty
+
+
+def _start_loop() -> asyncio.AbstractEventLoop:
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="warm-loop", daemon=True)
+    thread.start()
+    return loop
+
+
+def _run_slot(slot: int, connection: Redis, queue_names: List[str], stop: threading.Event):
+    queues = [Queue(name, connection=connection, job_class=WarmJob) for name in queue_names]
+    worker = WarmSlotWorker(
+        queues,
+        connection=connection,
+        name=f"warm.{socket.gethostname()}.{os.getpid()}.{slot}",
+        job_class=WarmJob,
+    )
+    worker.register_birth()
+    try:
+        while not stop.is_set():
+            try:
+                result = Queue.dequeue_any(
+                    queues, timeout=DEQUEUE_TIMEOUT, connection=connection, job_class=WarmJob)
+            except DequeueTimeout:
+                result = None
+            if result is None:
+                worker.heartbeat()
+                continue
+            job, queue = result
+            worker.execute_job(job, queue)
+    finally:
+        worker.register_death()
+
+
+def run_process(concurrency: int = WORKER_CONCURRENCY, queue_names: List[str] = WORKER_QUEUES,
+                index: int = 0):
+    """
+    One warm worker process: preload, start the shared loop, run `concurrency` slots.
+    """
+    import importlib
+    for module in WORKER_PRELOAD:
+        importlib.import_module(module)
+    if WORKER_METRICS_PORT:
+        from .metrics import start_metrics_server
+        start_metrics_server(WORKER_METRICS_PORT + index)
+    WarmJob.loop = _start_loop()
+
+    stop = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop.set())
+
+    connection = Redis.from_url(REDIS_URL)
+    slots = [threading.Thread(target=_run_slot, args=(i, connection, queue_names, stop),
+                              name=f"warm-slot-{i}")
+             for i in range(concurrency)]
+    for t in slots:
+        t.start()
+    print(f"[warm worker] pid {os.getpid()}: {concurrency} slots on {queue_names}")
+    # slots finish their current job, then exit within DEQUEUE_TIMEOUT
+    for t in slots:
+        t.join()
+    WarmJob.loop.call_soon_threadsafe(WarmJob.loop.stop)
+
+
+def main(processes: int = WORKER_PROCESSES):
+    if processes <= 1:
+        run_process()
+        return
+    children = [multiprocessing.Process(target=run_process, kwargs={"index": i}, name=f"warm-worker-{i}")
+                for i in range(processes)]
+    for p in children:
+        p.start()
+
+    def forward(sig, _frame):
+        for p in children:
+            if p.pid:
+                os.kill(p.pid, sig)
+
+    signal.signal(signal.SIGINT, forward)
+    signal.signal(signal.SIGTERM, forward)
+    for p in children:
+        p.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,22 @@
 from ..db.collections.files import files_collection
+from ..db.collections.policy_attributes import policy_attributes_collection, PolicyAttributesSchema
 from bson import ObjectId
-from .vectorStore import put_pdf
+from .vectorStore import put_pdf, tenant_document_id, COLLECTION_NAME
+from .answer_cache import invalidate_collection
+from .metrics import trace
 import asyncio
+from typing import Optional
 
 
-async def process_file(id: str, file_path: str):
+async def process_file(id: str, file_path: str, replaces: Optional[str] = None, tenant_id: Optional[str] = None,
+                       collection_name: str = COLLECTION_NAME):
+    # one ingest trace for the job; put_pdf's stages land in it via the thread's context
+    with trace("ingest") as t:
+        return await _process_file(t, id, file_path, replaces, tenant_id, collection_name)
+
+
+async def _process_file(t, id: str, file_path: str, replaces: Optional[str], tenant_id: Optional[str],
+                        collection_name: str):
     try:
         # Step 1: mark processing
         await files_collection.update_one(
@@ -12,8 +24,18 @@ async def process_file(id: str, file_path: str):
             {"$set": {"status": "processing"}}
         )
 
-        # Step 2: run put_pdf in background thread
-        result = await asyncio.to_thread(put_pdf, file_path)
+        # Step 2: run put_pdf in background thread; one document per upload,
+        # so two uploads with the same file name do not share chunks. A new
+        # version of a file (`replaces`) re-indexes into that file's document:
+        # only changed chunks are embedded, vanished ones are deleted
+        document_id = tenant_document_id(tenant_id, str(id))
+        if replaces is not None:
+            previous = await policy_attributes_collection.find_one(
+                {"file_id": replaces}, projection={"document_id": 1})
+            if previous is not None:
+                document_id = previous["document_id"]
+        result = await asyncio.to_thread(put_pdf, file_path, replaces is not None, tenant_id, collection_name,
+                                         document_id)
 
         # Step 3: mark success
         await files_collection.update_one(
@@ -21,15 +43,37 @@ async def process_file(id: str, file_path: str):
             {"$set": {
                 "status": "ready",
                 "qdrant_message": result.get("message", ""),
-                "file_path": result.get("file_path", file_path)
+                "file_path": result.get("file_path", file_path),
+                "timings": t.report()
             }}
         )
+        # per-document attribute record for eligibility lookups
+        await policy_attributes_collection.update_one(
+            {"file_id": str(id)},
+            {"$set": PolicyAttributesSchema(
+                file_id=str(id),
+                document_id=result["document_id"],
+                collection_name=collection_name,
+                tenant_id=tenant_id,
+                attributes=result["attributes"]
+            )},
+            upsert=True
+        )
+        if replaces is not None:
+            # the replaced file's chunks now belong to this one
+            await policy_attributes_collection.delete_one({"file_id": replaces})
+            await files_collection.update_one(
+                {"_id": ObjectId(replaces)},
+                {"$set": {"status": "replaced", "replaced_by": str(id)}}
+            )
+        # answers cached for this collection may now be incomplete
+        await asyncio.to_thread(invalidate_collection, collection_name)
         return {"status": "ready", "file_id": str(id)}
 
     except Exception as e:
         await files_collection.update_one(
             {"_id": ObjectId(id)},
-            {"$set": {"status": "error", "error_message": str(e)}}
+            {"$set": {"status": "error", "error_message": str(e), "timings": t.report()}}
         )
         print(f"Error processing file {id}: {str(e)}")
         return {"status": "error", "file_id": str(id), "error": str(e)}
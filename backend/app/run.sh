@@ -1,3 +1,9 @@
 #!/bin/bash
 uvicorn app.server:app --host 0.0.0.0 --port 8000 --reload &
-rq worker --with-scheduler --url redis://valkey:6379 app.queue.worker
+if [ "${WORKER_MODE:-warm}" = "rq" ]; then
+    # fork-per-job rq worker
+    rq worker --with-scheduler --url redis://valkey:6379 app.queue.worker
+else
+    # WORKER_PROCESSES x WORKER_CONCURRENCY jobs in flight, clients kept warm
+    REDIS_URL=${REDIS_URL:-redis://valkey:6379} python -m app.queue.warm_worker
+fi
@@ -1,19 +1,67 @@
-from fastapi import FastAPI, UploadFile
+import os
+import re
+import shutil
+import asyncio
+from typing import Any, Dict, List, Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, UploadFile, Request, Query
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-from .utils.file import save_to_disk
+from .utils.file import stream_to_disk
+from .utils.stream import sse_stream, ndjson_stream
 from .db.collections.files import files_collection, FileSchema
+from .db.collections.policy_attributes import policy_attributes_collection
 from .queue.create_queue import q
 from .queue.worker import process_file
 # from .utils.chat_gemini import chat_with_gemini
 from fastapi import HTTPException
-from .queue.vectorStore import retrieve
+from .queue.async_pipeline import aretrieve, aretrieve_stream
+from .queue.vectorStore import COLLECTION_NAME, SearchScope, retrieve_batch, apply_rules_and_ml
+from .queue.adjudication import read_columns, adjudicate, decisions_to_json, summarize
+from .queue.qdrant_pool import close_qdrant, aclose_qdrant, acollection_exists
+from .queue.metrics import render_metrics
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # release pooled Qdrant connections on shutdown
+    close_qdrant()
+    await aclose_qdrant()
+
+
+app = FastAPI(lifespan=lifespan)
+
+# ===== Config =====
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/mnt/uploads")
+# collections uploads may create; "__" is reserved for the physical collections behind aliases
+COLLECTION_NAME_RE = re.compile(r"(?!.*__)[A-Za-z0-9_-]{1,64}")
 
 
 class QueryRequest(BaseModel):
     query: str
-    collection_name: str = "pdf_collection"
+    collection_name: str = COLLECTION_NAME
+    # search only these uploads (file_id from /upload) and/or one tenant's files
+    file_ids: Optional[List[str]] = None
+    tenant_id: Optional[str] = None
+    # end-to-end budget in seconds; defaults to QUERY_DEADLINE_SECONDS
+    timeout: Optional[float] = None
+
+
+class QueryBatchRequest(BaseModel):
+    queries: List[str]
+    collection_name: str = COLLECTION_NAME
+    file_ids: Optional[List[str]] = None
+    tenant_id: Optional[str] = None
+    top_k: int = 3
+    # per-query budget in seconds; defaults to QUERY_DEADLINE_SECONDS
+    timeout: Optional[float] = None
+
+
+class EligibilityRequest(BaseModel):
+    file_id: str
+    # age, policy_months, condition, procedure, claim_amount (see apply_rules_and_ml)
+    applicant: Dict[str, Any]
 
 
 @app.get("/")
@@ -21,24 +69,79 @@ def read_root():
     return {"Hello": "World!"}
 
 
+@app.get("/metrics")
+def metrics():
+    # Prometheus text format: stage latency histograms, LLM calls / retries / tokens
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+async def resolve_scope(collection_name: str, file_ids: Optional[List[str]],
+                        tenant_id: Optional[str]) -> Optional[SearchScope]:
+    """
+    Search scope of a query request. 404 when the collection does not exist
+    or a file id is not indexed in it (or belongs to another tenant).
+    """
+    if not await acollection_exists(collection_name):
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {collection_name}")
+    if not file_ids and tenant_id is None:
+        return None
+    document_ids = None
+    if file_ids:
+        records = await policy_attributes_collection.find(
+            {"file_id": {"$in": file_ids}, "collection_name": collection_name},
+            projection={"file_id": 1, "document_id": 1, "tenant_id": 1}).to_list(length=None)
+        found = {r["file_id"]: r["document_id"] for r in records
+                 if tenant_id is None or r.get("tenant_id") == tenant_id}
+        missing = [f for f in file_ids if f not in found]
+        if missing:
+            raise HTTPException(status_code=404, detail=f"No indexed file(s): {', '.join(missing)}")
+        document_ids = tuple(sorted(set(found.values())))
+    return SearchScope(document_ids=document_ids, tenant_id=tenant_id)
+
+
 @app.post("/upload")
-async def update_file(file: UploadFile):
+async def update_file(file: UploadFile, replaces: Optional[str] = None, tenant_id: Optional[str] = None,
+                      collection_name: str = COLLECTION_NAME):
+    if not COLLECTION_NAME_RE.fullmatch(collection_name):
+        raise HTTPException(status_code=400, detail=f"Invalid collection name: {collection_name}")
+    # a new version of an indexed file: re-indexed into that file's document (see process_file)
+    if replaces is not None and not await policy_attributes_collection.find_one(
+            {"file_id": replaces, "collection_name": collection_name, "tenant_id": tenant_id},
+            projection={"_id": 1}):
+        raise HTTPException(status_code=404, detail=f"No indexed file: {replaces}")
     # id = uuid4()
     db_file = await files_collection.insert_one(
         document=FileSchema(
             name=file.filename,
-            status="pending"
+            status="pending",
+            collection_name=collection_name,
+            tenant_id=tenant_id
         )
     )
-    filepath = f"/mnt/uploads/{str(db_file.inserted_id)}/{file.filename}"
-    #
-    await save_to_disk(file=await file.read(), path=filepath)
+    filepath = f"{UPLOAD_DIR}/{str(db_file.inserted_id)}/{file.filename}"
+    # stream to disk, hashing on the fly
+    sha256 = await stream_to_disk(file=file, path=filepath)
+
+    # same bytes already indexed in this collection for this tenant -> reuse it, skip the job
+    existing = replaces is None and await files_collection.find_one({
+        "sha256": sha256,
+        "collection_name": collection_name,
+        "tenant_id": tenant_id,
+        "status": "ready",
+        "_id": {"$ne": db_file.inserted_id},
+    }, projection={"_id": 1})
+    if existing:
+        await files_collection.delete_one({"_id": db_file.inserted_id})
+        shutil.rmtree(os.path.dirname(filepath), ignore_errors=True)
+        return {"file_id": str(existing["_id"]), "duplicate": True}
+
     # push to queue
-    q.enqueue(process_file, str(db_file.inserted_id), filepath)
+    q.enqueue(process_file, str(db_file.inserted_id), filepath, replaces, tenant_id, collection_name)
     # mongo save
     await files_collection.update_one({"_id": db_file.inserted_id}, {
         "$set": {
             "status": "queued",
+            "sha256": sha256,
         }
     })
     # await queue.push(id, filepath)
@@ -47,11 +150,93 @@ async def update_file(file: UploadFile):
 
 @app.post("/query")
 async def query_pdf(request: QueryRequest):
+    scope = await resolve_scope(request.collection_name, request.file_ids, request.tenant_id)
     try:
-        response = retrieve(
+        response = await aretrieve(
             user_query=request.query,
-            # collection_name=request.collection_name
+            timeout=request.timeout,
+            collection_name=request.collection_name,
+            scope=scope,
         )
         return {"status": "success", "data": response}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
+
+
+@app.post("/query/stream")
+async def query_pdf_stream(request: QueryRequest):
+    """
+    Server-Sent Events: "queries", "evidence", "token"... then "result" with the /query payload.
+    """
+    scope = await resolve_scope(request.collection_name, request.file_ids, request.tenant_id)
+    events = aretrieve_stream(
+        user_query=request.query,
+        timeout=request.timeout,
+        collection_name=request.collection_name,
+        scope=scope,
+    )
+    return StreamingResponse(
+        sse_stream(events),
+        media_type="text/event-stream",
+        # keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/query/batch")
+async def query_pdf_batch(request: QueryBatchRequest):
+    """
+    NDJSON stream of retrieve_batch() records: "evidence" (each chunk once),
+    "result" per query as it completes, then "summary".
+    """
+    scope = await resolve_scope(request.collection_name, request.file_ids, request.tenant_id)
+    records = retrieve_batch(
+        request.queries,
+        top_k=request.top_k,
+        collection_name=request.collection_name,
+        timeout=request.timeout,
+        scope=scope,
+    )
+    # a sync iterator: Starlette runs it in its threadpool, off the event loop
+    return StreamingResponse(ndjson_stream(records), media_type="application/x-ndjson")
+
+
+@app.post("/eligibility")
+async def check_eligibility(request: EligibilityRequest):
+    """
+    Rules over the attributes extracted from the file at ingest time; no retrieval or LLM call.
+    """
+    record = await policy_attributes_collection.find_one({"file_id": request.file_id})
+    if record is None:
+        raise HTTPException(status_code=404, detail="No attributes for this file (not ingested yet?)")
+    return {
+        "status": "success",
+        "data": {
+            "decision": apply_rules_and_ml(record["attributes"], request.applicant),
+            "attributes": record["attributes"],
+        },
+    }
+
+
+@app.post("/adjudicate")
+async def adjudicate_batch(request: Request, file_id: List[str] = Query(...)):
+    """
+    Bulk eligibility: the body is a columnar batch of applicants (text/csv,
+    application/x-npz or an Arrow IPC stream) with columns age, policy_months,
+    condition, procedure, claim_amount and policy_id (one of the file_id
+    query parameters; optional when only one is given). Returns one decision
+    per row as columns.
+    """
+    records = await policy_attributes_collection.find(
+        {"file_id": {"$in": file_id}}).to_list(length=None)
+    policies = {r["file_id"]: r["attributes"] for r in records}
+    missing = [f for f in file_id if f not in policies]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"No attributes for file(s): {', '.join(missing)}")
+    body = await request.body()
+    try:
+        columns = read_columns(body, request.headers.get("content-type", ""))
+        decisions = await asyncio.to_thread(adjudicate, columns, policies)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"status": "success", "data": {"summary": summarize(decisions), **decisions_to_json(decisions)}}
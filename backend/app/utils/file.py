@@ -1,5 +1,10 @@
 import os
+import hashlib
 import aiofiles
+from fastapi import UploadFile
+
+# bytes read from the upload per iteration; bounds memory per request
+UPLOAD_CHUNK_SIZE = 1024 * 1024
 
 
 async def save_to_disk(file: bytes, path: str) -> bool:
@@ -7,3 +12,16 @@ async def save_to_disk(file: bytes, path: str) -> bool:
     async with aiofiles.open(path, 'wb') as out_file:
         await out_file.write(file)
     return True
+
+
+async def stream_to_disk(file: UploadFile, path: str, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    """
+    Copy an upload to `path` in fixed-size chunks and return its SHA-256 hex digest.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    digest = hashlib.sha256()
+    async with aiofiles.open(path, 'wb') as out_file:
+        while chunk := await file.read(chunk_size):
+            digest.update(chunk)
+            await out_file.write(chunk)
+    return digest.hexdigest()
@@ -0,0 +1,29 @@
+import json
+from typing import Any, AsyncIterator, Dict, Iterator, Tuple
+
+
+def sse_event(event: str, data: Any) -> str:
+    # one Server-Sent Event; data is a single JSON line
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def sse_stream(events: AsyncIterator[Tuple[str, Any]]) -> AsyncIterator[str]:
+    """
+    Format (event, data) pairs as SSE; a failure mid-stream becomes an "error" event.
+    """
+    try:
+        async for event, data in events:
+            yield sse_event(event, data)
+    except Exception as e:
+        yield sse_event("error", {"detail": f"Query failed: {str(e)}"})
+
+
+def ndjson_stream(records: Iterator[Dict[str, Any]]) -> Iterator[str]:
+    """
+    One JSON object per line; a failure mid-stream becomes a {"type": "error"} line.
+    """
+    try:
+        for record in records:
+            yield json.dumps(record, default=str) + "\n"
+    except Exception as e:
+        yield json.dumps({"type": "error", "detail": f"Batch query failed: {str(e)}"}) + "\n"
@@ -0,0 +1,105 @@
+"""
+Rows/second: apply_rules_and_ml() once per applicant dict vs. adjudicate()
+over the same batch as columns. Every row's decision and payable amount
+are checked to agree exactly between the two.
+
+Run from backend/:  python -m bench.bulk_adjudication --rows 50000 --policies 50
+"""
+import argparse
+import json
+import math
+import time
+
+import numpy as np
+
+from .offline import offline_env
+
+offline_env()
+
+from app.queue.adjudication import adjudicate, summarize  # noqa: E402
+from app.queue.vectorStore import apply_rules_and_ml  # noqa: E402
+
+PROCEDURES = ["cataract", "knee replacement", "ambulance charges", "dialysis", ""]
+CONDITIONS = ["", "", "accident", "pre_existing", "maternity", "specific"]
+
+
+def make_policies(n: int, rng: np.random.Generator) -> dict:
+    policies = {}
+    for i in range(n):
+        p = {"age_min": int(rng.choice([0, 18, 21])), "age_max": int(rng.choice([60, 65, 70, 80])),
+             "waiting_period_months": 1.0, "ped_waiting_months": float(rng.choice([24, 36, 48])),
+             "sum_insured": float(rng.choice([3e5, 5e5, 1e6]))}
+        if rng.random() < 0.5:
+            p["copay_percent"] = float(rng.choice([10, 20]))
+        if rng.random() < 0.5:
+            p["maternity_waiting_months"] = 9.0
+        p["sub_limits"] = {name: float(rng.choice([2e3, 4e4, 1e5])) for name in PROCEDURES[:4] if rng.random() < 0.5}
+        policies[f"policy-{i}"] = p
+    return policies
+
+
+def make_applicants(n: int, policy_ids: list, rng: np.random.Generator) -> dict:
+    age = rng.integers(0, 95, n).astype(float)
+    age[rng.random(n) < 0.02] = np.nan
+    months = rng.integers(0, 72, n).astype(float)
+    months[rng.random(n) < 0.1] = np.nan
+    claim = np.round(rng.lognormal(11, 1.2, n), 2)
+    claim[rng.random(n) < 0.2] = np.nan
+    return {"policy_id": rng.choice(policy_ids, n), "age": age, "policy_months": months,
+            "condition": rng.choice(CONDITIONS, n), "procedure": rng.choice(PROCEDURES, n),
+            "claim_amount": claim}
+
+
+def as_dicts(columns: dict) -> list:
+    rows = []
+    for i in range(len(columns["age"])):
+        row = {}
+        for name in ("age", "policy_months", "claim_amount"):
+            if not math.isnan(columns[name][i]):
+                row[name] = float(columns[name][i])
+        for name in ("condition", "procedure"):
+            if columns[name][i]:
+                row[name] = str(columns[name][i])
+        rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--policies", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    policies = make_policies(args.policies, rng)
+    columns = make_applicants(args.rows, list(policies), rng)
+    rows = as_dicts(columns)
+
+    start = time.perf_counter()
+    scalar = [apply_rules_and_ml(policies[pid], row) for pid, row in zip(columns["policy_id"], rows)]
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decisions = adjudicate(columns, policies)
+    vector_s = time.perf_counter() - start
+
+    expected = np.array([-1 if d["eligible"] is None else int(d["eligible"]) for d in scalar])
+    expected_pay = np.array([d.get("payable_amount", np.nan) for d in scalar])
+    # both paths round with round_paise, so amounts must match exactly
+    mismatches = int((expected != decisions["eligible"]).sum()
+                     + (~((expected_pay == decisions["payable_amount"])
+                          | (np.isnan(expected_pay) & np.isnan(decisions["payable_amount"])))).sum())
+
+    print(json.dumps({
+        "rows": args.rows,
+        "policies": args.policies,
+        "scalar_rows_per_sec": round(args.rows / scalar_s),
+        "vectorized_rows_per_sec": round(args.rows / vector_s),
+        "speedup": round(scalar_s / vector_s, 1),
+        "mismatches": mismatches,
+        "summary": summarize(decisions),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Embedding throughput: one request per chunk vs. BatchEmbedder.
+
+Run from backend/:  python -m bench.embeddings --chunks 300 --latency 0.2
+"""
+import argparse
+import json
+import time
+
+from google.genai import types
+
+from app.queue.embedder import BatchEmbedder
+from .fakes import FakeGeminiClient
+
+
+def run_sequential(client: FakeGeminiClient, texts, dims: int):
+    # mirrors the old GeminiEmbeddings.embed_documents: one call per text
+    config = types.EmbedContentConfig(output_dimensionality=dims)
+    return [client.models.embed_content(model="fake", contents=t, config=config).embeddings[0].values
+            for t in texts]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--per-item-latency", type=float, default=0.002)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--dims", type=int, default=768)
+    args = parser.parse_args()
+
+    texts = [f"policy clause {i}: sum insured, waiting period, exclusions"
+             for i in range(args.chunks)]
+    report = {"chunks": args.chunks, "latency": args.latency}
+
+    # the old path has no retries, so the baseline runs without injected errors
+    client = FakeGeminiClient(args.latency, args.per_item_latency)
+    start = time.perf_counter()
+    sequential = run_sequential(client, texts, args.dims)
+    elapsed = time.perf_counter() - start
+    report["sequential"] = {"seconds": round(elapsed, 3),
+                            "chunks_per_sec": round(args.chunks / elapsed, 1),
+                            "requests": client.calls.get("embed_content", 0)}
+
+    client = FakeGeminiClient(args.latency, args.per_item_latency, args.error_rate)
+    embedder = BatchEmbedder(client, dims=args.dims, batch_size=args.batch_size,
+                             max_concurrency=args.concurrency, backoff=0.05)
+    start = time.perf_counter()
+    batched = embedder.embed(texts)
+    elapsed = time.perf_counter() - start
+    report["batched"] = {"seconds": round(elapsed, 3),
+                         "chunks_per_sec": round(args.chunks / elapsed, 1),
+                         "requests": client.calls.get("embed_content", 0),
+                         "errors_retried": client.errors}
+
+    report["order_preserved"] = batched == sequential
+    report["speedup"] = round(report["sequential"]["seconds"] / report["batched"]["seconds"], 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
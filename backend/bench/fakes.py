@@ -0,0 +1,328 @@
+import re
+import json
+import asyncio
+import hashlib
+import random
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, List, Any
+
+import numpy as np
+
+
+def fake_embedding(text: str, dims: int = 768) -> List[float]:
+    """
+    Deterministic unit vector derived from the text, so equal texts embed equally.
+    """
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "little")
+    vec = np.random.default_rng(seed).standard_normal(dims)
+    return (vec / np.linalg.norm(vec)).tolist()
+
+
+def topic_embedding(text: str, dims: int = 768, identifier_weight: float = 0.1) -> List[float]:
+    """
+    Bag-of-words unit vector: texts sharing words land close together. Tokens
+    containing digits (clause numbers, ICD codes) get `identifier_weight`,
+    mimicking how dense models blur exact identifiers.
+    """
+    vec = np.zeros(dims)
+    for word in re.findall(r"[a-z0-9][a-z0-9.\-]*", text.lower()):
+        weight = identifier_weight if any(ch.isdigit() for ch in word) else 1.0
+        vec += weight * np.asarray(fake_embedding(word, dims))
+    norm = np.linalg.norm(vec)
+    return (vec / norm).tolist() if norm else fake_embedding(text, dims)
+
+
+def _texts(contents: Any) -> List[str]:
+    return [contents] if isinstance(contents, str) else list(contents)
+
+
+def _embed_response(contents: Any, config: Any, embed: Callable[[str, int], List[float]]):
+    dims = getattr(config, "output_dimensionality", None) or 768
+    return SimpleNamespace(embeddings=[
+        SimpleNamespace(values=embed(t, dims)) for t in _texts(contents)
+    ])
+
+
+def fake_generation(contents: Any, config: Any = None) -> str:
+    """
+    Canned, well-formed output for each prompt family used by vectorStore.py.
+    """
+    prompt = contents if isinstance(contents, str) else " ".join(map(str, contents))
+    instruction = getattr(config, "system_instruction", None) or ""
+    if "JSON array of strings" in instruction:
+        m = re.search(r'User query: (".*")', prompt)
+        query = json.loads(m.group(1)) if m else "query"
+        return json.dumps([f"{query} coverage", f"{query} exclusions",
+                           f"{query} policy terms", f"{query} eligibility"])
+    if "JSON array of floats" in instruction:
+        n = len(re.findall(r"^#\d+ \(id:", prompt, flags=re.M))
+        return json.dumps([round(1.0 - i / max(n, 1), 3) for i in range(n)])
+    if "single JSON object" in instruction:
+        return json.dumps({"answer": "Covered subject to policy terms.",
+                           "explanation": "See CHUNK 1.", "evidence": ["CHUNK 1"]})
+    return "Covered subject to the waiting period in the policy."
+
+
+def _usage(contents: Any, text: str) -> SimpleNamespace:
+    # roughly 4 characters per token, like the real tokenizer on English text
+    prompt = sum(len(str(c)) for c in _texts(contents))
+    return SimpleNamespace(prompt_token_count=prompt // 4 + 1, candidates_token_count=len(text) // 4 + 1)
+
+
+def _generate_response(contents: Any, config: Any) -> SimpleNamespace:
+    text = fake_generation(contents, config)
+    return SimpleNamespace(text=text, usage_metadata=_usage(contents, text))
+
+
+class _FakeModels:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self._owner = owner
+
+    def embed_content(self, model: str, contents: Any, config: Any = None):
+        self._owner._call("embed_content", len(_texts(contents)))
+        return _embed_response(contents, config, self._owner.embed)
+
+    def generate_content(self, model: str, contents: Any, config: Any = None):
+        self._owner._call("generate_content")
+        return _generate_response(contents, config)
+
+
+class _FakeAsyncModels:
+    def __init__(self, owner: "FakeGeminiClient"):
+        self._owner = owner
+
+    async def embed_content(self, model: str, contents: Any, config: Any = None):
+        await self._owner._acall("embed_content", len(_texts(contents)))
+        return _embed_response(contents, config, self._owner.embed)
+
+    async def generate_content(self, model: str, contents: Any, config: Any = None):
+        await self._owner._acall("generate_content")
+        return _generate_response(contents, config)
+
+    async def generate_content_stream(self, model: str, contents: Any, config: Any = None):
+        # time to first piece is the request latency; the rest trickles in word by word
+        await self._owner._acall("generate_content_stream")
+        text = fake_generation(contents, config)
+        words = text.split(" ")
+
+        async def pieces():
+            for i, word in enumerate(words):
+                if i:
+                    await asyncio.sleep(self._owner.per_item_latency)
+                # like the real stream, the last piece carries the usage totals
+                usage = _usage(contents, text) if i == len(words) - 1 else None
+                yield SimpleNamespace(text=word if i == 0 else " " + word, usage_metadata=usage)
+        return pieces()
+
+
+class FakeGeminiClient:
+    """
+    Offline stand-in for `google.genai.Client`.
+
+    Every request sleeps `latency` seconds plus `per_item_latency` per input
+    text, and fails with probability `error_rate`, so batching, concurrency and
+    retry behaviour can be measured without the network. `embed` picks the
+    embedding function (default: fake_embedding).
+    """
+
+    def __init__(self, latency: float = 0.05, per_item_latency: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0,
+                 embed: Callable[[str, int], List[float]] = fake_embedding):
+        self.latency = latency
+        self.per_item_latency = per_item_latency
+        self.error_rate = error_rate
+        self.embed = embed
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = {}
+        self.errors = 0
+        self.models = _FakeModels(self)
+        self.aio = SimpleNamespace(models=_FakeAsyncModels(self))
+
+    def _record(self, kind: str) -> bool:
+        with self._lock:
+            self.calls[kind] = self.calls.get(kind, 0) + 1
+            fail = self._rng.random() < self.error_rate
+            if fail:
+                self.errors += 1
+        return fail
+
+    def _call(self, kind: str, items: int = 1):
+        fail = self._record(kind)
+        time.sleep(self.latency + self.per_item_latency * items)
+        if fail:
+            raise RuntimeError(f"fake {kind} error")
+
+    async def _acall(self, kind: str, items: int = 1):
+        fail = self._record(kind)
+        await asyncio.sleep(self.latency + self.per_item_latency * items)
+        if fail:
+            raise RuntimeError(f"fake {kind} error")
+
+
+class NullVectorStore:
+    """
+    Vector-store sink that embeds documents like QdrantVectorStore.add_documents
+    and then drops them, so ingest memory can be measured without a Qdrant
+    server growing inside the benchmark process. create_vector_store embeds
+    itself and upserts through `client`, which is the sink too.
+    """
+    content_payload_key = "page_content"
+    metadata_payload_key = "metadata"
+
+    def __init__(self, embedding: Any):
+        self.embedding = embedding
+        self.client = self
+        self.documents = 0
+        self.upserts = 0
+
+    def upsert(self, collection_name: str, points: List[Any], **kwargs):
+        self.documents += len(points)
+        self.upserts += 1
+
+    def add_documents(self, documents: List[Any], batch_size: int = 64, **kwargs):
+        for i in range(0, len(documents), batch_size):
+            batch = documents[i:i + batch_size]
+            self.embedding.embed_documents([d.page_content for d in batch])
+            self.documents += len(batch)
+            self.upserts += 1
+        return []
+
+
+class FakeAsyncCollection:
+    """
+    In-process stand-in for the pymongo AsyncCollection calls the app makes
+    (top-level equality matches, `$ne`, `$in`, `$set`, upserts).
+    """
+
+    def __init__(self):
+        self.docs = {}
+
+    @staticmethod
+    def _matches(doc: dict, query: dict) -> bool:
+        for key, cond in query.items():
+            value = doc.get(key)
+            if isinstance(cond, dict) and "$ne" in cond:
+                if value == cond["$ne"]:
+                    return False
+            elif isinstance(cond, dict) and "$in" in cond:
+                if value not in cond["$in"]:
+                    return False
+            elif value != cond:
+                return False
+        return True
+
+    async def insert_one(self, document: dict):
+        from bson import ObjectId
+        doc = dict(document)
+        doc.setdefault("_id", ObjectId())
+        self.docs[doc["_id"]] = doc
+        return SimpleNamespace(inserted_id=doc["_id"])
+
+    async def find_one(self, query: dict, projection: Any = None):
+        for doc in self.docs.values():
+            if self._matches(doc, query):
+                return dict(doc)
+        return None
+
+    def find(self, query: dict, projection: Any = None):
+        docs = [dict(doc) for doc in self.docs.values() if self._matches(doc, query)]
+
+        class Cursor:
+            async def to_list(self, length: Any = None):
+                return docs[:length] if length else docs
+        return Cursor()
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        for doc in self.docs.values():
+            if self._matches(doc, query):
+                doc.update(update.get("$set", {}))
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            inserted = await self.insert_one(dict(query, **update.get("$set", {})))
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=inserted.inserted_id)
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def delete_one(self, query: dict):
+        for key, doc in list(self.docs.items()):
+            if self._matches(doc, query):
+                del self.docs[key]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+
+class FakeRedis:
+    """
+    In-process stand-in for the Valkey commands the caches use (get/mget/set/setex/incr/delete).
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _live(self, key: str):
+        item = self._data.get(key)
+        if item is not None and item[1] is not None and item[1] < time.time():
+            del self._data[key]
+            return None
+        return item
+
+    def get(self, key: str):
+        with self._lock:
+            self.calls += 1
+            item = self._live(key)
+            return None if item is None else item[0]
+
+    def mget(self, keys: List[str]) -> List[Any]:
+        with self._lock:
+            self.calls += 1
+            return [None if item is None else item[0] for item in map(self._live, keys)]
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self.calls += 1
+            self._data[key] = (value if isinstance(value, bytes) else str(value).encode(), None)
+        return True
+
+    def setex(self, key: str, ttl: int, value: Any):
+        self.set(key, value)
+        with self._lock:
+            self._data[key] = (self._data[key][0], time.time() + ttl)
+        return True
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self.calls += 1
+            item = self._live(key)
+            value = int(item[0]) + 1 if item else 1
+            self._data[key] = (str(value).encode(), item[1] if item else None)
+            return value
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            self.calls += 1
+            return sum(self._data.pop(k, None) is not None for k in keys)
+
+
+class FakeQueue:
+    """
+    Stand-in for the rq Queue: enqueue() records the job, run_all() awaits
+    the recorded process_file() coroutines in order.
+    """
+
+    def __init__(self):
+        self.jobs = []
+
+    def enqueue(self, fn: Callable, *args, **kwargs):
+        self.jobs.append((fn, args, kwargs))
+        return SimpleNamespace(id=str(len(self.jobs)))
+
+    async def run_all(self) -> List[Any]:
+        results = []
+        while self.jobs:
+            fn, args, kwargs = self.jobs.pop(0)
+            results.append(await fn(*args, **kwargs))
+        return results
@@ -0,0 +1,109 @@
+"""
+Recall@k and latency: dense-only search vs. BM25 + dense fusion (HYBRID_SEARCH).
+
+The corpus repeats a handful of topics across many clauses that differ only
+in their clause number and ICD code, and each query asks for one clause by
+those identifiers. Embeddings come from `topic_embedding`, which weights
+identifiers low the way real dense models tend to blur them, so the numbers
+show the shape of the gap, not Gemini's absolute recall.
+
+Run from backend/:  python -m bench.hybrid_recall --chunks 2000 --queries 200
+"""
+import argparse
+import json
+import random
+import string
+import time
+import uuid
+
+from .offline import offline_env
+
+offline_env()
+
+from qdrant_client.http import models as qmodels  # noqa: E402
+
+from app.queue import vectorStore  # noqa: E402
+from app.queue.ingest import chunk_id  # noqa: E402
+from app.queue.lexical_index import SegmentBuilder, write_segment  # noqa: E402
+from app.queue.qdrant_pool import ensure_collection, get_qdrant_client, point_vector, vector_layout  # noqa: E402
+from .fakes import FakeGeminiClient, topic_embedding  # noqa: E402
+from .offline import install_fake_gemini  # noqa: E402
+
+TOPICS = ["knee replacement surgery", "maternity and newborn cover", "cataract treatment",
+          "pre-existing disease waiting period", "room rent limit", "ambulance charges",
+          "day care procedures", "organ donor expenses"]
+
+
+def icd_code(rng: random.Random) -> str:
+    return f"{rng.choice(string.ascii_uppercase)}{rng.randint(10, 99)}.{rng.randint(0, 9)}"
+
+
+def build_corpus(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    chunks = []
+    for i in range(n):
+        section = f"{i // 20 + 1}.{i % 20 + 1}"
+        code, topic = icd_code(rng), TOPICS[i % len(TOPICS)]
+        chunks.append({
+            "section": section, "code": code, "topic": topic,
+            "text": f"Section {section}: {topic} for diagnosis {code} is covered up to the "
+                    f"sum insured after the applicable waiting period and co-payment.",
+        })
+    return chunks
+
+
+def seed(chunks, collection_name: str, dims: int = 768):
+    ensure_collection(collection_name, dims=dims)
+    layout = vector_layout(collection_name)
+    builder = SegmentBuilder("bench-policy")
+    points = []
+    for c in chunks:
+        c["id"] = chunk_id("bench-policy", c["text"])
+        builder.add(c["id"], c["text"])
+        points.append(qmodels.PointStruct(
+            id=c["id"], vector=point_vector(topic_embedding(c["text"], dims), layout),
+            payload={"page_content": c["text"], "metadata": {"_chunk_id": c["id"]}}))
+    client = get_qdrant_client()
+    for i in range(0, len(points), 256):
+        client.upsert(collection_name, points=points[i:i + 256])
+    write_segment(collection_name, builder)
+
+
+def run(queries, top_k: int, collection_name: str, hybrid: bool):
+    vectorStore.HYBRID_SEARCH = hybrid
+    found, latencies = 0, []
+    for text, target in queries:
+        start = time.perf_counter()
+        hits = vectorStore.multi_search_vector_store([text], top_k=top_k, collection_name=collection_name)
+        latencies.append(time.perf_counter() - start)
+        found += any(str(uuid.UUID(str(h.metadata["_id"]))) == target for h in hits)
+    latencies.sort()
+    return {f"recall@{top_k}": round(found / len(queries), 3),
+            "p50_ms": round(1000 * latencies[len(latencies) // 2], 2),
+            "p99_ms": round(1000 * latencies[int(len(latencies) * 0.99) - 1], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=5)
+    args = parser.parse_args()
+
+    install_fake_gemini(FakeGeminiClient(latency=0.0, embed=topic_embedding))
+    collection_name = "bench_hybrid"
+    chunks = build_corpus(args.chunks)
+    seed(chunks, collection_name)
+
+    targets = random.Random(1).sample(chunks, min(args.queries, len(chunks)))
+    queries = [(f"Is {t['topic']} for {t['code']} covered under section {t['section']}?", t["id"])
+               for t in targets]
+
+    report = {"chunks": args.chunks, "queries": len(queries), "top_k": args.top_k}
+    report["dense"] = run(queries, args.top_k, collection_name, hybrid=False)
+    report["hybrid"] = run(queries, args.top_k, collection_name, hybrid=True)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Peak worker RSS while ingesting synthetic PDFs of growing size.
+
+Each (mode, pages) pair runs in a fresh subprocess so ru_maxrss is not shared.
+`legacy` reproduces the old create_vector_store (load every page, split
+everything, then embed/upsert); `streaming` is the current one. Vectors go to
+a discarding sink, since Qdrant's memory lives in its own process in production.
+
+Run from backend/:  python -m bench.ingest_memory --pages 10 200 2000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from .offline import offline_env
+
+
+def child(mode: str, pdf_path: str) -> dict:
+    offline_env()
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain.text_splitter import RecursiveCharacterTextSplitter
+    from app.queue import vectorStore
+    from .fakes import FakeGeminiClient, NullVectorStore
+    from .offline import install_fake_gemini
+
+    install_fake_gemini(FakeGeminiClient(latency=0.0))
+    sink = NullVectorStore(vectorStore.GeminiEmbeddings(dims=768))
+    start = time.perf_counter()
+    if mode == "legacy":
+        documents = PyPDFLoader(pdf_path).load()
+        split_docs = RecursiveCharacterTextSplitter(
+            chunk_size=1500, chunk_overlap=150).split_documents(documents)
+        sink.add_documents(split_docs)
+    else:
+        vectorStore.ensure_collection = lambda *a, **k: None
+        vectorStore.get_vector_store = lambda *a, **k: sink
+        vectorStore.store_policy_attributes = lambda *a, **k: None
+        vectorStore.create_vector_store(pdf_path)
+    elapsed = time.perf_counter() - start
+    return {"mode": mode, "chunks": sink.documents, "seconds": round(elapsed, 2),
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[10, 200, 2000])
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "PDF"))
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(*args.child)))
+        return
+
+    from .pdfs import write_policy_pdf
+    report = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for pages in args.pages:
+            pdf = write_policy_pdf(os.path.join(tmp, f"policy_{pages}.pdf"), pages)
+            for mode in ("legacy", "streaming"):
+                out = subprocess.run(
+                    [sys.executable, "-m", "bench.ingest_memory", "--child", mode, pdf],
+                    capture_output=True, text=True, check=True)
+                row = json.loads(out.stdout.strip().splitlines()[-1])
+                row["pages"] = pages
+                report.append(row)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
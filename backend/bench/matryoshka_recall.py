@@ -0,0 +1,145 @@
+"""
+Recall@k vs. latency: full-vector search vs. two-stage search (prefix-vector
+prefetch, full-vector rescoring; see qdrant_pool.dense_request) for several
+prefix sizes and candidate counts.
+
+Embeddings are synthetic but Matryoshka-shaped: clustered, with variance
+falling off along the dimensions, so a prefix carries most of the signal as
+it does for gemini-embedding-001. Recall is measured against exact full-vector
+top-k (NumPy) through the real query requests. By default Qdrant runs
+in-memory, where search is an exact scan, quantization is ignored and the
+prefetch path is slow pure Python; scan_p50_ms is therefore also reported,
+timing the same work as a brute-force NumPy scan (full vectors, or prefix
+scan + rescoring of the candidates). Point QDRANT_URL at a server for HNSW +
+int8 latencies. ram_bytes_per_point counts the vectors kept in RAM (float32
+full vector vs. int8 prefix with the full vector on disk), not the HNSW graph.
+
+Run from backend/:  python -m bench.matryoshka_recall --chunks 20000 --queries 200
+"""
+import argparse
+import json
+import time
+import uuid
+
+import numpy as np
+
+from .offline import offline_env
+
+offline_env()
+
+from qdrant_client.http import models as qmodels  # noqa: E402
+
+from app.queue.collection_profiles import PROFILES, collection_params, get_profile  # noqa: E402
+from app.queue.qdrant_pool import dense_request, get_qdrant_client, layout_of, point_vector  # noqa: E402
+
+
+def make_embeddings(n: int, queries: int, dims: int, clusters: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    scale = (np.arange(dims) + 1.0) ** -0.5
+    centers = rng.normal(size=(clusters, dims))
+    corpus = (centers[rng.integers(0, clusters, n)] + 0.8 * rng.normal(size=(n, dims))) * scale
+    picks = rng.integers(0, n, queries)
+    query = corpus[picks] + 0.5 * rng.normal(size=(queries, dims)) * scale
+    return corpus.astype(np.float32), query.astype(np.float32)
+
+
+def exact_top_k(corpus: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    c = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    q = query / np.linalg.norm(query, axis=1, keepdims=True)
+    scores = q @ c.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def scan_latency(corpus: np.ndarray, queries: np.ndarray, k: int, prefix_dims: int = 0,
+                 candidates: int = 0) -> float:
+    """
+    p50 ms of the scoring work alone: full scan, or prefix scan + full rescore.
+    """
+    c = corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+    prefix = None
+    if prefix_dims:
+        prefix = corpus[:, :prefix_dims] / np.linalg.norm(corpus[:, :prefix_dims], axis=1, keepdims=True)
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        if prefix is None:
+            scores = c @ q
+            np.argpartition(-scores, k)[:k]
+        else:
+            ids = np.argpartition(-(prefix @ q[:prefix_dims]), candidates)[:candidates]
+            scores = c[ids] @ q
+            ids[np.argsort(-scores)[:k]]
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return round(1000 * latencies[len(latencies) // 2], 3)
+
+
+def load(collection_name: str, corpus: np.ndarray, profile):
+    client = get_qdrant_client()
+    if client.collection_exists(collection_name):
+        client.delete_collection(collection_name)
+    params = collection_params(profile, corpus.shape[1])
+    client.create_collection(collection_name, **params)
+    layout = layout_of(params["vectors_config"])
+    for start in range(0, len(corpus), 512):
+        client.upsert(collection_name, points=[
+            qmodels.PointStruct(id=i, vector=point_vector(corpus[i].tolist(), layout))
+            for i in range(start, min(start + 512, len(corpus)))])
+    return layout
+
+
+def run(collection_name: str, layout, queries: np.ndarray, truth: np.ndarray, k: int, candidates: int):
+    client = get_qdrant_client()
+    found, latencies = 0, []
+    for q, expected in zip(queries, truth):
+        request = dense_request(q.tolist(), k, layout, candidates=candidates, with_payload=False)
+        start = time.perf_counter()
+        points = client.query_batch_points(collection_name, requests=[request])[0].points
+        latencies.append(time.perf_counter() - start)
+        found += len({p.id for p in points} & set(expected.tolist()))
+    latencies.sort()
+    return {f"recall@{k}": round(found / truth.size, 4),
+            "p50_ms": round(1000 * latencies[len(latencies) // 2], 2),
+            "p99_ms": round(1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--clusters", type=int, default=400)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--prefix-dims", type=int, nargs="+", default=[64, 128, 256])
+    parser.add_argument("--candidates", type=int, nargs="+", default=[20, 50, 100, 200])
+    parser.add_argument("--profile", default=None, choices=list(PROFILES),
+                        help="collection profile for the two-stage runs (prefix size overridden)")
+    args = parser.parse_args()
+    profile = get_profile(args.profile)
+
+    corpus, queries = make_embeddings(args.chunks, args.queries, args.dims, args.clusters)
+    truth = exact_top_k(corpus, queries, args.top_k)
+    collection = f"bench-matryoshka-{uuid.uuid4().hex[:8]}"
+    report = {"chunks": args.chunks, "queries": args.queries, "dims": args.dims, "top_k": args.top_k,
+              "quantization": profile.quantization, "results": []}
+    try:
+        layout = load(collection, corpus, PROFILES["in_memory"])
+        report["results"].append({"mode": "full", "ram_bytes_per_point": 4 * args.dims,
+                                  **run(collection, layout, queries, truth, args.top_k, args.top_k),
+                                  "scan_p50_ms": scan_latency(corpus, queries, args.top_k)})
+        for prefix_dims in args.prefix_dims:
+            layout = load(collection, corpus, profile._replace(prefix_dims=prefix_dims))
+            ram = prefix_dims * (1 if layout.quantized else 4)
+            for candidates in args.candidates:
+                report["results"].append({
+                    "mode": "two_stage", "prefix_dims": prefix_dims, "candidates": candidates,
+                    "ram_bytes_per_point": ram,
+                    **run(collection, layout, queries, truth, args.top_k, candidates),
+                    "scan_p50_ms": scan_latency(corpus, queries, args.top_k, prefix_dims, candidates)})
+    finally:
+        get_qdrant_client().delete_collection(collection)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Wiring for running app code offline: call `offline_env()` before importing
+anything from `app`, then `install_fake_gemini()` once it is imported.
+"""
+import os
+import uuid
+import tempfile
+from typing import Any, List
+
+from .fakes import FakeGeminiClient, fake_embedding
+
+
+def offline_env(**overrides):
+    os.environ.setdefault("GEMINI_API_KEY", "offline-bench")
+    os.environ.setdefault("QDRANT_URL", ":memory:")
+    os.environ.setdefault("EMBEDDING_CACHE_PATH", "")
+    os.environ.setdefault("ANSWER_CACHE_REDIS_URL", "")
+    os.environ.setdefault("EXPANSION_CACHE_REDIS_URL", "")
+    os.environ.setdefault("LEXICAL_INDEX_DIR", tempfile.mkdtemp(prefix="claimiq-lexical-"))
+    for key, value in overrides.items():
+        os.environ[key] = str(value)
+
+
+def install_fake_gemini(client: FakeGeminiClient) -> FakeGeminiClient:
+    # instrumented like the real client, so stage and LLM metrics are recorded
+    from app.queue import vectorStore
+    from app.queue.metrics import instrument_client
+    vectorStore.gemini_client = instrument_client(client)
+    return client
+
+
+def synthetic_chunks(n: int, source: str = "policy.pdf", start: int = 0) -> List[dict]:
+    topics = ["knee surgery", "waiting period", "maternity cover", "sum insured",
+              "co-payment", "pre-existing disease", "room rent limit", "cataract"]
+    return [{
+        "page_content": f"Section {i // 10}.{i % 10}: {topics[i % len(topics)]} clause {i}. "
+                        f"The insurer shall pay for {topics[(i * 3) % len(topics)]} subject to terms.",
+        "metadata": {"source_document": source, "page": i // 4},
+    } for i in range(start, start + n)]
+
+
+def _points(chunks: List[dict], dims: int, layout: Any):
+    from qdrant_client.http import models as qmodels
+    from app.queue.qdrant_pool import point_vector
+    return [qmodels.PointStruct(
+        id=str(uuid.uuid4()),
+        vector=point_vector(fake_embedding(c["page_content"], dims), layout),
+        payload={"page_content": c["page_content"], "metadata": c["metadata"]},
+    ) for c in chunks]
+
+
+def seed_collection(chunks: List[dict], collection_name: str = "pdf_collection", dims: int = 768):
+    """
+    Load chunks into the pooled sync client (local in-memory Qdrant).
+    """
+    from app.queue.qdrant_pool import ensure_collection, get_qdrant_client, vector_layout
+    ensure_collection(collection_name, dims=dims)
+    get_qdrant_client().upsert(collection_name, points=_points(chunks, dims, vector_layout(collection_name)))
+
+
+async def aseed_collection(chunks: List[dict], collection_name: str = "pdf_collection", dims: int = 768):
+    """
+    Same for the pooled async client; in-memory mode gives it a separate store.
+    """
+    from app.queue.collection_profiles import collection_params, get_profile
+    from app.queue.qdrant_pool import avector_layout, get_async_qdrant_client
+    client = get_async_qdrant_client()
+    if not await client.collection_exists(collection_name):
+        await client.create_collection(collection_name, **collection_params(get_profile(), dims))
+    layout = await avector_layout(collection_name)
+    await client.upsert(collection_name, points=_points(chunks, dims, layout))
+
+
+async def mirror_to_async(collection_name: str = "pdf_collection"):
+    """
+    Copy every point of a collection from the pooled sync client to the async
+    one; in-memory mode gives each client its own store.
+    """
+    from qdrant_client.http import models as qmodels
+    from app.queue.qdrant_pool import get_async_qdrant_client, get_qdrant_client
+    source, target = get_qdrant_client(), get_async_qdrant_client()
+    params = source.get_collection(collection_name).config.params
+    if not await target.collection_exists(collection_name):
+        await target.create_collection(collection_name, vectors_config=params.vectors)
+    offset = None
+    while True:
+        points, offset = source.scroll(collection_name, limit=256, offset=offset,
+                                       with_payload=True, with_vectors=True)
+        if points:
+            await target.upsert(collection_name, points=[
+                qmodels.PointStruct(id=p.id, vector=p.vector, payload=p.payload) for p in points])
+        if offset is None:
+            return
+
+
+def install_fake_mongo():
+    """
+    Point every module that imported a Mongo collection at in-process stand-ins
+    (one per collection); returns the `files_collection` one.
+    """
+    import sys
+    from .fakes import FakeAsyncCollection
+    collections = {"files_collection": FakeAsyncCollection(),
+                   "policy_attributes_collection": FakeAsyncCollection()}
+    for name in ("app.db.collections.files", "app.db.collections.policy_attributes",
+                 "app.queue.worker", "app.server"):
+        module = sys.modules.get(name)
+        for attr, collection in collections.items():
+            if module is not None and hasattr(module, attr):
+                setattr(module, attr, collection)
+    return collections["files_collection"]
+
+
+def install_fake_redis():
+    """
+    Give the answer and expansion caches one in-process Valkey stand-in and
+    replace the rq queue used by /upload; returns (redis, queue).
+    """
+    import sys
+    from app.queue import answer_cache, expansion_cache
+    from .fakes import FakeQueue, FakeRedis
+    redis, queue = FakeRedis(), FakeQueue()
+    if answer_cache.ANSWER_CACHE_ENABLED:
+        answer_cache._cache = answer_cache.AnswerCache(redis=redis)
+    if expansion_cache.EXPANSION_CACHE_ENABLED:
+        expansion_cache._cache = expansion_cache.ExpansionCache(redis=redis)
+    for name in ("app.queue.create_queue", "app.server"):
+        module = sys.modules.get(name)
+        if module is not None and hasattr(module, "q"):
+            module.q = queue
+    return redis, queue
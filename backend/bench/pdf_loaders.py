@@ -0,0 +1,72 @@
+"""
+Pages/second of PDF text extraction per backend and per worker count.
+
+Fixture PDFs are generated (bench/pdfs.py) unless --pdf paths are given.
+Backends that are not installed here (pdftotext without poppler-utils,
+pymupdf) are reported as unavailable. Pool start-up is timed separately;
+every run uses an already warm pool, like a long-lived worker.
+
+Run from backend/:  python -m bench.pdf_loaders --pages 50 500 --workers 1 2 4
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from app.queue.pdf_loaders import BACKENDS, backend_available, get_pool, iter_pdf_pages, shutdown_pools
+from .pdfs import write_policy_pdf
+
+
+def run(path: str, backend: str, workers: int, pages_per_task: int) -> dict:
+    start = time.perf_counter()
+    pages = chars = 0
+    metadata_keys = None
+    for _, page in iter_pdf_pages(path, backend=backend, workers=workers, pages_per_task=pages_per_task):
+        pages += 1
+        chars += len(page.page_content)
+        metadata_keys = metadata_keys or sorted(page.metadata)
+    seconds = time.perf_counter() - start
+    return {"pages": pages, "chars": chars, "seconds": round(seconds, 3),
+            "pages_per_sec": round(pages / seconds, 1), "metadata": metadata_keys}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, nargs="+", default=[50, 500])
+    parser.add_argument("--pdf", nargs="*", default=[], help="benchmark these files instead of fixtures")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS))
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, 4, os.cpu_count() or 1}))
+    parser.add_argument("--pages-per-task", type=int, default=16)
+    parser.add_argument("--repeat", type=int, default=3, help="best of N runs")
+    args = parser.parse_args()
+
+    report = {"cores": os.cpu_count(), "pages_per_task": args.pages_per_task,
+              "unavailable": [b for b in args.backends if not backend_available(b)],
+              "pool_start_s": {}, "results": []}
+    backends = [b for b in args.backends if backend_available(b)]
+    for workers in args.workers:
+        if workers > 1:
+            start = time.perf_counter()
+            pool = get_pool(workers)
+            list(pool.map(abs, range(workers)))
+            report["pool_start_s"][workers] = round(time.perf_counter() - start, 3)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = args.pdf or [write_policy_pdf(os.path.join(tmp, f"policy_{n}.pdf"), n) for n in args.pages]
+        for path in files:
+            for backend in backends:
+                baseline = None
+                for workers in args.workers:
+                    runs = [run(path, backend, workers, args.pages_per_task) for _ in range(args.repeat)]
+                    best = min(runs, key=lambda r: r["seconds"])
+                    baseline = baseline or best["seconds"]
+                    report["results"].append({
+                        "file": os.path.basename(path), "backend": backend, "workers": workers, **best,
+                        "speedup_vs_first": round(baseline / best["seconds"], 2)})
+    shutdown_pools()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
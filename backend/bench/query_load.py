@@ -0,0 +1,75 @@
+"""
+/query under concurrent load: the async handler vs. the old blocking one.
+
+The old handler called the synchronous retrieve() from an `async def`, so
+concurrent requests serialized on the event loop. Both variants are served
+by the same app over an in-process ASGI transport with a fake Gemini client.
+
+Run from backend/:  python -m bench.query_load --requests 20 --latency 0.1
+"""
+import argparse
+import asyncio
+import json
+import time
+
+from .offline import offline_env
+
+# measure the pipeline itself, not answer-cache hits
+offline_env(ANSWER_CACHE_ENABLED="false")
+
+import httpx  # noqa: E402
+
+from app.server import app  # noqa: E402
+from app.queue.vectorStore import retrieve  # noqa: E402
+from .fakes import FakeGeminiClient  # noqa: E402
+from .offline import install_fake_gemini, synthetic_chunks, seed_collection, aseed_collection  # noqa: E402
+
+
+@app.post("/bench/query-blocking")
+async def query_blocking(request: dict):
+    # reproduces the previous /query handler
+    return {"status": "success", "data": retrieve(user_query=request["query"])}
+
+
+async def fire(client: httpx.AsyncClient, path: str, n: int):
+    latencies = []
+
+    async def one(i: int):
+        start = time.perf_counter()
+        r = await client.post(path, json={"query": f"is knee surgery covered {i}"})
+        r.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(n)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {"wall_seconds": round(wall, 3),
+            "requests_per_sec": round(n / wall, 2),
+            "p50": round(latencies[len(latencies) // 2], 3),
+            "max": round(latencies[-1], 3)}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--chunks", type=int, default=500)
+    args = parser.parse_args()
+
+    install_fake_gemini(FakeGeminiClient(latency=args.latency))
+    chunks = synthetic_chunks(args.chunks)
+    seed_collection(chunks)
+    await aseed_collection(chunks)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        report = {"requests": args.requests, "llm_latency": args.latency}
+        report["blocking"] = await fire(client, "/bench/query-blocking", args.requests)
+        report["async"] = await fire(client, "/query", args.requests)
+    report["speedup"] = round(report["blocking"]["wall_seconds"] / report["async"]["wall_seconds"], 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
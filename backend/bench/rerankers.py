@@ -0,0 +1,98 @@
+"""
+Reranker latency (p50/p99) and ranking quality (hit@k, MRR) on the
+hybrid_recall fixture corpus.
+
+Each query's candidates are its top dense hits; every reranker orders the
+same candidate lists. The fake Gemini reranker echoes retrieval order after
+`--llm-latency` seconds, so its quality row equals "retrieval" and only its
+latency (and budget fallback) is informative.
+
+Run from backend/:  python -m bench.rerankers --queries 100 --llm-latency 0.8 --budget 0.5
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from .offline import offline_env
+
+# the embedding cache is on in production; with it the local reranker's query
+# embedding is a lookup once the query has been seen
+offline_env(EMBEDDING_CACHE_PATH=os.path.join(tempfile.mkdtemp(), "embeddings.sqlite3"))
+
+from app.queue import vectorStore  # noqa: E402
+from app.queue.reranker import BudgetedReranker, ranked, rerank_candidates  # noqa: E402
+from .fakes import FakeGeminiClient, topic_embedding  # noqa: E402
+from .offline import install_fake_gemini  # noqa: E402
+from .hybrid_recall import build_corpus, seed  # noqa: E402
+
+
+class RetrievalOrder:
+    name = "retrieval"
+
+    def rerank(self, query, chunks):
+        return ranked(rerank_candidates(chunks), [1.0 - i / len(chunks) for i in range(len(chunks))])
+
+
+def evaluate(reranker, cases, top_k: int):
+    latencies, hits, rr = [], 0, 0.0
+    for query, target, chunks in cases:
+        start = time.perf_counter()
+        out = reranker.rerank(query, chunks)
+        latencies.append(time.perf_counter() - start)
+        ids = [c["chunk_id"] for c in out]
+        if target in ids:
+            rank = ids.index(target) + 1
+            hits += rank <= top_k
+            rr += 1.0 / rank
+    latencies.sort()
+    return {f"hit@{top_k}": round(hits / len(cases), 3),
+            "mrr": round(rr / len(cases), 3),
+            "p50_ms": round(1000 * latencies[len(latencies) // 2], 2),
+            "p99_ms": round(1000 * latencies[int(len(latencies) * 0.99) - 1], 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--candidates", type=int, default=20)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--budget", type=float, default=0.5)
+    args = parser.parse_args()
+
+    client = install_fake_gemini(FakeGeminiClient(latency=0.0, embed=topic_embedding))
+    collection_name = "bench_rerank"
+    chunks = build_corpus(args.chunks)
+    seed(chunks, collection_name)
+
+    vectorStore.HYBRID_SEARCH = False
+    cases = []
+    for t in random.Random(2).sample(chunks, min(args.queries, len(chunks))):
+        query = f"Is {t['topic']} for {t['code']} covered under section {t['section']}?"
+        candidates = vectorStore.multi_search_vector_store(
+            [query], top_k=args.candidates, collection_name=collection_name)
+        cases.append((query, t["id"], candidates))
+
+    report = {"queries": len(cases), "candidates": args.candidates,
+              "in_candidates": round(sum(any(c.metadata["_chunk_id"] == t for c in cs)
+                                         for _, t, cs in cases) / len(cases), 3)}
+    report["retrieval"] = evaluate(RetrievalOrder(), cases, args.top_k)
+    report["local"] = evaluate(vectorStore.get_reranker("local"), cases, args.top_k)
+
+    # LLM reranker: only the latency matters here, so a subset of queries is enough
+    client.latency = args.llm_latency
+    llm_cases = cases[:max(10, len(cases) // 10)]
+    gemini = vectorStore.get_reranker("gemini")
+    gemini.budget = 60.0
+    report["gemini_unbudgeted"] = evaluate(gemini, llm_cases, args.top_k)
+    report[f"gemini_budget_{args.budget}s"] = evaluate(
+        BudgetedReranker("gemini", gemini.score, gemini.fallback, budget=args.budget), llm_cases, args.top_k)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,298 @@
+"""
+Offline benchmark suite: ingestion throughput and query latency on a laptop,
+with no network and no Docker services.
+
+Gemini is FakeGeminiClient (deterministic output, --latency per call,
+--error-rate failures), Qdrant runs in local in-memory mode, and Mongo,
+Valkey and the rq queue are in-process stand-ins. Inputs are synthetic
+policy PDFs.
+
+Every scenario runs in a fresh subprocess, so peak_rss_mb (ru_maxrss) is that
+scenario's own. The report is one JSON document for regression tracking:
+
+    {"config": {...}, "scenarios": {"ingest_5p": {"pages_per_sec": ..., "peak_rss_mb": ...},
+                                    "retrieve": {"p50_ms": ..., "p95_ms": ..., "p99_ms": ...}, ...}}
+
+Scenarios:
+    ingest_<N>p   put_pdf() on an N-page PDF (one per --pages value)
+    worker        process_file() for --jobs uploads, Mongo stand-in updated as in production
+    retrieve      retrieve() latency, cold (use_cache=False) and answer-cache hits
+    rag_pipeline  rag_pipeline() latency with an applicant rules check
+    http          POST /upload (+ queued job), /query, /query/stream, /query/batch,
+                  /eligibility and /adjudicate over an in-process ASGI transport
+
+Run from backend/:
+    python -m bench.suite --out bench-results.json
+    python -m bench.suite --scenarios ingest retrieve --pages 5 50 --latency 0.05 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List
+
+import numpy as np
+
+from .offline import offline_env
+from .pdfs import write_policy_pdf
+
+SCENARIOS = ("ingest", "worker", "retrieve", "rag_pipeline", "http")
+QUERY_TOPICS = ["knee surgery", "waiting period", "maternity cover", "sum insured",
+                "co-payment", "pre-existing disease", "room rent limit", "cataract"]
+
+
+def percentiles(seconds: List[float], failed: int = 0) -> Dict[str, float]:
+    # latencies of successful requests; failures (e.g. from --error-rate) are only counted
+    report = {"requests": len(seconds) + failed, "failed": failed}
+    if seconds:
+        p50, p95, p99 = np.percentile(np.asarray(seconds) * 1000, [50, 95, 99])
+        report.update(p50_ms=round(float(p50), 2), p95_ms=round(float(p95), 2), p99_ms=round(float(p99), 2))
+    return report
+
+
+def queries(n: int, start: int = 0) -> List[str]:
+    # distinct (no answer-cache hits) and long enough that adaptive expansion does not skip them
+    return [f"is {QUERY_TOPICS[i % len(QUERY_TOPICS)]} covered for claim number {i} under this policy"
+            for i in range(start, start + n)]
+
+
+def timed(fn, items) -> Dict[str, float]:
+    out, failed = [], 0
+    for item in items:
+        start = time.perf_counter()
+        try:
+            fn(item)
+        except Exception:
+            failed += 1
+            continue
+        out.append(time.perf_counter() - start)
+    return percentiles(out, failed)
+
+
+def _setup(args):
+    from app.queue import vectorStore
+    from .fakes import FakeGeminiClient
+    from .offline import install_fake_gemini
+    client = install_fake_gemini(FakeGeminiClient(latency=args.latency, error_rate=args.error_rate))
+    return vectorStore, client
+
+
+def _ingest_stats(stats: Dict[str, Any], seconds: float) -> Dict[str, Any]:
+    return {"pages": stats["pages"], "chunks": stats["chunks"], "seconds": round(seconds, 3),
+            "pages_per_sec": round(stats["pages"] / seconds, 2),
+            "chunks_per_sec": round(stats["chunks"] / seconds, 2)}
+
+
+# ===== Scenarios (each runs in its own process) =====
+def run_ingest(args, workdir: str) -> Dict[str, Any]:
+    vectorStore, client = _setup(args)
+    path = write_policy_pdf(os.path.join(workdir, f"policy-{args.pages[0]}p.pdf"), args.pages[0])
+    start = time.perf_counter()
+    stats = vectorStore.put_pdf(path)
+    report = _ingest_stats(stats, time.perf_counter() - start)
+    report["llm_calls"] = dict(client.calls)
+    return report
+
+
+def run_worker(args, workdir: str) -> Dict[str, Any]:
+    vectorStore, client = _setup(args)
+    from app.queue import worker
+    from .offline import install_fake_mongo
+    files = install_fake_mongo()
+    paths = [write_policy_pdf(os.path.join(workdir, f"upload-{i}.pdf"), args.worker_pages)
+             for i in range(args.jobs)]
+
+    async def jobs():
+        out, timings = [], []
+        for path in paths:
+            inserted = await files.insert_one({"name": os.path.basename(path), "status": "queued"})
+            out.append(await worker.process_file(str(inserted.inserted_id), path))
+            doc = await files.find_one({"_id": inserted.inserted_id})
+            timings.append(doc.get("timings", {}))
+        return out, timings
+
+    start = time.perf_counter()
+    results, timings = asyncio.run(jobs())
+    seconds = time.perf_counter() - start
+    failed = sum(r["status"] != "ready" for r in results)
+    pages = args.jobs * args.worker_pages
+    # per-stage seconds summed over jobs, from the timings the worker stores on each file
+    stages: Dict[str, float] = {}
+    for t in timings:
+        for stage, s in t.get("stages", {}).items():
+            stages[stage] = round(stages.get(stage, 0.0) + s["seconds"], 3)
+    return {"jobs": args.jobs, "failed": failed, "seconds": round(seconds, 3),
+            "jobs_per_min": round(60 * args.jobs / seconds, 1),
+            "pages_per_sec": round(pages / seconds, 2), "stage_seconds": stages,
+            "llm_calls": dict(client.calls)}
+
+
+def _seed(vectorStore, args, workdir: str) -> None:
+    path = write_policy_pdf(os.path.join(workdir, "corpus.pdf"), args.corpus_pages)
+    vectorStore.put_pdf(path)
+
+
+def run_retrieve(args, workdir: str) -> Dict[str, Any]:
+    vectorStore, client = _setup(args)
+    from .offline import install_fake_redis
+    install_fake_redis()
+    _seed(vectorStore, args, workdir)
+    qs = queries(args.queries)
+    cold = timed(lambda q: vectorStore.retrieve(q, use_cache=False), qs)
+    timed(vectorStore.retrieve, qs)  # fill the answer cache
+    cached = timed(vectorStore.retrieve, qs)
+    return {"cold": cold, "cached": cached, "llm_errors": client.errors}
+
+
+def run_rag_pipeline(args, workdir: str) -> Dict[str, Any]:
+    vectorStore, client = _setup(args)
+    from .offline import install_fake_redis
+    install_fake_redis()
+    _seed(vectorStore, args, workdir)
+    applicant = {"age": 40, "policy_months": 12}
+    report = timed(lambda q: vectorStore.rag_pipeline(q, applicant_context=applicant), queries(args.queries))
+    return dict(report, llm_errors=client.errors)
+
+
+def run_http(args, workdir: str) -> Dict[str, Any]:
+    vectorStore, client = _setup(args)
+    import httpx
+    from app import server
+    from .offline import install_fake_mongo, install_fake_redis, mirror_to_async
+    install_fake_mongo()
+    _, queue = install_fake_redis()
+    pdf = write_policy_pdf(os.path.join(workdir, "upload.pdf"), args.corpus_pages)
+    qs = queries(args.queries)
+
+    async def requests(http: httpx.AsyncClient) -> Dict[str, Any]:
+        report: Dict[str, Any] = {}
+
+        async def timed_post(path: str, **kwargs) -> float:
+            start = time.perf_counter()
+            r = await http.post(path, **kwargs)
+            r.raise_for_status()
+            return time.perf_counter() - start
+
+        async def latency(path: str, bodies: List[Dict[str, Any]]) -> Dict[str, float]:
+            out, failed = [], 0
+            for body in bodies:
+                try:
+                    out.append(await timed_post(path, json=body))
+                except httpx.HTTPStatusError:
+                    failed += 1
+            return percentiles(out, failed)
+
+        start = time.perf_counter()
+        with open(pdf, "rb") as f:
+            r = await http.post("/upload", files={"file": ("upload.pdf", f, "application/pdf")})
+        r.raise_for_status()
+        file_id = r.json()["file_id"]
+        upload_s = time.perf_counter() - start
+        await queue.run_all()
+        report["upload"] = {"request_ms": round(1000 * upload_s, 2),
+                            "end_to_end_s": round(time.perf_counter() - start, 3)}
+        # /query and /query/stream use the async Qdrant client, a separate store in memory mode
+        await mirror_to_async(vectorStore.COLLECTION_NAME)
+
+        report["query"] = await latency("/query", [{"query": q} for q in qs])
+        # failures mid-stream arrive as "error" events on a 200 response
+        report["query_stream"] = await latency("/query/stream", [{"query": q} for q in queries(len(qs), len(qs))])
+        batch_s = await timed_post("/query/batch", json={"queries": queries(len(qs), 2 * len(qs))})
+        report["query_batch"] = {"queries": len(qs), "seconds": round(batch_s, 3),
+                                 "queries_per_sec": round(len(qs) / batch_s, 2)}
+        applicant = {"age": 40, "policy_months": 12, "claim_amount": 50000}
+        report["eligibility"] = await latency(
+            "/eligibility", [{"file_id": file_id, "applicant": applicant} for _ in qs])
+        rows = "age,policy_months,claim_amount\n" + "".join(
+            f"{18 + i % 60},{i % 48},{1000 * (i % 500)}\n" for i in range(args.adjudicate_rows))
+        adjudicate_s = await timed_post(f"/adjudicate?file_id={file_id}", content=rows,
+                                        headers={"content-type": "text/csv"})
+        report["adjudicate"] = {"rows": args.adjudicate_rows, "seconds": round(adjudicate_s, 3),
+                                "rows_per_sec": round(args.adjudicate_rows / adjudicate_s)}
+        return report
+
+    async def run():
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as http:
+            return await requests(http)
+
+    report = asyncio.run(run())
+    report["llm_errors"] = client.errors
+    return report
+
+
+RUNNERS = {"ingest": run_ingest, "worker": run_worker, "retrieve": run_retrieve,
+           "rag_pipeline": run_rag_pipeline, "http": run_http}
+
+
+def child(args) -> None:
+    workdir = tempfile.mkdtemp(prefix="claimiq-bench-")
+    offline_env(UPLOAD_DIR=workdir)
+    try:
+        report = RUNNERS[args.child](args, workdir)
+        report["ok"] = True
+    except Exception as e:
+        report = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    report["peak_rss_mb"] = round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    print("BENCH_RESULT " + json.dumps(report))
+
+
+def run_child(args, scenario: str, extra: List[str]) -> Dict[str, Any]:
+    cmd = [sys.executable, "-m", "bench.suite", "--child", scenario,
+           "--latency", str(args.latency), "--error-rate", str(args.error_rate),
+           "--queries", str(args.queries), "--jobs", str(args.jobs),
+           "--worker-pages", str(args.worker_pages), "--corpus-pages", str(args.corpus_pages),
+           "--adjudicate-rows", str(args.adjudicate_rows)] + extra
+    out = subprocess.run(cmd, capture_output=True, text=True, cwd=os.getcwd())
+    for line in out.stdout.splitlines():
+        if line.startswith("BENCH_RESULT "):
+            return json.loads(line[len("BENCH_RESULT "):])
+    return {"ok": False, "error": (out.stderr or out.stdout)[-2000:]}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--pages", type=int, nargs="+", default=[5, 50, 200])
+    parser.add_argument("--latency", type=float, default=0.02, help="fake Gemini seconds per call")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fake Gemini failure probability")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--jobs", type=int, default=4)
+    parser.add_argument("--worker-pages", type=int, default=10)
+    parser.add_argument("--corpus-pages", type=int, default=20)
+    parser.add_argument("--adjudicate-rows", type=int, default=10000)
+    parser.add_argument("--out", help="also write the JSON report here")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args)
+
+    report = {"config": {k: v for k, v in vars(args).items() if k not in ("child", "out")},
+              "python": platform.python_version(), "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "scenarios": {}}
+    for scenario in args.scenarios:
+        if scenario == "ingest":
+            for pages in args.pages:
+                report["scenarios"][f"ingest_{pages}p"] = run_child(args, scenario, ["--pages", str(pages)])
+        else:
+            report["scenarios"][scenario] = run_child(args, scenario, [])
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    if not all(s.get("ok") for s in report["scenarios"].values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Scoped retrieval on a multi-tenant corpus: unscoped vs. per-tenant vs.
+per-document search (vectorStore.SearchScope -> indexed payload filter).
+
+Every tenant uploads the same kinds of policies, so clauses of one type look
+alike across tenants and documents: an unscoped search for a clause of one
+document mostly returns other tenants' copies. Reported per scope:
+
+- in_scope / bm25_in_scope: share of the dense / BM25 top-k hits inside
+  the query's own tenant (tenant scope) or document (other runs)
+- p50_ms / p99_ms: the real query requests (vectorStore._dense_hits)
+- scan_p50_ms: the same work as a NumPy scan over only the scope's vectors,
+  which is what an indexed filter buys on a server; by default Qdrant runs
+  in-memory, where a filter is checked point by point over the whole
+  collection. Point QDRANT_URL at a server for payload-index latencies.
+
+Run from backend/:  python -m bench.tenant_scope --tenants 20 --docs 5 --chunks 200
+"""
+import argparse
+import json
+import time
+import uuid
+
+import numpy as np
+
+from .offline import offline_env
+
+offline_env()
+
+from qdrant_client.http import models as qmodels  # noqa: E402
+
+from app.queue import vectorStore  # noqa: E402
+from app.queue.collection_profiles import PROFILES, get_profile  # noqa: E402
+from app.queue.ingest import chunk_id  # noqa: E402
+from app.queue.lexical_index import SegmentBuilder, get_lexical_index, write_segment  # noqa: E402
+from app.queue.qdrant_pool import forget_collection, get_qdrant_client, point_vector, provision_collection  # noqa: E402
+from app.queue.vectorStore import SearchScope, scope_documents, scope_filter, tenant_document_id  # noqa: E402
+
+CLAUSES = ["knee replacement", "maternity cover", "cataract surgery", "waiting period",
+           "room rent limit", "ambulance charges", "day care procedure", "organ donor",
+           "co-payment", "sum insured", "pre-existing disease", "ayush treatment"]
+
+
+def make_corpus(tenants: int, docs: int, chunks: int, dims: int, seed: int = 0):
+    """
+    Chunks as (tenant_id, document_id, text) plus their vectors: a shared
+    center per clause type, a small per-document offset and noise.
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(len(CLAUSES), dims))
+    rows, vectors = [], []
+    for t in range(tenants):
+        tenant_id = f"tenant-{t:03d}"
+        for d in range(docs):
+            document_id = tenant_document_id(tenant_id, f"policy_{d}.pdf")
+            offset = 0.3 * rng.normal(size=dims)
+            for i in range(chunks):
+                clause = i % len(CLAUSES)
+                rows.append((tenant_id, document_id,
+                             f"Clause {i}: {CLAUSES[clause]} is covered subject to the policy schedule."))
+                vectors.append(centers[clause] + offset + 0.6 * rng.normal(size=dims))
+    return rows, np.asarray(vectors, dtype=np.float32)
+
+
+def load(collection_name: str, rows, vectors: np.ndarray, profile) -> list:
+    client = get_qdrant_client()
+    layout = provision_collection(collection_name, vectors.shape[1], profile)
+    ids = [chunk_id(document_id, text) for _, document_id, text in rows]
+    for start in range(0, len(rows), 512):
+        client.upsert(collection_name, points=[
+            qmodels.PointStruct(id=ids[i], vector=point_vector(vectors[i].tolist(), layout), payload={
+                "page_content": rows[i][2],
+                "metadata": {"document_id": rows[i][1], "tenant_id": rows[i][0],
+                             "source_document": rows[i][1].rpartition("/")[2]}})
+            for i in range(start, min(start + 512, len(rows)))])
+    segments = {}
+    for (_, document_id, text), pid in zip(rows, ids):
+        segments.setdefault(document_id, SegmentBuilder(document_id)).add(pid, text)
+    for builder in segments.values():
+        write_segment(collection_name, builder)
+    get_lexical_index(collection_name).refresh(force=True)
+    return ids
+
+
+def scan_latency(vectors: np.ndarray, mask: np.ndarray, queries: np.ndarray, k: int) -> float:
+    """
+    p50 ms of scoring the scope's vectors only (mask: per query, rows in scope).
+    """
+    unit = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    latencies = []
+    for q, rows in zip(queries, mask):
+        start = time.perf_counter()
+        scores = unit[rows] @ q
+        np.argpartition(-scores, min(k, len(scores) - 1))[:k]
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return round(1000 * latencies[len(latencies) // 2], 3)
+
+
+def run(collection_name: str, rows, ids, vectors: np.ndarray, targets: np.ndarray, queries: np.ndarray,
+        k: int, kind: str):
+    index = get_lexical_index(collection_name)
+    row_of = {pid: i for i, pid in enumerate(ids)}
+    tenant_of = np.asarray([r[0] for r in rows])
+    document_of = np.asarray([r[1] for r in rows])
+    dense_in = lexical_in = 0
+    latencies, masks = [], []
+    for target, q in zip(targets, queries):
+        tenant_id, document_id, text = rows[target]
+        scope = {"none": None,
+                 "tenant": SearchScope(tenant_id=tenant_id),
+                 "document": SearchScope(document_ids=(document_id,), tenant_id=tenant_id)}[kind]
+        # hits count as in scope for the narrowest scope the query is about
+        wanted = document_of == document_id if kind != "tenant" else tenant_of == tenant_id
+        masks.append(wanted if scope is not None else np.ones(len(rows), dtype=bool))
+        start = time.perf_counter()
+        hits = vectorStore._dense_hits([q.tolist()], k, collection_name, scope_filter(scope))[0]
+        latencies.append(time.perf_counter() - start)
+        dense_in += sum(wanted[row_of[str(d.metadata["_id"])]] for d in hits)
+        lexical = index.search(text, k, scope_documents(scope))
+        lexical_in += sum(wanted[row_of[pid]] for pid, _ in lexical)
+    latencies.sort()
+    total = k * len(targets)
+    return {"scope": kind,
+            "points_scanned": int(np.mean([m.sum() for m in masks])),
+            "in_scope": round(dense_in / total, 4),
+            "bm25_in_scope": round(lexical_in / total, 4),
+            "p50_ms": round(1000 * latencies[len(latencies) // 2], 2),
+            "p99_ms": round(1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 2),
+            "scan_p50_ms": scan_latency(vectors, masks, queries, k)}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tenants", type=int, default=20)
+    parser.add_argument("--docs", type=int, default=5, help="documents per tenant")
+    parser.add_argument("--chunks", type=int, default=200, help="chunks per document")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--dims", type=int, default=768)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--profile", default=None, choices=list(PROFILES))
+    args = parser.parse_args()
+
+    rows, vectors = make_corpus(args.tenants, args.docs, args.chunks, args.dims)
+    rng = np.random.default_rng(1)
+    targets = rng.integers(0, len(rows), args.queries)
+    queries = vectors[targets] + 0.3 * rng.normal(size=(args.queries, args.dims)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    collection = f"bench-tenants-{uuid.uuid4().hex[:8]}"
+    report = {"tenants": args.tenants, "docs_per_tenant": args.docs, "chunks_per_doc": args.chunks,
+              "points": len(rows), "top_k": args.top_k, "profile": args.profile or "default",
+              "results": []}
+    try:
+        start = time.perf_counter()
+        ids = load(collection, rows, vectors, get_profile(args.profile))
+        report["load_s"] = round(time.perf_counter() - start, 2)
+        for kind in ("none", "tenant", "document"):
+            report["results"].append(run(collection, rows, ids, vectors, targets, queries, args.top_k, kind))
+    finally:
+        get_qdrant_client().delete_collection(collection)
+        forget_collection(collection)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Ingestion jobs/minute: fork-per-job (what `rq worker` does) vs. the warm worker.
+
+fork:  every job forks a child that imports app.queue.worker, then runs
+       process_file in a new event loop (rq's Job._execute), one job at a time.
+warm:  one process imports once and runs process_file coroutines on a single
+       long-lived loop with --concurrency jobs in flight (app.queue.warm_worker).
+
+Gemini is faked with --latency per call, Qdrant runs in memory and Mongo is an
+in-process stand-in. Run from backend/:
+    python -m bench.worker_throughput --jobs 16 --pages 5 --concurrency 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from .offline import offline_env
+from .pdfs import write_policy_pdf
+
+
+def _setup(latency: float):
+    offline_env()
+    from app.queue import worker
+    from .fakes import FakeGeminiClient
+    from .offline import install_fake_gemini, install_fake_mongo
+    install_fake_gemini(FakeGeminiClient(latency=latency))
+    return worker, install_fake_mongo()
+
+
+async def _run_job(worker, files, path: str):
+    inserted = await files.insert_one({"name": os.path.basename(path), "status": "queued"})
+    result = await worker.process_file(str(inserted.inserted_id), path)
+    if result["status"] != "ready":
+        raise RuntimeError(result)
+
+
+def run_fork(paths, latency: float) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                worker, files = _setup(latency)
+                loop = asyncio.new_event_loop()
+                loop.run_until_complete(_run_job(worker, files, path))
+            except BaseException as e:
+                print(f"[bench] job failed: {e}")
+                code = 1
+            os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        if status != 0:
+            raise RuntimeError(f"forked job for {path} failed")
+    return time.perf_counter() - start
+
+
+def run_warm(paths, latency: float, concurrency: int) -> float:
+    worker, files = _setup(latency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(path):
+        async with semaphore:
+            await _run_job(worker, files, path)
+
+    async def all_jobs():
+        await asyncio.gather(*(one(p) for p in paths))
+
+    start = time.perf_counter()
+    asyncio.run(all_jobs())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=16)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.1)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    try:
+        paths = []
+        for i in range(args.jobs):
+            os.makedirs(os.path.join(tmp, str(i)))
+            paths.append(write_policy_pdf(os.path.join(tmp, str(i), f"policy_{i}.pdf"), args.pages))
+
+        fork_seconds = run_fork(paths, args.latency)
+        warm_seconds = run_warm(paths, args.latency, args.concurrency)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    report = {
+        "jobs": args.jobs, "pages_per_job": args.pages, "llm_latency": args.latency,
+        "fork_per_job": {"seconds": round(fork_seconds, 2),
+                         "jobs_per_minute": round(args.jobs * 60 / fork_seconds, 1)},
+        "warm": {"concurrency": args.concurrency, "seconds": round(warm_seconds, 2),
+                 "jobs_per_minute": round(args.jobs * 60 / warm_seconds, 1)},
+    }
+    report["speedup"] = round(fork_seconds / warm_seconds, 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,14 @@ db = db.getSiblingDB('my_database');
 
 // Create collections
 db.createCollection('files');
+db.createCollection('policy_attributes');
 
 // Create indexes for better performance
 db.files.createIndex({ "name": 1 });
 db.files.createIndex({ "status": 1 });
 db.files.createIndex({ "_id": 1 });
+db.files.createIndex({ "sha256": 1, "collection_name": 1, "status": 1 });
+db.policy_attributes.createIndex({ "file_id": 1 }, { unique: true });
+db.policy_attributes.createIndex({ "document_id": 1, "collection_name": 1 });
 
 print('Database initialized successfully');
@@ -80,6 +80,61 @@ export async function queryPDF(query, collectionName = "pdf_collection") {
   }
 }
 
+// Stream a query: handlers are called as Server-Sent Events arrive
+export async function queryPDFStream(query, handlers = {}, collectionName = "pdf_collection") {
+  // 🔹 Backend endpoint: POST /query/stream
+  // Events: "queries" (string[]), "evidence" ({content, metadata}[]),
+  //         "token" (string), "result" (same payload as /query data), "error" ({detail})
+  // Resolves with the "result" payload
+
+  const response = await fetch(`${API_BASE_URL}/query/stream`, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/json"
+    },
+    body: JSON.stringify({
+      query,
+      collection_name: collectionName
+    }),
+  });
+
+  if (!response.ok) {
+    throw new Error(`Query request failed: ${response.statusText}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let result = null;
+
+  const dispatch = (block) => {
+    let event = "message";
+    let data = "";
+    for (const line of block.split("\n")) {
+      if (line.startsWith("event:")) event = line.slice(6).trim();
+      else if (line.startsWith("data:")) data += line.slice(5).trim();
+    }
+    if (!data) return;
+    const payload = JSON.parse(data);
+    if (event === "error") throw new Error(payload.detail);
+    if (event === "result") result = payload;
+    const handler = handlers[`on${event.charAt(0).toUpperCase()}${event.slice(1)}`];
+    if (handler) handler(payload);
+  };
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let end;
+    while ((end = buffer.indexOf("\n\n")) !== -1) {
+      dispatch(buffer.slice(0, end));
+      buffer = buffer.slice(end + 2);
+    }
+  }
+  return result;
+}
+
 // Check backend health
 export async function checkHealth() {
   try {